@@ -1,16 +1,80 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Response
 from backend.auth.login import router as login_router
 from backend.auth.sign_up import router as signup_router
 from backend.auth.account_auth import router as account_auth_router
-from backend.auth.profile import router as profile_router
+from backend.auth.profile import profiles_router, router as profile_router
+from backend.core.health import default_probes, prober, router as health_router, shed_when_unhealthy
+from backend.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, render_metrics
+from backend.core.profiler import ProfileRequestsMiddleware, loop_monitor, router as profiler_router
+from backend.core.ratelimit import RateLimit, rate_limit
+from backend.core.realtime import router as realtime_router
+from backend.core.response import CompressionMiddleware
+from backend.core.startup import warmup_imports
+from backend.reaction.empathy import router as empathy_router, start_replication, stop_replication
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	# イベントループの遅延と、ループを止める同期呼び出しを常時記録する
+	loop_monitor.start()
+	# supabase などリクエスト内で遅延インポートしている SDK を先に読み込む。
+	# gunicorn では master が fork 前に読み込み済み（gunicorn.conf.py の on_starting）なので、ここはすぐ終わる
+	await asyncio.to_thread(warmup_imports)
+	# 依存先の疎通確認は /readyz の呼び出しとは独立に一定間隔で行う
+	prober.start(default_probes(prober.timeout_sec))
+	# 共感データの Supabase からの取り込みと書き戻し（EMPATHY_SYNC_ENABLED=1 のとき）。
+	# どちらもバックグラウンドで行うので、Supabase に繋がらなくても起動は止まらない
+	start_replication()
+	try:
+		yield
+	finally:
+		await asyncio.to_thread(stop_replication)
+		prober.stop()
+		await loop_monitor.stop()
+
 
+app = FastAPI(title="Backend API", version="0.1.0", lifespan=lifespan)
 
-app = FastAPI(title="Backend API", version="0.1.0")
+# 1KB 以上の JSON/テキスト応答を brotli/gzip で圧縮する
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+app.add_middleware(ProfileRequestsMiddleware)
+# 最後に追加したものが最外層になるため、圧縮を含めた処理時間を計測する
+app.add_middleware(MetricsMiddleware)
 
-app.include_router(signup_router)
-app.include_router(login_router)
-app.include_router(account_auth_router)
+# 上流（Supabase Auth）を呼ぶ前にレート制限する。ip / user（メールかトークン）はルートごとの枠
+# ログインは (メール, IP) の組で数え、他人のメールを連打して本人を締め出せないようにする
+# RATE_LIMIT_ENABLED=0 で無効化（負荷試験など）
+signup_limits = rate_limit(
+	RateLimit("ip", "10/minute", burst=5),
+	RateLimit("user", "3/minute", burst=3),
+)
+login_limits = rate_limit(
+	RateLimit("ip", "30/minute", burst=10),
+	RateLimit("user_ip", "10/minute", burst=5),
+	RateLimit("route", "600/minute", burst=100),
+)
+
+# Supabase が落ちていると分かっている間は、上流のタイムアウトを待たずに 503 を返す
+shed_without_supabase = Depends(shed_when_unhealthy("supabase"))
+
+app.include_router(signup_router, dependencies=[shed_without_supabase, Depends(signup_limits)])
+app.include_router(login_router, dependencies=[shed_without_supabase, Depends(login_limits)])
+app.include_router(account_auth_router, dependencies=[shed_without_supabase])
 app.include_router(profile_router)
+app.include_router(profiles_router, dependencies=[shed_without_supabase])
+app.include_router(health_router)
+# 共感数の変化は同じプロセスの realtime 購読者へ配信される
+app.include_router(empathy_router, dependencies=[shed_without_supabase])
+app.include_router(realtime_router)
+app.include_router(profiler_router)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+	return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
 
 
 # for local run: uvicorn backend.app:app --reload
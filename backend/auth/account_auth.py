@@ -1,8 +1,20 @@
 from fastapi import APIRouter, HTTPException, Header
 from pydantic import BaseModel
 from typing import Optional, Any
+import hashlib
 import os
 
+from backend.core.cache import cache_backend
+from backend.core.metrics import observe_dependency
+
+# 検証済みトークン -> user_id。ログアウトなどでのトークンの失効は最大この秒数だけ遅れて反映される（0 で無効）
+SESSION_CACHE_TTL_SEC = float(os.getenv("SESSION_CACHE_TTL_SEC", "30") or 0)
+# 複数ワーカーでは共有 SQLite だけを使い、ワーカーごとのコピーで遅れが伸びないようにする
+_session_cache = cache_backend(
+	max_entries=int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000") or "10000"),
+	local_ttl_sec=0,
+)
+
 
 class AuthCheckResponse(BaseModel):
 	is_authenticated: bool
@@ -26,21 +38,37 @@ def get_supabase_client() -> Any:
 router = APIRouter(prefix="/auth", tags=["auth"]) 
 
 
+def resolve_user_id(access_token: str) -> Optional[str]:
+	"""アクセストークンを検証して user_id を返す（無効/期限切れなら None）。"""
+	# トークン本体はキャッシュに残さない
+	cache_key = "session:" + hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+	cached_user_id = _session_cache.get(cache_key)
+	if cached_user_id:
+		return cached_user_id
+
+	try:
+		client = get_supabase_client()
+		# JWT検証用にauth.get_userを使用
+		with observe_dependency("supabase_auth", "get_user"):
+			user_resp = client.auth.get_user(access_token)
+	except Exception:
+		# アクセストークンが無効/期限切れ
+		return None
+	user_id = getattr(getattr(user_resp, "user", None), "id", None)
+	if user_id and SESSION_CACHE_TTL_SEC > 0:
+		_session_cache.set(cache_key, user_id, SESSION_CACHE_TTL_SEC)
+	return user_id
+
+
+# resolve_user_id は Supabase を同期で呼ぶため、イベントループを止めないよう同期関数（スレッドプール）で処理する
 @router.get("/session", response_model=AuthCheckResponse)
-async def check_session(authorization: Optional[str] = Header(default=None, alias="Authorization")) -> AuthCheckResponse:
+def check_session(authorization: Optional[str] = Header(default=None, alias="Authorization")) -> AuthCheckResponse:
 	# Authorization: Bearer <access_token>
 	if not authorization or not authorization.lower().startswith("bearer "):
 		return AuthCheckResponse(is_authenticated=False, user_id=None)
 
 	access_token = authorization.split(" ", 1)[1].strip()
-	client = get_supabase_client()
-	try:
-		# JWT検証用にauth.get_userを使用
-		user_resp = client.auth.get_user(access_token)
-		user_id = getattr(getattr(user_resp, "user", None), "id", None)
-		if not user_id:
-			return AuthCheckResponse(is_authenticated=False, user_id=None)
-		return AuthCheckResponse(is_authenticated=True, user_id=user_id)
-	except Exception:
-		# アクセストークンが無効/期限切れ
+	user_id = resolve_user_id(access_token)
+	if not user_id:
 		return AuthCheckResponse(is_authenticated=False, user_id=None)
+	return AuthCheckResponse(is_authenticated=True, user_id=user_id)
@@ -3,6 +3,8 @@ from pydantic import BaseModel, EmailStr
 from typing import Optional, Any
 import os
 
+from backend.core.metrics import observe_dependency
+
 
 class LoginRequest(BaseModel):
 	email: EmailStr
@@ -37,10 +39,11 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 async def login(payload: LoginRequest) -> AuthResponse:
 	client = get_supabase_client()
 	try:
-		result = client.auth.sign_in_with_password({
-			"email": payload.email,
-			"password": payload.password_hash,
-		})
+		with observe_dependency("supabase_auth", "sign_in_with_password"):
+			result = client.auth.sign_in_with_password({
+				"email": payload.email,
+				"password": payload.password_hash,
+			})
 		if not result or not result.session:
 			raise HTTPException(status_code=401, detail="メールアドレスまたはパスワードが不正です")
 
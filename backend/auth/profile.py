@@ -1,10 +1,33 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
 from fastapi.responses import RedirectResponse, HTMLResponse
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional, Tuple
+import json
 import os
+import uuid
 from urllib.parse import urlencode
 
+from backend.auth.account_auth import resolve_user_id
+from backend.core.cache import cache_backend
+from backend.core.metrics import observe_dependency
+from backend.core.response import not_modified
+
 router = APIRouter(prefix="/auth", tags=["auth"])
+# /profile/{user_id}, /profiles（ホーム画面・投稿カードから呼ばれる）
+profiles_router = APIRouter(tags=["profile"])
+
+# プロファイル作成済みの uid（コールバックの重複チェックを省く）と users の行（profile:<uid>）
+PROFILE_CACHE_TTL_SEC = float(os.getenv("PROFILE_CACHE_TTL_SEC", "300") or 0)
+# invalidate_profile がすぐ全ワーカーに効くよう、複数ワーカーでは共有 SQLite だけを使う
+_profile_cache = cache_backend(
+    max_entries=int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "10000") or "10000"),
+    local_ttl_sec=0,
+)
+
+PROFILE_COLUMNS = "uid,email,display_name,token,created_at"
+# 他人のプロファイルとして返す項目（メールアドレスやトークン残高は本人にだけ返す）
+PUBLIC_PROFILE_FIELDS = ("uid", "display_name")
+PROFILES_MAX_IDS = 100
 
 def get_supabase_client():
     from supabase import create_client
@@ -108,7 +131,8 @@ async def handle_auth_callback(request: Request):
         client = get_supabase_client()
         
         # ユーザー情報を取得
-        user_resp = client.auth.get_user(token)
+        with observe_dependency("supabase_auth", "get_user"):
+            user_resp = client.auth.get_user(token)
         user = user_resp.user
         
         if not user:
@@ -126,23 +150,34 @@ async def handle_auth_callback(request: Request):
             except Exception:
                 pass
 
-        # 既存プロファイルをチェック
-        existing = client.table('users').select('uid').eq('uid', user.id).execute()
+        # 既存プロファイルをチェック（作成済みと分かっている uid は問い合わせない）
+        profile_key = f"profile:exists:{user.id}"
+        if _profile_cache.get(profile_key):
+            existing_data = [{'uid': user.id}]
+        else:
+            with observe_dependency("supabase_postgrest", "users.select"):
+                existing_data = client.table('users').select('uid').eq('uid', user.id).execute().data
         
-        if not existing.data:
+        if not existing_data:
             # users テーブルにプロファイルを作成
-            result = client.table('users').insert({
-                'uid': user.id,
-                'email': user.email,
-                'display_name': user.id,  # uid で仮置き
-                'token': 0,
-                'created_at': 'now()'
-            }).execute()
+            with observe_dependency("supabase_postgrest", "users.insert"):
+                result = client.table('users').insert({
+                    'uid': user.id,
+                    'email': user.email,
+                    'display_name': user.id,  # uid で仮置き
+                    'token': 0,
+                    'created_at': 'now()'
+                }).execute()
             
             if not result.data:
                 error_url = f"{_error_redirect_base()}?{urlencode({'error': 'profile_creation_failed', 'description': 'プロファイルの作成に失敗しました'})}"
                 return RedirectResponse(url=error_url)
         
+        if PROFILE_CACHE_TTL_SEC > 0:
+            _profile_cache.set(profile_key, True, PROFILE_CACHE_TTL_SEC)
+            if not existing_data and result.data:
+                _cache_profile(result.data[0])
+        
         # 成功時：フロントエンドにリダイレクト（トークン付き）
         params = {"access_token": token, "user_id": user.id}
         if refresh_token:
@@ -155,3 +190,168 @@ async def handle_auth_callback(request: Request):
         error_url = f"{_error_redirect_base()}?{urlencode({'error': 'internal_error', 'description': str(e)})}"
         return RedirectResponse(url=error_url)
 
+
+# ===== プロファイルの参照（read-through キャッシュ）=====
+
+class ProfileUpdate(BaseModel):
+    display_name: str = Field(..., min_length=1, max_length=50)
+
+
+class ProfilesResponse(BaseModel):
+    profiles: List[Dict[str, Any]]
+
+
+def _profile_key(uid: str) -> str:
+    return f"profile:{uid}"
+
+
+def _version_key(uid: str) -> str:
+    return f"profile:version:{uid}"
+
+
+def _cache_profile(row: Dict[str, Any]) -> str:
+    # users から読み直すたびにバージョンを新しくする（ETag に使い、行の取得前に比べられるようにする）
+    version = uuid.uuid4().hex
+    _profile_cache.set(_profile_key(row['uid']), row, PROFILE_CACHE_TTL_SEC)
+    _profile_cache.set(_version_key(row['uid']), version, PROFILE_CACHE_TTL_SEC)
+    return version
+
+
+def invalidate_profile(uid: str) -> None:
+    """token（残高）や display_name を変更したら必ず呼ぶ。次の参照で users から読み直す。"""
+    _profile_cache.delete(_profile_key(uid))
+    _profile_cache.delete(_version_key(uid))
+
+
+def get_profiles(uids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """uid -> users の行。キャッシュに無い分だけを1回の in 検索でまとめて取得する。"""
+    return _load_profiles(uids)[0]
+
+
+def _load_profiles(uids: List[str]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    # get_profiles と同じだが、users から読み直した行に付けたバージョンも返す
+    found: Dict[str, Dict[str, Any]] = {}
+    versions: Dict[str, str] = {}
+    misses: List[str] = []
+    for uid in dict.fromkeys(uids):
+        cached = _profile_cache.get(_profile_key(uid))
+        if cached is not None:
+            found[uid] = cached
+        else:
+            misses.append(uid)
+    if not misses:
+        return found, versions
+
+    client = get_supabase_client()
+    with observe_dependency("supabase_postgrest", "users.select"):
+        rows = client.table('users').select(PROFILE_COLUMNS).in_('uid', misses).execute().data
+    for row in rows or []:
+        found[row['uid']] = row
+        if PROFILE_CACHE_TTL_SEC > 0:
+            versions[row['uid']] = _cache_profile(row)
+    return found, versions
+
+
+def update_profile(uid: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """users の行を更新してキャッシュを無効化し、更新後の行を返す。"""
+    client = get_supabase_client()
+    try:
+        with observe_dependency("supabase_postgrest", "users.update"):
+            rows = client.table('users').update(fields).eq('uid', uid).execute().data
+    finally:
+        # 失敗しても更新済みの可能性があるため、古い値を残さない
+        invalidate_profile(uid)
+    return rows[0] if rows else None
+
+
+def _require_user(authorization: Optional[str]) -> str:
+    if not authorization or not authorization.lower().startswith("bearer "):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    user_id = resolve_user_id(authorization.split(" ", 1)[1].strip())
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return user_id
+
+
+def _public(profile: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: profile.get(k) for k in PUBLIC_PROFILE_FIELDS}
+
+
+def _version(body: Any) -> str:
+    # キャッシュにバージョンが無いとき（PROFILE_CACHE_TTL_SEC=0 など）は、返す内容そのものをバージョンにする
+    return json.dumps(body, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _cached_versions(uids: List[str]) -> Dict[str, str]:
+    # 行を読む前に取る（読んだ後に取ると、古い行に新しいバージョンを付けてしまうことがある）
+    versions = {uid: _profile_cache.get(_version_key(uid)) for uid in uids}
+    return {uid: v for uid, v in versions.items() if v is not None}
+
+
+# Supabase クライアントは同期 API のため、イベントループを止めないよう同期関数（スレッドプール）で処理する
+@profiles_router.get("/profile/{user_id}")
+def get_profile(
+    user_id: str,
+    request: Request,
+    response: Response,
+    authorization: Optional[str] = Header(default=None),
+) -> Any:
+    """本人なら users の行をそのまま、他人なら公開項目だけを返す（If-None-Match が一致すれば 304）。"""
+    viewer = _require_user(authorization)
+    cached = _cached_versions([user_id])
+    if user_id in cached:
+        # キャッシュ済みのバージョンが一致すれば、行の取得も本文の直列化もせずに 304
+        etag_hit = not_modified(request, response, viewer, cached[user_id])
+        if etag_hit:
+            return etag_hit
+    found, fetched = _load_profiles([user_id])
+    profile = found.get(user_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    body = profile if viewer == user_id else _public(profile)
+    # 閲覧者ごとに別の ETag にする（本人には非公開の項目も返すため）
+    version = fetched.get(user_id) or cached.get(user_id) or _version(body)
+    etag_hit = not_modified(request, response, viewer, version)
+    if etag_hit:
+        return etag_hit
+    return body
+
+
+@profiles_router.patch("/profile/{user_id}")
+def patch_profile(user_id: str, body: ProfileUpdate, authorization: Optional[str] = Header(default=None)) -> Dict[str, Any]:
+    if _require_user(authorization) != user_id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    profile = update_profile(user_id, {"display_name": body.display_name.strip()})
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
+@profiles_router.get("/profiles", response_model=ProfilesResponse)
+def list_profiles(
+    request: Request,
+    response: Response,
+    ids: str = Query(..., description="カンマ区切りの uid"),
+    authorization: Optional[str] = Header(default=None),
+) -> Any:
+    """投稿カードやコメントの投稿者名をまとめて返す（見つからない uid は含めない）。"""
+    _require_user(authorization)
+    uids = [uid.strip() for uid in ids.split(",") if uid.strip()]
+    if len(uids) > PROFILES_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"ids は {PROFILES_MAX_IDS} 件までです")
+    unique = list(dict.fromkeys(uids))
+    # 公開項目だけなので閲覧者は問わないが、クエリ（ids）ごとに別の ETag にする
+    cached = _cached_versions(unique)
+    if len(cached) == len(unique):
+        etag_hit = not_modified(request, response, ids, *(cached[uid] for uid in unique))
+        if etag_hit:
+            return etag_hit
+    found, fetched = _load_profiles(unique)
+    profiles = [_public(found[uid]) for uid in unique if uid in found]
+    versions = [fetched.get(uid) or cached.get(uid) for uid in unique if uid in found]
+    if None in versions:
+        versions = [_version(profiles)]
+    etag_hit = not_modified(request, response, ids, *versions)
+    if etag_hit:
+        return etag_hit
+    return ProfilesResponse(profiles=profiles)
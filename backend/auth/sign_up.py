@@ -3,6 +3,8 @@ from pydantic import BaseModel, EmailStr
 from typing import Optional, Any
 import os
 
+from backend.core.metrics import observe_dependency
+
 
 class SignUpRequest(BaseModel):
 	email: EmailStr
@@ -39,10 +41,11 @@ async def sign_up(payload: SignUpRequest) -> AuthResponse:
 	try:
 		# 注意: SupabaseのAuthは通常は平文パスワードを想定します。
 		# ここでは要件に従い、既にハッシュ済みの文字列をそのまま保存します。
-		result = client.auth.sign_up({
-			"email": payload.email,
-			"password": payload.password_hash,
-		})
+		with observe_dependency("supabase_auth", "sign_up"):
+			result = client.auth.sign_up({
+				"email": payload.email,
+				"password": payload.password_hash,
+			})
 		if not result or not result.user:
 			raise HTTPException(status_code=400, detail="サインアップに失敗しました")
 
@@ -117,3 +117,100 @@ def test_signup_login_and_session(monkeypatch):
 			assert resp.json()["is_authenticated"] is False
 
 	anyio.run(_run)
+
+
+class MockUsersTable:
+	def __init__(self, rows, log):
+		self.rows = rows
+		self.log = log
+		self.filters = []
+		self.values = None
+
+	def select(self, columns):
+		return self
+
+	def update(self, values):
+		self.values = values
+		return self
+
+	def eq(self, column, value):
+		self.filters.append((column, [value]))
+		return self
+
+	def in_(self, column, values):
+		self.filters.append((column, list(values)))
+		return self
+
+	def execute(self):
+		self.log.append(("update" if self.values else "select", self.filters))
+		matched = [r for r in self.rows if all(r[c] in vs for c, vs in self.filters)]
+		for r in matched:
+			r.update(self.values or {})
+		return type("Res", (), {"data": [dict(r) for r in matched]})
+
+
+def test_profile_reads_are_cached_and_invalidated(monkeypatch):
+	from backend.auth import profile
+	from backend.core.cache import MemoryCache
+
+	monkeypatch_supabase(monkeypatch)
+	rows = [
+		{"uid": "uid_1", "email": "user1@example.com", "display_name": "one", "token": 10, "created_at": "2025-01-01"},
+		{"uid": "uid_2", "email": "user2@example.com", "display_name": "two", "token": 20, "created_at": "2025-01-01"},
+	]
+	log = []
+	client = MockClient()
+	client.table = lambda name: MockUsersTable(rows, log)
+	monkeypatch.setattr(profile, "get_supabase_client", lambda: client)
+	monkeypatch.setattr(profile, "_profile_cache", MemoryCache())
+	headers = {"Authorization": "Bearer at_user1@example.com"}
+
+	async def _run():
+		transport = httpx.ASGITransport(app=app)
+		async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+			assert (await client.get("/profile/uid_1")).status_code == 401
+
+			resp = await client.get("/profile/uid_1", headers=headers)
+			assert resp.status_code == 200
+			assert resp.json()["token"] == 10
+			assert (await client.get("/profile/uid_1", headers=headers)).json()["display_name"] == "one"
+			assert len(log) == 1
+
+			# 内容が変わらなければ 304、閲覧者が違えば別の ETag
+			etag = resp.headers["etag"]
+			assert (await client.get("/profile/uid_1", headers={**headers, "If-None-Match": etag})).status_code == 304
+			# users の行を読んだときに決めたバージョンで比べるので、304 は行を取得しない
+			profile._profile_cache.delete(profile._profile_key("uid_1"))
+			assert (await client.get("/profile/uid_1", headers={**headers, "If-None-Match": etag})).status_code == 304
+			assert len(log) == 1
+			other = {"Authorization": "Bearer at_user2@example.com", "If-None-Match": etag}
+			assert (await client.get("/profile/uid_1", headers=other)).status_code == 200
+
+			# 他人のプロファイルは公開項目だけ
+			assert (await client.get("/profile/uid_2", headers=headers)).json() == {"uid": "uid_2", "display_name": "two"}
+			assert (await client.get("/profile/nobody", headers=headers)).status_code == 404
+
+			assert (await client.patch("/profile/uid_2", json={"display_name": "x"}, headers=headers)).status_code == 403
+			resp = await client.patch("/profile/uid_1", json={"display_name": "renamed"}, headers=headers)
+			assert resp.status_code == 200
+			resp = await client.get("/profile/uid_1", headers={**headers, "If-None-Match": etag})
+			assert resp.status_code == 200 and resp.json()["display_name"] == "renamed"
+
+			# キャッシュに無い uid だけを1回の in 検索で取得する
+			log.clear()
+			profile.invalidate_profile("uid_2")
+			resp = await client.get("/profiles", params={"ids": "uid_2,uid_1,missing,uid_2"}, headers=headers)
+			assert resp.status_code == 200
+			assert resp.json()["profiles"] == [
+				{"uid": "uid_2", "display_name": "two"},
+				{"uid": "uid_1", "display_name": "renamed"},
+			]
+			assert log == [("select", [("uid", ["uid_2", "missing"])])]
+			resp = await client.get(
+				"/profiles",
+				params={"ids": "uid_2,uid_1,missing,uid_2"},
+				headers={**headers, "If-None-Match": resp.headers["etag"]},
+			)
+			assert resp.status_code == 304
+
+	anyio.run(_run)
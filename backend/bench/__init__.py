@@ -0,0 +1 @@
+# Package marker for backend.bench (外部サービスを使わない負荷試験・ベンチマーク)
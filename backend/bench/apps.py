@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import importlib.machinery
+import importlib.util
+from pathlib import Path
+from types import ModuleType
+
+from fastapi import FastAPI
+
+REACTION_ONE = Path(__file__).resolve().parents[1] / "reaction" / "one"
+
+
+def load_reaction_one() -> ModuleType:
+    """拡張子のない backend/reaction/one をモジュールとして読み込む。
+
+    empathy.db はカレントディレクトリに作られるため、ベンチでは一時ディレクトリで起動する。
+    """
+    loader = importlib.machinery.SourceFileLoader("backend_reaction_one", str(REACTION_ONE))
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
+    loader.exec_module(module)
+    return module
+
+
+def create_empathy_app() -> FastAPI:
+    """uvicorn backend.bench.apps:create_empathy_app --factory で起動する。"""
+    return load_reaction_one().app
+
+
+__all__ = ["create_empathy_app", "load_reaction_one"]
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+
+from backend.core.env import get_env
+
+
+# ベンチ用に事前登録しておくユーザー（user{i}@bench.example.com / hash{i}）
+SEED_USERS = int(get_env("FAKE_SEED_USERS", "1000") or "1000")
+# 上流の往復遅延の模擬（ミリ秒）
+UPSTREAM_LATENCY_MS = float(get_env("FAKE_UPSTREAM_LATENCY_MS", "20") or "20")
+# Freepik の非同期ジョブが完了するまでの時間（秒）
+FREEPIK_JOB_DELAY_SEC = float(get_env("FAKE_FREEPIK_JOB_DELAY_SEC", "1.0") or "1.0")
+# 生成画像として返すダミー PNG のサイズ（バイト）
+FREEPIK_IMAGE_BYTES = int(get_env("FAKE_FREEPIK_IMAGE_BYTES", str(256 * 1024)) or "0")
+
+
+def fake_jwt(sub: str, *, email: str = "", expires_in: int = 3600) -> str:
+    """形式だけ JWT のトークン（署名は検証しない）。"""
+
+    def _b64(obj: Dict[str, Any]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(obj).encode()).decode().rstrip("=")
+
+    now = int(time.time())
+    return ".".join([
+        _b64({"alg": "HS256", "typ": "JWT"}),
+        _b64({"sub": sub, "email": email, "role": "authenticated", "iat": now, "exp": now + expires_in, "jti": uuid.uuid4().hex}),
+        "sig",
+    ])
+
+
+def _claims(token: str) -> Optional[Dict[str, Any]]:
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload))
+    except Exception:
+        return None
+
+
+def _user_record(email: str) -> Dict[str, Any]:
+    now = "2026-01-01T00:00:00Z"
+    return {
+        "id": str(uuid.uuid5(uuid.NAMESPACE_URL, email)),
+        "aud": "authenticated",
+        "role": "authenticated",
+        "email": email,
+        "app_metadata": {"provider": "email"},
+        "user_metadata": {},
+        "created_at": now,
+        "email_confirmed_at": now,
+        "confirmed_at": now,
+    }
+
+
+class _State:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        # "bucket/key" -> (サイズ, MD5 の16進)
+        self.objects: Dict[str, Tuple[int, str]] = {}
+        for i in range(SEED_USERS):
+            self.add_user(f"user{i}@bench.example.com", f"hash{i}")
+
+    def add_user(self, email: str, password: str) -> Dict[str, Any]:
+        user = _user_record(email)
+        with self.lock:
+            self.users[email] = {"password": password, "user": user}
+        return user
+
+
+def _session(user: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "access_token": fake_jwt(user["id"], email=user["email"]),
+        "refresh_token": uuid.uuid4().hex,
+        "expires_in": 3600,
+        "expires_at": int(time.time()) + 3600,
+        "token_type": "bearer",
+        "user": user,
+    }
+
+
+async def _upstream_delay() -> None:
+    if UPSTREAM_LATENCY_MS > 0:
+        await asyncio.sleep(UPSTREAM_LATENCY_MS / 1000.0)
+
+
+def create_app() -> FastAPI:
+    """Supabase（GoTrue / PostgREST）、Freepik、S3 互換ストレージの代役をまとめたアプリ。
+
+    uvicorn backend.bench.fakes:create_app --factory で起動し、各クライアントの接続先を
+    このサーバーに向ける（SUPABASE_URL, FREEPIK_GENERATE_URL, R2_ENDPOINT_URL）。
+    """
+    app = FastAPI(title="bench fakes")
+    state = _State()
+    image = (b"\x89PNG\r\n\x1a\n" + os.urandom(max(0, FREEPIK_IMAGE_BYTES - 8))) if FREEPIK_IMAGE_BYTES else b"\x89PNG\r\n\x1a\n"
+
+    # ===== Supabase Auth (GoTrue) =====
+    @app.post("/auth/v1/token")
+    async def token(request: Request, grant_type: str = "password"):
+        await _upstream_delay()
+        body = await request.json()
+        rec = state.users.get(body.get("email", ""))
+        if grant_type != "password" or not rec or rec["password"] != body.get("password"):
+            return JSONResponse(
+                {"error": "invalid_grant", "error_description": "Invalid login credentials"},
+                status_code=400,
+            )
+        return _session(rec["user"])
+
+    @app.post("/auth/v1/signup")
+    async def signup(request: Request):
+        await _upstream_delay()
+        body = await request.json()
+        email = body.get("email", "")
+        if email in state.users:
+            return JSONResponse({"code": 422, "msg": "User already registered"}, status_code=422)
+        return _session(state.add_user(email, body.get("password", "")))
+
+    @app.get("/auth/v1/user")
+    async def user(authorization: Optional[str] = Header(default=None)):
+        await _upstream_delay()
+        claims = _claims((authorization or "").split(" ", 1)[-1])
+        if not claims or not claims.get("email") or claims.get("exp", 0) < time.time():
+            return JSONResponse({"code": 401, "msg": "invalid JWT"}, status_code=401)
+        # トークンの中身だけで応答する（複数ワーカーで起動しても状態を共有しなくてよい）
+        return _user_record(claims["email"])
+
+    # ===== Supabase PostgREST（users テーブルのみ）=====
+    @app.get("/rest/v1/users")
+    async def select_users(request: Request):
+        await _upstream_delay()
+        uid = request.query_params.get("uid", "")
+        uid = uid[3:] if uid.startswith("eq.") else uid
+        rows = [state.profiles[uid]] if uid in state.profiles else []
+        return rows
+
+    @app.post("/rest/v1/users", status_code=201)
+    async def insert_users(request: Request):
+        await _upstream_delay()
+        body = await request.json()
+        rows = body if isinstance(body, list) else [body]
+        with state.lock:
+            for row in rows:
+                state.profiles[row["uid"]] = row
+        return rows
+
+    # ===== Freepik（非同期ジョブ: 生成 → status_url をポーリング → 画像URL）=====
+    @app.post("/freepik/v1/ai/mystic")
+    async def freepik_generate(request: Request):
+        await _upstream_delay()
+        body = await request.json()
+        if not body.get("prompt"):
+            raise HTTPException(status_code=400, detail="prompt is required")
+        # 完了時刻を job_id に埋め込み、状態を持たない（複数ワーカーでも同じ結果になる）
+        job_id = f"{uuid.uuid4().hex}-{int((time.time() + FREEPIK_JOB_DELAY_SEC) * 1000)}"
+        base = str(request.base_url).rstrip("/")
+        return {"job_id": job_id, "status": "CREATED", "status_url": f"{base}/freepik/v1/ai/mystic/{job_id}"}
+
+    @app.get("/freepik/v1/ai/mystic/{job_id}")
+    async def freepik_status(job_id: str, request: Request):
+        await _upstream_delay()
+        try:
+            ready_at = int(job_id.rsplit("-", 1)[1]) / 1000.0
+        except (IndexError, ValueError):
+            raise HTTPException(status_code=404, detail="job not found")
+        if time.time() < ready_at:
+            return {"job_id": job_id, "status": "IN_PROGRESS"}
+        base = str(request.base_url).rstrip("/")
+        return {"job_id": job_id, "status": "COMPLETED", "image_urls": [f"{base}/freepik/images/{job_id}.png"]}
+
+    @app.get("/freepik/images/{name}")
+    async def freepik_image(name: str):
+        await _upstream_delay()
+        return Response(content=image, media_type="image/png")
+
+    # ===== S3 互換（R2 の代役。パス形式 /{bucket}/{key}）=====
+    @app.put("/{bucket}/{key:path}")
+    async def s3_put(bucket: str, key: str, request: Request):
+        await _upstream_delay()
+        data = await request.body()
+        md5 = hashlib.md5(data)
+        expected = request.headers.get("content-md5")
+        if expected and base64.b64encode(md5.digest()).decode() != expected:
+            return Response(status_code=400, content=b"<Error><Code>BadDigest</Code></Error>")
+        with state.lock:
+            state.objects[f"{bucket}/{key}"] = (len(data), md5.hexdigest())
+        return Response(status_code=200, headers={"ETag": f'"{md5.hexdigest()}"'})
+
+    @app.head("/{bucket}/{key:path}")
+    async def s3_head(bucket: str, key: str):
+        await _upstream_delay()
+        obj = state.objects.get(f"{bucket}/{key}")
+        if obj is None:
+            return Response(status_code=404)
+        size, md5 = obj
+        return Response(status_code=200, headers={"Content-Length": str(size), "ETag": f'"{md5}"'})
+
+    @app.get("/_fake/stats")
+    async def stats():
+        return {
+            "users": len(state.users),
+            "profiles": len(state.profiles),
+            "objects": len(state.objects),
+        }
+
+    return app
+
+
+__all__ = ["SEED_USERS", "create_app", "fake_jwt"]
@@ -0,0 +1,493 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import httpx
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+# supabase-py はキーの中身を検証しないが、実物と同じく JWT 形式にしておく
+FAKE_SUPABASE_KEY = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJyb2xlIjoiYW5vbiJ9.bench"
+SCENARIOS = ("login", "session", "empathy", "image")
+# 比較時にこれ以上悪化したら回帰とみなす（割合）
+DEFAULT_TOLERANCE = 0.2
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb(pid: int) -> float:
+    """pid とその子孫プロセス（gunicorn のワーカー）の RSS の合計。"""
+    total = 0.0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1]) / 1024
+                    break
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(c) for c in f.read().split()]
+    except OSError:
+        return total
+    return total + sum(_rss_mb(c) for c in children)
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """昇順の値から q（0〜100）パーセンタイルを最近傍法で返す。"""
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+class Service:
+    """サブプロセスとして起動するアプリ（代役サーバー / 計測対象）。
+
+    workers が 1 なら uvicorn、2 以上なら本番と同じ gunicorn.conf.py でプリフォーク起動する。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        target: str,
+        *,
+        factory: bool = True,
+        workers: int = 1,
+        env: Optional[Dict[str, str]] = None,
+        cwd: Optional[str] = None,
+    ) -> None:
+        self.name = name
+        self.target = target
+        self.factory = factory
+        self.workers = workers
+        self.port = _free_port()
+        self.env = dict(os.environ, PYTHONPATH=str(REPO_ROOT), **(env or {}))
+        self.cwd = cwd or str(REPO_ROOT)
+        self.proc: Optional[subprocess.Popen] = None
+
+    def _command(self) -> List[str]:
+        if self.workers > 1:
+            self.env.update(
+                WEB_CONCURRENCY=str(self.workers),
+                BIND=f"127.0.0.1:{self.port}",
+                GUNICORN_LOG_LEVEL="warning",
+            )
+            target = f"{self.target}()" if self.factory else self.target
+            return [sys.executable, "-m", "gunicorn", "-c", str(REPO_ROOT / "backend" / "gunicorn.conf.py"), target]
+        return [
+            sys.executable, "-m", "uvicorn", self.target, *(["--factory"] if self.factory else []),
+            "--host", "127.0.0.1", "--port", str(self.port),
+            "--log-level", "warning", "--no-access-log",
+        ]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout_sec: float = 30.0) -> "Service":
+        self.proc = subprocess.Popen(self._command(), env=self.env, cwd=self.cwd)
+        deadline = time.monotonic() + timeout_sec
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"{self.name} の起動に失敗しました（exit={self.proc.returncode}）")
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.1).close()
+                return self
+            except OSError:
+                time.sleep(0.1)
+        self.stop()
+        raise TimeoutError(f"{self.name} が {timeout_sec}s 以内に起動しませんでした")
+
+    def stop(self) -> None:
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+    def rss_mb(self) -> float:
+        return _rss_mb(self.proc.pid) if self.proc is not None else 0.0
+
+
+class RssSampler:
+    """計測中のサーバー RSS を一定間隔で読み、最大値を記録する。"""
+
+    def __init__(self, service: Optional[Service], interval_sec: float = 0.2) -> None:
+        self.service = service
+        self.interval_sec = interval_sec
+        self.start_mb = service.rss_mb() if service else 0.0
+        self.peak_mb = self.start_mb
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def __enter__(self) -> "RssSampler":
+        if self.service is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=2)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_sec):
+            self.peak_mb = max(self.peak_mb, self.service.rss_mb())  # type: ignore[union-attr]
+
+
+@dataclass
+class ScenarioResult:
+    requests: int
+    errors: int
+    duration_sec: float
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    server_rss_start_mb: float
+    server_rss_peak_mb: float
+    error_samples: List[str]
+
+    @classmethod
+    def build(cls, latencies_ms: List[float], errors: List[str], duration_sec: float, rss: RssSampler) -> "ScenarioResult":
+        lat = sorted(latencies_ms)
+        total = len(lat) + len(errors)
+        return cls(
+            requests=total,
+            errors=len(errors),
+            duration_sec=round(duration_sec, 3),
+            rps=round(len(lat) / duration_sec, 2) if duration_sec > 0 else 0.0,
+            p50_ms=round(percentile(lat, 50), 2),
+            p95_ms=round(percentile(lat, 95), 2),
+            p99_ms=round(percentile(lat, 99), 2),
+            max_ms=round(lat[-1], 2) if lat else 0.0,
+            server_rss_start_mb=round(rss.start_mb, 1),
+            server_rss_peak_mb=round(rss.peak_mb, 1),
+            error_samples=sorted(set(errors))[:5],
+        )
+
+
+RequestFn = Callable[[httpx.AsyncClient, random.Random], Awaitable[Optional[str]]]
+
+
+async def run_load(
+    base_url: str,
+    request: RequestFn,
+    *,
+    duration_sec: float,
+    concurrency: int,
+    service: Optional[Service],
+    seed: int = 0,
+) -> ScenarioResult:
+    """concurrency 本のワーカーで duration_sec の間 request を繰り返す（クローズドループ）。
+
+    request はエラー時にその内容（文字列）を返し、成功時は None を返す。
+    """
+    latencies: List[float] = []
+    errors: List[str] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        deadline = time.perf_counter() + duration_sec
+
+        async def _worker(idx: int) -> None:
+            rnd = random.Random(seed * 1_000_003 + idx)
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                try:
+                    err = await request(client, rnd)
+                except httpx.HTTPError as e:
+                    err = type(e).__name__
+                if err is None:
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                else:
+                    errors.append(err)
+
+        with RssSampler(service) as rss:
+            started = time.perf_counter()
+            await asyncio.gather(*(_worker(i) for i in range(concurrency)))
+            elapsed = time.perf_counter() - started
+    return ScenarioResult.build(latencies, errors, elapsed, rss)
+
+
+def _expect(resp: httpx.Response, ok: Callable[[Dict[str, Any]], bool] = lambda _: True) -> Optional[str]:
+    if resp.status_code != 200:
+        return f"http_{resp.status_code}"
+    return None if ok(resp.json()) else "unexpected_body"
+
+
+def _user(rnd: random.Random, users: int) -> Dict[str, str]:
+    i = rnd.randrange(users)
+    return {"email": f"user{i}@bench.example.com", "password_hash": f"hash{i}"}
+
+
+# ===== シナリオ =====
+
+async def scenario_login(app: Service, args: argparse.Namespace) -> ScenarioResult:
+    """ログイン集中（POST /auth/login → Supabase Auth の代役）。"""
+
+    async def _req(client: httpx.AsyncClient, rnd: random.Random) -> Optional[str]:
+        r = await client.post("/auth/login", json=_user(rnd, args.users))
+        return _expect(r, lambda b: bool(b.get("access_token")))
+
+    return await run_load(app.url, _req, duration_sec=args.duration, concurrency=args.concurrency, service=app, seed=args.seed)
+
+
+async def scenario_session(app: Service, args: argparse.Namespace) -> ScenarioResult:
+    """セッション確認（GET /auth/session）。事前にログインしてトークンを集めておく。"""
+    async with httpx.AsyncClient(base_url=app.url, timeout=30.0) as client:
+        rnd = random.Random(args.seed)
+        logins = await asyncio.gather(*(
+            client.post("/auth/login", json=_user(rnd, args.users)) for _ in range(min(args.users, 200))
+        ))
+    tokens = [r.json()["access_token"] for r in logins if r.status_code == 200]
+    if not tokens:
+        raise RuntimeError("セッション用のトークンを取得できませんでした")
+
+    async def _req(client: httpx.AsyncClient, rnd: random.Random) -> Optional[str]:
+        r = await client.get("/auth/session", headers={"Authorization": f"Bearer {rnd.choice(tokens)}"})
+        return _expect(r, lambda b: b.get("is_authenticated") is True)
+
+    return await run_load(app.url, _req, duration_sec=args.duration, concurrency=args.concurrency, service=app, seed=args.seed)
+
+
+async def scenario_empathy(app: Service, args: argparse.Namespace) -> ScenarioResult:
+    """共感のトグルと状態確認（reaction/one）。人気投稿に偏らせるため投稿 ID はべき分布で選ぶ。"""
+
+    async def _req(client: httpx.AsyncClient, rnd: random.Random) -> Optional[str]:
+        uid = f"u{rnd.randrange(args.users)}"
+        post_id = f"p{min(int(rnd.paretovariate(1.2)), args.posts) - 1}"
+        headers = {"Authorization": f"Bearer {uid}"}
+        if rnd.random() < 0.5:
+            r = await client.post("/empathy", json={"post_id": post_id}, headers=headers)
+        else:
+            r = await client.get(f"/empathy/{post_id}/status", headers=headers)
+        return _expect(r, lambda b: "status" in b)
+
+    return await run_load(app.url, _req, duration_sec=args.duration, concurrency=args.concurrency, service=app, seed=args.seed)
+
+
+def scenario_image(fakes: Service, args: argparse.Namespace) -> ScenarioResult:
+    """画像生成ジョブ（Freepik 生成 → ポーリング → ダウンロード → R2 アップロード）をワーカープールで流す。
+
+    generate_image はプロセス内ライブラリとして使われるため、このプロセスで実行する。
+    """
+    env = {
+        "FREEPIK_API_KEY": "bench",
+        "FREEPIK_GENERATE_URL": f"{fakes.url}/freepik/v1/ai/mystic",
+        "R2_ACCESS_KEY_ID": "bench",
+        "R2_SECRET_ACCESS_KEY": "bench",
+        "R2_ACCOUNT_ID": "bench",
+        "R2_BUCKET": "bench",
+        "R2_PUBLIC_BASE_URL": "https://images.bench.example.com",
+        "R2_ENDPOINT_URL": fakes.url,
+    }
+    os.environ.update(env)
+    from backend.generate_image.client import FreepikImageClient
+    from backend.generate_image.r2_storage import R2Storage
+
+    storage = R2Storage.from_env()
+    local = threading.local()
+
+    def _job(i: int) -> Optional[str]:
+        # requests.Session はスレッド間で共有しない
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = FreepikImageClient.from_env()
+        try:
+            images = client.generate_image_bytes(f"bench prompt {i}")
+            storage.upload_bytes(images[0])
+            return None
+        except Exception as e:
+            return type(e).__name__
+
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    def _timed(i: int) -> None:
+        t0 = time.perf_counter()
+        err = _job(i)
+        if err is None:
+            latencies.append((time.perf_counter() - t0) * 1000)
+        else:
+            errors.append(err)
+
+    with RssSampler(fakes) as rss, ThreadPoolExecutor(max_workers=args.image_workers) as pool:
+        started = time.perf_counter()
+        list(pool.map(_timed, range(args.image_jobs)))
+        elapsed = time.perf_counter() - started
+    return ScenarioResult.build(latencies, errors, elapsed, rss)
+
+
+# ===== 結果の保存と比較 =====
+
+def _git(*cmd: str) -> str:
+    try:
+        return subprocess.run(["git", *cmd], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "git_commit": _git("rev-parse", "HEAD"),
+        "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            "scenarios": args.scenarios,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "app_workers": args.app_workers,
+            "fake_workers": args.fake_workers,
+            "users": args.users,
+            "posts": args.posts,
+            "image_jobs": args.image_jobs,
+            "image_workers": args.image_workers,
+            "upstream_latency_ms": args.upstream_latency_ms,
+            "seed": args.seed,
+        },
+    }
+
+
+def compare(base: Dict[str, Any], current: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """基準結果と比べて tolerance 以上悪化した指標を列挙する。"""
+    regressions: List[str] = []
+    for name, cur in current.get("scenarios", {}).items():
+        prev = base.get("scenarios", {}).get(name)
+        if not prev:
+            continue
+        if prev["rps"] > 0 and cur["rps"] < prev["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {prev['rps']} -> {cur['rps']}")
+        for key in ("p95_ms", "p99_ms", "server_rss_peak_mb"):
+            if prev[key] > 0 and cur[key] > prev[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {prev[key]} -> {cur[key]}")
+        if cur["errors"] > prev["errors"] and cur["errors"] > cur["requests"] * 0.01:
+            regressions.append(f"{name}: errors {prev['errors']} -> {cur['errors']}")
+    return regressions
+
+
+def _print_result(name: str, r: ScenarioResult) -> None:
+    print(
+        f"{name:<8} {r.requests:>7} req  {r.rps:>8.1f} rps  "
+        f"p50={r.p50_ms:.1f}ms p95={r.p95_ms:.1f}ms p99={r.p99_ms:.1f}ms  "
+        f"errors={r.errors}  rss={r.server_rss_start_mb:.0f}->{r.server_rss_peak_mb:.0f}MB"
+    )
+    if r.error_samples:
+        print(f"         errors: {', '.join(r.error_samples)}")
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    fake_env = {
+        "FAKE_UPSTREAM_LATENCY_MS": str(args.upstream_latency_ms),
+        "FAKE_SEED_USERS": str(args.users),
+        "FAKE_FREEPIK_JOB_DELAY_SEC": str(args.image_job_delay),
+    }
+    workdirs: List[str] = [tempfile.mkdtemp(prefix="bench-")]
+    app_env = {
+        "SUPABASE_ANON_KEY": FAKE_SUPABASE_KEY,
+        "SUPABASE_SERVICE_ROLE_KEY": FAKE_SUPABASE_KEY,
+        # 全リクエストが同じ IP から来るため、レート制限は切って上流までの経路を計測する
+        "RATE_LIMIT_ENABLED": "0",
+        # 前回の実行のキャッシュを持ち越さない
+        "SHARED_CACHE_PATH": os.path.join(workdirs[0], "shared-cache.sqlite3"),
+    }
+    services: List[Service] = []
+    results: Dict[str, Any] = {}
+    try:
+        fakes = Service("fakes", "backend.bench.fakes:create_app", workers=args.fake_workers, env=fake_env).start()
+        services.append(fakes)
+        app_env["SUPABASE_URL"] = fakes.url
+
+        for name in args.scenarios:
+            if name in ("login", "session"):
+                app = next((s for s in services if s.name == "app"), None)
+                if app is None:
+                    app = Service("app", "backend.app:app", factory=False, workers=args.app_workers, env=app_env).start()
+                    services.append(app)
+                result = asyncio.run((scenario_login if name == "login" else scenario_session)(app, args))
+            elif name == "empathy":
+                workdir = tempfile.mkdtemp(prefix="bench-empathy-")
+                workdirs.append(workdir)
+                empathy = Service("empathy", "backend.bench.apps:create_empathy_app", cwd=workdir).start()
+                services.append(empathy)
+                result = asyncio.run(scenario_empathy(empathy, args))
+            elif name == "image":
+                result = scenario_image(fakes, args)
+            else:
+                raise ValueError(f"未知のシナリオです: {name}")
+            _print_result(name, result)
+            results[name] = asdict(result)
+    finally:
+        for service in reversed(services):
+            service.stop()
+        for workdir in workdirs:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {"meta": run_metadata(args), "scenarios": results}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="外部サービスの代役を立てたオフライン負荷試験")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"カンマ区切り（{', '.join(SCENARIOS)}）")
+    parser.add_argument("--duration", type=float, default=10.0, help="HTTP シナリオごとの計測秒数")
+    parser.add_argument("--concurrency", type=int, default=32, help="同時接続数")
+    parser.add_argument("--app-workers", type=int, default=1, help="backend.app のワーカー数（2以上で gunicorn プリフォーク）")
+    parser.add_argument("--fake-workers", type=int, default=1, help="代役サーバーのワーカー数")
+    parser.add_argument("--users", type=int, default=1000, help="ユーザー数（代役の Supabase に事前登録）")
+    parser.add_argument("--posts", type=int, default=1000, help="共感シナリオの投稿数")
+    parser.add_argument("--image-jobs", type=int, default=40, help="画像生成ジョブ数")
+    parser.add_argument("--image-workers", type=int, default=8, help="画像生成のワーカースレッド数")
+    parser.add_argument("--image-job-delay", type=float, default=1.0, help="代役 Freepik のジョブ完了までの秒数")
+    parser.add_argument("--upstream-latency-ms", type=float, default=20.0, help="代役サーバーの応答遅延（ミリ秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="結果を JSON で保存するパス")
+    parser.add_argument("--compare", help="比較する基準結果（--out で保存した JSON）")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="回帰とみなす悪化の割合")
+    parser.add_argument("--fail-on-regression", action="store_true", help="回帰があれば終了コード 1 を返す")
+    args = parser.parse_args(argv)
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+
+    report = run(args)
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"saved: {args.out}")
+
+    if args.compare:
+        base = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(base, report, args.tolerance)
+        base_commit = base.get("meta", {}).get("git_commit", "")[:12]
+        print(f"compare with {args.compare} ({base_commit or 'unknown'}):")
+        if base.get("meta", {}).get("config") != report["meta"]["config"]:
+            print("  warning: 計測条件が基準結果と異なります")
+        for line in regressions or ["no regressions"]:
+            print(f"  {line}")
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .run import run
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="ワーカー数ごとの RPS を計測し、コア数に対するスケーリングを確認する")
+    parser.add_argument("--workers", default=f"1,{max(2, os.cpu_count() or 1)}", help="カンマ区切りのワーカー数（例: 1,2,4）")
+    parser.add_argument("--scenarios", default="login,session", help="HTTP シナリオ（login, session）")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency-per-worker", type=int, default=16, help="ワーカー1つあたりの同時接続数")
+    parser.add_argument("--out", help="結果を JSON で保存するパス")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parse_args(argv)
+    counts = [int(w) for w in args.workers.split(",") if w.strip()]
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    # 代役サーバーが先に詰まらないよう、最大のワーカー数に合わせて起動する
+    fake_workers = max(counts)
+
+    runs: Dict[int, Dict[str, Any]] = {}
+    for workers in counts:
+        print(f"== app workers: {workers}")
+        run_args = argparse.Namespace(
+            scenarios=scenarios,
+            duration=args.duration,
+            concurrency=args.concurrency_per_worker * workers,
+            app_workers=workers,
+            fake_workers=fake_workers,
+            users=1000,
+            posts=1000,
+            image_jobs=0,
+            image_workers=1,
+            image_job_delay=1.0,
+            upstream_latency_ms=20.0,
+            seed=0,
+        )
+        runs[workers] = run(run_args)
+
+    base = counts[0]
+    print(f"\nscaling (cpu_count={os.cpu_count()}):")
+    rows: List[Dict[str, Any]] = []
+    for name in scenarios:
+        base_rps = runs[base]["scenarios"][name]["rps"] or 1.0
+        for workers in counts:
+            r = runs[workers]["scenarios"][name]
+            speedup = r["rps"] / base_rps
+            efficiency = speedup / (workers / base)
+            rows.append({"scenario": name, "workers": workers, "rps": r["rps"], "p99_ms": r["p99_ms"],
+                         "speedup": round(speedup, 2), "efficiency": round(efficiency, 2)})
+            print(f"  {name:<8} workers={workers:<3} {r['rps']:>8.1f} rps  x{speedup:.2f}  efficiency={efficiency:.0%}  p99={r['p99_ms']:.0f}ms")
+    if (os.cpu_count() or 1) < max(counts):
+        print(f"  note: CPU コア数（{os.cpu_count()}）がワーカー数より少ないため線形には伸びません")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps({"runs": runs, "scaling": rows}, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"saved: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+from fastapi.testclient import TestClient
+
+from backend.bench import fakes
+from backend.bench.run import compare, percentile
+
+
+def _result(**overrides):
+    base = {
+        "requests": 1000, "errors": 0, "rps": 100.0, "p50_ms": 10.0, "p95_ms": 20.0,
+        "p99_ms": 30.0, "server_rss_peak_mb": 100.0,
+    }
+    base.update(overrides)
+    return {"scenarios": {"login": base}}
+
+
+def test_percentile_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile(values, 100) == 100.0
+    assert percentile([], 99) == 0.0
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    assert compare(_result(), _result(rps=90.0, p99_ms=35.0)) == []
+    regressions = compare(_result(), _result(rps=70.0, p99_ms=40.0, server_rss_peak_mb=130.0))
+    assert regressions == [
+        "login: rps 100.0 -> 70.0",
+        "login: p99_ms 30.0 -> 40.0",
+        "login: server_rss_peak_mb 100.0 -> 130.0",
+    ]
+    assert compare(_result(), _result(errors=50)) == ["login: errors 0 -> 50"]
+
+
+def test_fake_supabase_auth_roundtrip(monkeypatch):
+    monkeypatch.setattr(fakes, "UPSTREAM_LATENCY_MS", 0)
+    monkeypatch.setattr(fakes, "SEED_USERS", 2)
+    client = TestClient(fakes.create_app())
+
+    bad = client.post("/auth/v1/token?grant_type=password", json={"email": "user0@bench.example.com", "password": "x"})
+    assert bad.status_code == 400
+
+    ok = client.post("/auth/v1/token?grant_type=password", json={"email": "user0@bench.example.com", "password": "hash0"})
+    assert ok.status_code == 200
+    session = ok.json()
+    assert session["token_type"] == "bearer"
+
+    user = client.get("/auth/v1/user", headers={"Authorization": f"Bearer {session['access_token']}"})
+    assert user.json()["id"] == session["user"]["id"]
+    assert client.get("/auth/v1/user", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+
+def test_fake_freepik_job_completes_after_delay(monkeypatch):
+    monkeypatch.setattr(fakes, "UPSTREAM_LATENCY_MS", 0)
+    monkeypatch.setattr(fakes, "FREEPIK_JOB_DELAY_SEC", 0)
+    client = TestClient(fakes.create_app())
+
+    job = client.post("/freepik/v1/ai/mystic", json={"prompt": "sunset"}).json()
+    status = client.get(job["status_url"]).json()
+    assert status["status"] == "COMPLETED"
+    image = client.get(status["image_urls"][0])
+    assert image.content.startswith(b"\x89PNG")
@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+import pytest
+
+# backend.app の import（= 共感 DB の作成）より前に、リポジトリ直下の empathy.db から一時ディレクトリへ向ける
+os.environ["EMPATHY_DB_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="empathy-test-"), "empathy.db")
+
+
+@pytest.fixture
+def empathy_db(tmp_path, monkeypatch):
+    """共感 API をテストごとの空の SQLite と索引に差し替え、backend.reaction.empathy を返す。"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from backend.core.liked_index import LikedIndex
+    from backend.reaction import empathy
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'empathy.db'}", future=True)
+    empathy.Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(empathy, "engine", engine)
+    monkeypatch.setattr(empathy, "SessionLocal", sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True))
+    monkeypatch.setattr(empathy, "liked_index", LikedIndex(empathy._load_liked_post_ids))
+    yield empathy
+    engine.dispose()
@@ -0,0 +1 @@
+# Package marker for backend.core (アプリ全体で共有するミドルウェア・共通部品)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import List
+
+from fastapi import FastAPI
+
+from .realtime import hub, router
+
+
+def create_app() -> FastAPI:
+    """負荷試験用アプリ（realtime ルーター + 配信トリガ）。uvicorn --factory で起動する。"""
+    app = FastAPI()
+    app.include_router(router)
+
+    @app.post("/_bench/publish/{post_id}")
+    async def publish(post_id: str, value: int):
+        return {"subscribers": hub.publish_counts(post_id, post_good=value, sent_at=time.time())}
+
+    @app.get("/_bench/stats")
+    async def stats():
+        return {"subscribers": hub.subscriber_count()}
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def _http(port: int, method: str, path: str) -> dict:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    return json.loads(raw.split(b"\r\n\r\n", 1)[1] or b"{}")
+
+
+async def _run(args: argparse.Namespace, port: int, pid: int) -> None:
+    import websockets
+
+    rss_before = _rss_mb(pid)
+    conns = []
+    t0 = time.perf_counter()
+    for i in range(args.connections):
+        # 全接続が hot を購読し、残りは各自の投稿を購読する（アイドル接続）
+        ws = await websockets.connect(f"ws://127.0.0.1:{port}/realtime/ws?topics=post:hot,post:idle{i}", max_queue=None)
+        conns.append(ws)
+    connect_sec = time.perf_counter() - t0
+    await asyncio.sleep(1.0)
+    stats = await _http(port, "GET", "/_bench/stats")
+    rss_idle = _rss_mb(pid)
+    print(f"connections: {stats['subscribers']} open in {connect_sec:.1f}s")
+    print(f"server RSS: {rss_before:.1f}MB -> {rss_idle:.1f}MB ({(rss_idle - rss_before) * 1024 / max(1, args.connections):.1f}KB/conn)")
+
+    for r in range(args.rounds):
+        # 1ラウンド内の複数更新は1メッセージに合流されることを確認する
+        for v in range(args.burst):
+            await _http(port, "POST", f"/_bench/publish/hot?value={r * args.burst + v}")
+
+        async def _recv(ws) -> float:
+            msg = json.loads(await asyncio.wait_for(ws.recv(), timeout=30))
+            counts = msg["counts"][0]
+            assert counts["post_good"] == r * args.burst + args.burst - 1, counts
+            return (time.time() - counts["sent_at"]) * 1000
+
+        latencies: List[float] = sorted(await asyncio.gather(*(_recv(ws) for ws in conns)))
+        p50 = statistics.median(latencies)
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"round {r + 1}: fan-out to {len(latencies)} clients p50={p50:.0f}ms p99={p99:.0f}ms (burst={args.burst} coalesced)")
+
+    await asyncio.gather(*(ws.close() for ws in conns))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="realtime 配信の負荷試験（1ワーカーに大量のアイドル接続）")
+    parser.add_argument("--connections", type=int, default=2000, help="WebSocket 接続数")
+    parser.add_argument("--rounds", type=int, default=3, help="配信ラウンド数")
+    parser.add_argument("--burst", type=int, default=5, help="1ラウンドあたりの更新回数")
+    args = parser.parse_args()
+
+    port = _free_port()
+    env = dict(os.environ, REALTIME_FLUSH_INTERVAL_MS="250")
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "backend.core.bench_realtime:create_app",
+            "--factory", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", "1", "--log-level", "warning",
+        ],
+        env=env,
+    )
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        asyncio.run(_run(args, port, proc.pid))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import Dict, List, Optional
+
+import anyio
+import httpx
+from fastapi import FastAPI, Request, Response
+from pydantic import BaseModel
+
+from .response import CompressionMiddleware, not_modified
+
+
+class Comment(BaseModel):
+    id: str
+    name: str
+    context: str
+    comment_time: str
+    post_id: str
+    comment_good: int
+
+
+class Post(BaseModel):
+    id: str
+    uid: str
+    prefectures: str
+    lat: float
+    lng: float
+    title: str
+    discription: str
+    post_time: str
+    post_good: int
+    comment: List[Comment]
+
+
+class PostsResponse(BaseModel):
+    posts: List[Post]
+
+
+def _dataset(num_posts: int, num_comments: int) -> PostsResponse:
+    posts = []
+    for i in range(num_posts):
+        pid = f"post_{i:05d}"
+        posts.append(Post(
+            id=pid,
+            uid=f"user_{i % 50:03d}",
+            prefectures="大阪府",
+            lat=34.7 + i * 1e-4,
+            lng=135.5 + i * 1e-4,
+            title=f"駅前の落とし物について {i}",
+            discription="昨日の夕方、駅前のバス停付近で黒い財布を見かけた方はいませんか。" * 2,
+            post_time="2026-10-01T12:00:00Z",
+            post_good=i % 17,
+            comment=[
+                Comment(
+                    id=f"{pid}_c{j}",
+                    name=f"user_{j:03d}",
+                    context="交番に届いているかもしれません。確認してみてください。",
+                    comment_time="2026-10-01T13:00:00Z",
+                    post_id=pid,
+                    comment_good=j,
+                )
+                for j in range(num_comments)
+            ],
+        ))
+    return PostsResponse(posts=posts)
+
+
+def build_app(data: PostsResponse, *, layered: bool) -> FastAPI:
+    app = FastAPI()
+    if layered:
+        app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/posts", response_model=PostsResponse)
+    async def posts(request: Request, response: Response):
+        if layered:
+            etag_hit = not_modified(request, response, len(data.posts), "v1")
+            if etag_hit:
+                return etag_hit
+        return data
+
+    return app
+
+
+async def _measure(app: FastAPI, headers: Dict[str, str], n: int, revalidate: bool) -> Dict[str, float]:
+    transport = httpx.ASGITransport(app=app)
+    latencies: List[float] = []
+    wire_bytes = 0
+    etag: Optional[str] = None
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(n):
+            h = dict(headers)
+            if revalidate and etag:
+                h["If-None-Match"] = etag
+            t = time.perf_counter()
+            async with client.stream("GET", "/posts", headers=h) as resp:
+                raw = b"".join([chunk async for chunk in resp.aiter_raw()])
+                etag = resp.headers.get("etag") or etag
+            latencies.append((time.perf_counter() - t) * 1000)
+            wire_bytes = len(raw)
+    latencies.sort()
+    return {
+        "bytes": wire_bytes,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="読み取り系レスポンス層（圧縮・ETag）のベンチマーク")
+    parser.add_argument("--posts", type=int, default=200, help="投稿数")
+    parser.add_argument("--comments", type=int, default=10, help="投稿あたりのコメント数")
+    parser.add_argument("--n", type=int, default=200, help="リクエスト回数")
+    args = parser.parse_args()
+
+    data = _dataset(args.posts, args.comments)
+    plain = build_app(data, layered=False)
+    layered = build_app(data, layered=True)
+
+    cases = [
+        ("baseline", plain, {"Accept-Encoding": "identity"}, False),
+        ("gzip", layered, {"Accept-Encoding": "gzip"}, False),
+        # brotli 未インストール時は gzip にフォールバックする
+        ("br", layered, {"Accept-Encoding": "br, gzip"}, False),
+        ("etag_304", layered, {"Accept-Encoding": "br, gzip"}, True),
+    ]
+    for name, app, headers, revalidate in cases:
+        result = anyio.run(_measure, app, headers, args.n, revalidate)
+        print(f"{name:>9}: bytes={result['bytes']:>8} p50={result['p50_ms']:.2f}ms p99={result['p99_ms']:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
+
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# backend.app の import だけでは読み込まれてはならない重い SDK
+HEAVY_MODULES = ("supabase", "googleapiclient", "google.oauth2", "boto3", "botocore")
+
+
+@dataclass
+class ImportProfile:
+    total_ms: float
+    top: List[Tuple[str, float]]
+    loaded_heavy: List[str]
+
+
+def measure_import(module: str = "backend.app", *, top_n: int = 15) -> ImportProfile:
+    """新しいインタプリタで `python -X importtime -c "import <module>"` を実行して集計する。"""
+    probe = (
+        f"import sys, {module}\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=str(REPO_ROOT),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative: Dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if not parts[1].isdigit():
+            continue  # ヘッダー行
+        cumulative[parts[2]] = int(parts[1]) / 1000.0
+    total = cumulative.get(module, 0.0)
+    top = sorted(
+        ((name, ms) for name, ms in cumulative.items() if name != module and "." not in name),
+        key=lambda kv: kv[1],
+        reverse=True,
+    )[:top_n]
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return ImportProfile(total_ms=total, top=top, loaded_heavy=loaded)
+
+
+def main(argv: Sequence[str] = ()) -> None:
+    parser = argparse.ArgumentParser(description="backend.app のコールドスタート（import 時間）計測")
+    parser.add_argument("--module", default="backend.app", help="計測するモジュール")
+    parser.add_argument("--runs", type=int, default=5, help="計測回数（中央値を採用）")
+    args = parser.parse_args(list(argv) or None)
+
+    profiles = [measure_import(args.module) for _ in range(args.runs)]
+    median = statistics.median(p.total_ms for p in profiles)
+    print(f"{args.module}: median {median:.1f}ms over {args.runs} runs (min {min(p.total_ms for p in profiles):.1f}ms)")
+    print("packages by cumulative import time (ms, last run):")
+    for name, ms in profiles[-1].top:
+        print(f"  {ms:8.1f}  {name}")
+    print(f"heavy SDKs loaded at import: {profiles[-1].loaded_heavy or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional, Protocol, Tuple
+
+from backend.core.env import get_env
+
+
+class CacheBackend(Protocol):
+    """キャッシュの保存先。値は JSON 化できるものに限る。"""
+
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    def set(self, key: str, value: Any, ttl_sec: float) -> None:
+        ...
+
+    def delete(self, key: str) -> None:
+        ...
+
+
+@dataclass
+class MemoryCache:
+    """プロセス内の LRU + TTL キャッシュ。max_entries を超えると古いものから捨てる。"""
+
+    max_entries: int = 1024
+    _data: "OrderedDict[str, Tuple[float, Any]]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl_sec: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl_sec, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+@dataclass
+class SQLiteCache:
+    """ローカル SQLite ファイルを使う、同一ホストのワーカー間で共有できるキャッシュ。
+
+    WAL モードで読み取りは書き込みをブロックしない。接続はスレッドごと・プロセスごとに持つため、
+    prefork（fork 後の各ワーカー）でもそのまま使える。期限切れの削除と件数の上限は
+    prune_every 回の set ごとにまとめて行う。
+    """
+
+    path: str
+    max_entries: int = 100_000
+    prune_every: int = 512
+    _local: threading.local = field(default_factory=threading.local, init=False, repr=False)
+    _writes: int = field(default=0, init=False, repr=False)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl_sec: float) -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), time.time() + ttl_sec),
+        )
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self.prune()
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def prune(self) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        # 上限を超えた分は期限の近いものから捨てる
+        conn.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def ping(self) -> None:
+        self._conn().execute("SELECT 1").fetchone()
+
+
+@dataclass
+class TieredCache:
+    """プロセス内（L1）→ 共有（L2）の順に引く2段キャッシュ。
+
+    L1 は local_ttl_sec だけ保持するため、他ワーカーでの delete が見えるまで最大 local_ttl_sec 遅れる。
+    """
+
+    local: CacheBackend
+    shared: CacheBackend
+    local_ttl_sec: float = 5.0
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        value = self.shared.get(key)
+        if value is not None:
+            self.local.set(key, value, self.local_ttl_sec)
+        return value
+
+    def set(self, key: str, value: Any, ttl_sec: float) -> None:
+        self.shared.set(key, value, ttl_sec)
+        self.local.set(key, value, min(ttl_sec, self.local_ttl_sec))
+
+    def delete(self, key: str) -> None:
+        self.shared.delete(key)
+        self.local.delete(key)
+
+
+_shared: Optional[SQLiteCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> Optional[SQLiteCache]:
+    """SHARED_CACHE_PATH が設定されていれば、ワーカー間で共有する SQLiteCache を返す。"""
+    global _shared
+    path = get_env("SHARED_CACHE_PATH")
+    if not path:
+        return None
+    with _shared_lock:
+        if _shared is None or _shared.path != path:
+            max_entries = int(get_env("SHARED_CACHE_MAX_ENTRIES", "100000") or "100000")
+            _shared = SQLiteCache(path=path, max_entries=max_entries)
+        return _shared
+
+
+def cache_backend(max_entries: int = 1024, *, local_ttl_sec: Optional[float] = None) -> CacheBackend:
+    """用途ごとのキャッシュの保存先を返す。
+
+    SHARED_CACHE_PATH があればプロセス内 LRU + 共有 SQLite の2段、無ければプロセス内 LRU のみ。
+    local_ttl_sec（省略時は SHARED_CACHE_LOCAL_TTL_SEC、既定5秒）が 0 なら共有 SQLite だけを使い、
+    delete がすぐに全ワーカーへ反映される。
+    """
+    shared = shared_cache()
+    if shared is None:
+        return MemoryCache(max_entries=max_entries)
+    if local_ttl_sec is None:
+        local_ttl_sec = float(get_env("SHARED_CACHE_LOCAL_TTL_SEC", "5") or 0)
+    if local_ttl_sec <= 0:
+        return shared
+    return TieredCache(local=MemoryCache(max_entries=max_entries), shared=shared, local_ttl_sec=local_ttl_sec)
+
+
+__all__ = [
+    "CacheBackend",
+    "MemoryCache",
+    "SQLiteCache",
+    "TieredCache",
+    "cache_backend",
+    "shared_cache",
+]
@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import fcntl
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Boolean, Column, Integer, MetaData, String, Table, bindparam, delete, func, insert, literal, select
+from sqlalchemy.engine import Engine
+
+from backend.core.env import get_env
+from backend.core.metrics import REGISTRY, observe_dependency
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_PENDING = REGISTRY.gauge("empathy_outbox_pending", "Supabase へ未反映の共感の変更件数")
+OUTBOX_REPLICATED = REGISTRY.counter("empathy_outbox_replicated_total", "Supabase へ反映した共感の変更件数")
+
+HWM_KEY = "outbox_seq"
+HYDRATED_KEY = "hydrated"
+HYDRATED_AT_KEY = "hydrated_at"
+
+metadata = MetaData()
+
+# 共感の変更履歴。トグルと同じトランザクションで追記し、反映後に削除する。
+# 削除後も seq が再利用されないよう AUTOINCREMENT にする（高水位線より小さい番号が振られると取りこぼす）
+outbox_table = Table(
+    "empathy_outbox",
+    metadata,
+    Column("seq", Integer, primary_key=True, autoincrement=True),
+    Column("uid", String, nullable=False),
+    Column("post_id", String, nullable=False),
+    Column("liked", Boolean, nullable=False),
+    sqlite_autoincrement=True,
+)
+
+# 反映済みの seq（高水位線）、既存のローカル行を outbox へ積んだかのフラグ、最後に取り込んだ時刻
+sync_state_table = Table(
+    "empathy_sync_state",
+    metadata,
+    Column("name", String, primary_key=True),
+    Column("value", Integer, nullable=False),
+)
+
+
+def sync_enabled() -> bool:
+    return (get_env("EMPATHY_SYNC_ENABLED", "0") or "0").lower() in ("1", "true", "yes", "on")
+
+
+def record_change(db: Any, uid: str, post_id: str, liked: bool) -> None:
+    """トグル結果を outbox に積む。呼び出し側のトランザクション（Session）で commit する。"""
+    db.execute(insert(outbox_table).values(uid=uid, post_id=post_id, liked=liked))
+
+
+def coalesce(rows: Iterable[Any]) -> Tuple[List[Dict[str, str]], Dict[str, List[str]]]:
+    """seq 順の変更を (uid, post_id) ごとの最終状態にまとめ、(upsert する行, uid -> 削除する post_id) を返す。
+
+    同じキーは1回しか送らないため、upsert と delete の送信順は結果に影響しない。
+    """
+    last: Dict[Tuple[str, str], bool] = {}
+    for row in rows:
+        last[(row.uid, row.post_id)] = bool(row.liked)
+    upserts = [{"uid": uid, "post_id": post_id} for (uid, post_id), liked in last.items() if liked]
+    deletes: Dict[str, List[str]] = {}
+    for (uid, post_id), liked in last.items():
+        if not liked:
+            deletes.setdefault(uid, []).append(post_id)
+    return upserts, deletes
+
+
+class SupabaseEmpathyRemote:
+    """Supabase（PostgREST）側の共感テーブル。(uid, post_id) に一意制約がある前提。
+
+        create table empathy (
+            uid text not null,
+            post_id text not null,
+            primary key (uid, post_id)
+        );
+    """
+
+    def __init__(self, client: Any, table: str = "empathy") -> None:
+        self.client = client
+        self.table = table
+
+    @classmethod
+    def from_env(cls) -> "SupabaseEmpathyRemote":
+        from supabase import create_client
+
+        url = get_env("SUPABASE_URL")
+        # RLS を越えて全ユーザー分を読み書きするため service role key を優先する
+        key = get_env("SUPABASE_SERVICE_ROLE_KEY") or get_env("SUPABASE_ANON_KEY")
+        if not url or not key:
+            raise RuntimeError("SUPABASE_URL と SUPABASE_SERVICE_ROLE_KEY を環境変数に設定してください")
+        return cls(create_client(url, key), table=get_env("EMPATHY_SYNC_TABLE", "empathy") or "empathy")
+
+    def upsert(self, rows: Sequence[Dict[str, str]]) -> None:
+        # 既にある行は無視するので、同じ変更を再送しても結果は変わらない
+        with observe_dependency("supabase_postgrest", f"{self.table}.upsert"):
+            self.client.table(self.table).upsert(
+                list(rows), on_conflict="uid,post_id", ignore_duplicates=True, returning="minimal"
+            ).execute()
+
+    def delete(self, uid: str, post_ids: Sequence[str]) -> None:
+        with observe_dependency("supabase_postgrest", f"{self.table}.delete"):
+            self.client.table(self.table).delete(returning="minimal").eq("uid", uid).in_("post_id", list(post_ids)).execute()
+
+    def fetch_page(self, offset: int, limit: int) -> List[Dict[str, str]]:
+        with observe_dependency("supabase_postgrest", f"{self.table}.select"):
+            resp = (
+                self.client.table(self.table)
+                .select("uid,post_id")
+                .order("uid")
+                .order("post_id")
+                .range(offset, offset + limit - 1)
+                .execute()
+            )
+        return list(resp.data or [])
+
+
+class _FileLock:
+    """プロセス間の排他（gunicorn などで複数ワーカーが同じ empathy.db を使う場合）。"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class EmpathyReplicator:
+    """ローカル SQLite の共感データを Supabase へ書き戻す（write-behind）。
+
+    トグルはローカルに commit するだけで返し、outbox に積まれた変更をバックグラウンドで
+    batch_size 件ずつまとめて upsert / delete する。送信に成功してから高水位線を進めるため、
+    途中で落ちても未反映分は次回に再送される（送信は冪等）。
+    同じ DB を使うプロセスが複数あっても、送信するのはロックを取れた1プロセスだけ。
+
+    送信役になったプロセスは、最初に Supabase の共感データへローカルを揃える（hydrate）。
+    同じ DB で hydrate_interval_sec 以内に済んでいれば飛ばすので、ワーカーの入れ替えのたびに
+    全件を読み直すことはない。Supabase に繋がらなくても起動は止めず、送信と同じく間隔を空けて再試行する。
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        remote: Any,
+        empathy_table: Table,
+        *,
+        batch_size: int = 500,
+        interval_sec: float = 1.0,
+        max_backoff_sec: float = 30.0,
+        hydrate_interval_sec: float = 600.0,
+        lock_dir: Optional[Path] = None,
+    ) -> None:
+        self.engine = engine
+        self.remote = remote
+        self.empathy_table = empathy_table
+        self.batch_size = batch_size
+        self.interval_sec = interval_sec
+        self.max_backoff_sec = max_backoff_sec
+        self.hydrate_interval_sec = hydrate_interval_sec
+        self.last_error: Optional[str] = None
+        # hydrate でローカルの行が変わった後に呼ぶ（プロセス内の索引を捨てるなど）
+        self.on_hydrated: Optional[Callable[[], None]] = None
+        if lock_dir is None:
+            database = engine.url.database
+            lock_dir = Path(database).resolve().parent if database and database != ":memory:" else Path(".")
+        self._leader_lock = _FileLock(lock_dir / "empathy.sync.lock")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        metadata.create_all(bind=engine)
+
+    @classmethod
+    def from_env(cls, engine: Engine, empathy_table: Table) -> "EmpathyReplicator":
+        return cls(
+            engine,
+            SupabaseEmpathyRemote.from_env(),
+            empathy_table,
+            batch_size=int(get_env("EMPATHY_SYNC_BATCH_SIZE", "500") or "500"),
+            interval_sec=float(get_env("EMPATHY_SYNC_INTERVAL_SEC", "1.0") or "1.0"),
+            hydrate_interval_sec=float(get_env("EMPATHY_HYDRATE_INTERVAL_SEC", "600") or 0),
+        )
+
+    def _state(self, conn: Any, name: str) -> int:
+        value = conn.execute(select(sync_state_table.c.value).where(sync_state_table.c.name == name)).scalar()
+        return int(value or 0)
+
+    def _set_state(self, conn: Any, name: str, value: int) -> None:
+        conn.execute(insert(sync_state_table).prefix_with("OR REPLACE").values(name=name, value=value))
+
+    def pending(self) -> int:
+        with self.engine.connect() as conn:
+            hwm = self._state(conn, HWM_KEY)
+            return int(conn.execute(select(func.count()).select_from(outbox_table).where(outbox_table.c.seq > hwm)).scalar_one())
+
+    def hydrate(self, page_size: int = 1000) -> int:
+        """Supabase の共感データへローカルを揃え、追加・削除した行数を返す（送信ループの外から使う）。"""
+        self._leader_lock.acquire(blocking=True)
+        try:
+            return self._hydrate(page_size) or 0
+        finally:
+            self._leader_lock.release()
+
+    def _hydrate(self, page_size: int = 1000, *, force: bool = True) -> Optional[int]:
+        """送信のロックを持った状態で呼ぶ。force=False なら直近に済んでいれば何もせず None を返す。
+
+        先に outbox の未反映分を送ってから全件を読み、Supabase にない行はローカルからも消す
+        （他のコンテナでの解除を取り込むため）。送信のロックを持ったまま行うので、
+        読み込み中に他のプロセスがトグルした行は outbox に残っており、触らない。
+        同期を有効にする前からローカルにある行は、初回だけ outbox へ積んで Supabase へ送る。
+        """
+        if not force:
+            with self.engine.connect() as conn:
+                if time.time() - self._state(conn, HYDRATED_AT_KEY) < self.hydrate_interval_sec:
+                    return None
+        # 取り込みが終わるまで送信のロックを離さない。途中で他のプロセスが送って高水位線を進めると、
+        # 読み込んだ Supabase の行に無く、送信待ちにも無い行として新しい共感を消してしまう
+        with self.engine.begin() as conn:
+            if not self._state(conn, HYDRATED_KEY):
+                conn.execute(
+                    insert(outbox_table).from_select(
+                        ["uid", "post_id", "liked"],
+                        select(self.empathy_table.c.uid, self.empathy_table.c.post_id, literal(True)),
+                    )
+                )
+                self._set_state(conn, HYDRATED_KEY, 1)
+        self.flush()
+
+        remote_rows = set()
+        offset = 0
+        while True:
+            page = self.remote.fetch_page(offset, page_size)
+            remote_rows |= {(r["uid"], r["post_id"]) for r in page}
+            if len(page) < page_size:
+                break
+            offset += page_size
+
+        table = self.empathy_table
+        with self.engine.begin() as conn:
+            hwm = self._state(conn, HWM_KEY)
+            pending = set(
+                conn.execute(select(outbox_table.c.uid, outbox_table.c.post_id).where(outbox_table.c.seq > hwm)).all()
+            )
+            local_rows = set(conn.execute(select(table.c.uid, table.c.post_id)).all())
+            added = [{"uid": u, "post_id": p} for u, p in remote_rows - local_rows - pending]
+            removed = [{"uid": u, "post_id": p} for u, p in local_rows - remote_rows - pending]
+            if added:
+                conn.execute(insert(table).prefix_with("OR IGNORE"), added)
+            if removed:
+                conn.execute(
+                    delete(table).where(table.c.uid == bindparam("b_uid"), table.c.post_id == bindparam("b_post_id")),
+                    [{"b_uid": r["uid"], "b_post_id": r["post_id"]} for r in removed],
+                )
+            self._set_state(conn, HYDRATED_AT_KEY, int(time.time()))
+        if self.on_hydrated is not None:
+            self.on_hydrated()
+        return len(added) + len(removed)
+
+    def sync_once(self) -> int:
+        """未反映の変更を最大 batch_size 件送って高水位線を進め、処理した件数を返す。"""
+        with self.engine.connect() as conn:
+            hwm = self._state(conn, HWM_KEY)
+            rows = conn.execute(
+                select(outbox_table).where(outbox_table.c.seq > hwm).order_by(outbox_table.c.seq).limit(self.batch_size)
+            ).all()
+        if not rows:
+            OUTBOX_PENDING.set(0)
+            return 0
+        upserts, deletes = coalesce(rows)
+        if upserts:
+            self.remote.upsert(upserts)
+        for uid, post_ids in deletes.items():
+            self.remote.delete(uid, post_ids)
+        last_seq = rows[-1].seq
+        with self.engine.begin() as conn:
+            self._set_state(conn, HWM_KEY, last_seq)
+            conn.execute(delete(outbox_table).where(outbox_table.c.seq <= last_seq))
+        OUTBOX_REPLICATED.inc(len(rows))
+        OUTBOX_PENDING.set(self.pending())
+        return len(rows)
+
+    def flush(self) -> None:
+        while self.sync_once() >= self.batch_size:
+            pass
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="empathy-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, flush: bool = True) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        try:
+            if flush and self._leader_lock.acquire(blocking=False):
+                self.flush()
+        except Exception as e:
+            # 送れなかった分は outbox に残り、次回の起動時に送られる
+            self.last_error = f"{type(e).__name__}: {e}"[:500]
+        finally:
+            self._leader_lock.release()
+
+    def _run(self) -> None:
+        backoff = self.interval_sec
+        hydrated = False
+        while not self._stop.is_set():
+            if not self._leader_lock.acquire(blocking=False):
+                # 他のプロセスが送信中。そのプロセスが終了したら引き継ぐ
+                self._stop.wait(self.interval_sec)
+                continue
+            try:
+                if not hydrated:
+                    self._hydrate(force=False)
+                    hydrated = True
+                sent = self.sync_once()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"[:500]
+                logger.warning("empathy sync failed (retry in %.0fs): %s", backoff, self.last_error)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff_sec)
+                continue
+            backoff = self.interval_sec
+            if sent < self.batch_size:
+                # 次のバッチが溜まるまで待つ（溜まっている間は待たずに続けて送る）
+                self._stop.wait(self.interval_sec)
+
+
+__all__ = [
+    "EmpathyReplicator",
+    "SupabaseEmpathyRemote",
+    "coalesce",
+    "outbox_table",
+    "record_change",
+    "sync_enabled",
+    "sync_state_table",
+]
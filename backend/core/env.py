@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+
+def get_env(name: str, default: Optional[str] = None) -> Optional[str]:
+    """環境変数を読む。未設定・空白だけの場合は default を返す。"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip() or default
+
+
+__all__ = ["get_env"]
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import JSONResponse
+
+from backend.core.env import get_env
+from backend.core.metrics import REGISTRY
+
+
+DEPENDENCY_UP = REGISTRY.gauge("dependency_up", "直近の疎通確認の結果（1=正常, 0=異常）", ("dependency",))
+SHED_REQUESTS = REGISTRY.counter("shed_requests_total", "依存先の異常で即座に 503 を返したリクエスト数", ("dependency",))
+
+
+@dataclass
+class Probe:
+    name: str
+    check: Callable[[], None]  # 失敗時は例外を投げる
+    # critical な依存先が落ちている間は /readyz が 503 になる
+    critical: bool = False
+
+
+@dataclass
+class ProbeResult:
+    ok: bool
+    critical: bool
+    latency_ms: float
+    checked_at: float
+    consecutive_failures: int = 0
+    error: Optional[str] = None
+
+
+class HealthProber:
+    """依存先の疎通確認をバックグラウンドで interval_sec ごとに行い、結果を保持する。
+
+    /readyz や shed_when_unhealthy は保持している結果を読むだけなので、何回ポーリングされても
+    依存先への問い合わせは interval_sec ごとに1回で変わらない。
+    failure_threshold 回続けて失敗するまでは正常とみなす（一時的な失敗で負荷を切り離さない）。
+    """
+
+    def __init__(self, interval_sec: float = 15.0, timeout_sec: float = 3.0, failure_threshold: int = 2) -> None:
+        self.interval_sec = interval_sec
+        self.timeout_sec = timeout_sec
+        self.failure_threshold = failure_threshold
+        self.probes: List[Probe] = []
+        self.results: Dict[str, ProbeResult] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, probes: List[Probe]) -> None:
+        self.probes = list(probes)
+        if not self.probes:
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=len(self.probes), thread_name_prefix="health-probe")
+        self._thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._executor is not None:
+            # 応答の無い確認を待たずに終了する
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval_sec)
+
+    def run_once(self) -> None:
+        """全ての確認を並列に実行し、timeout_sec 以内に終わらないものは失敗として記録する。"""
+        executor = self._executor or ThreadPoolExecutor(max_workers=max(1, len(self.probes)))
+        started: Dict[str, Future] = {}
+        submitted_at = time.monotonic()
+        for probe in self.probes:
+            previous = self._inflight.get(probe.name)
+            if previous is not None and not previous.done():
+                # 前回の確認がまだ返ってこない。重ねて投げずに失敗とする
+                continue
+            started[probe.name] = self._inflight[probe.name] = executor.submit(self._timed, probe.check)
+        deadline = submitted_at + self.timeout_sec
+        for probe in self.probes:
+            future = started.get(probe.name)
+            error: Optional[str] = "timeout"
+            latency = self.timeout_sec
+            if future is not None:
+                try:
+                    latency = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                    error = None
+                except FutureTimeoutError:
+                    pass
+                except Exception as e:
+                    latency = time.monotonic() - submitted_at
+                    error = f"{type(e).__name__}: {e}"[:300]
+            self._record(probe, error, latency)
+        if executor is not self._executor:
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _timed(check: Callable[[], None]) -> float:
+        start = time.monotonic()
+        check()
+        return time.monotonic() - start
+
+    def _record(self, probe: Probe, error: Optional[str], latency_sec: float) -> None:
+        previous = self.results.get(probe.name)
+        failures = 0 if error is None else (previous.consecutive_failures if previous else 0) + 1
+        self.results[probe.name] = ProbeResult(
+            ok=error is None,
+            critical=probe.critical,
+            latency_ms=round(latency_sec * 1000, 1),
+            checked_at=time.time(),
+            consecutive_failures=failures,
+            error=error,
+        )
+        DEPENDENCY_UP.labels(probe.name).set(1 if error is None else 0)
+
+    def healthy(self, name: str) -> bool:
+        """name の依存先を正常とみなすか。未確認・未登録の依存先は正常扱い。"""
+        result = self.results.get(name)
+        if result is None:
+            return True
+        if time.time() - result.checked_at > self.interval_sec * 3 + self.timeout_sec:
+            # 確認自体が止まっている
+            return False
+        return result.consecutive_failures < self.failure_threshold
+
+    def readiness(self) -> Dict[str, Any]:
+        # 確認スレッドが書き換えている途中でも読めるよう、写しを取ってから使う
+        dependencies = {name: asdict(result) for name, result in dict(self.results).items()}
+        if self.probes and len(self.results) < len(self.probes):
+            status = "starting"
+        elif any(p.critical and not self.healthy(p.name) for p in self.probes):
+            status = "unavailable"
+        elif any(not self.healthy(p.name) for p in self.probes):
+            status = "degraded"
+        else:
+            status = "ok"
+        return {"status": status, "dependencies": dependencies}
+
+
+# ===== 依存先ごとの疎通確認 =====
+
+def _supabase_check(timeout_sec: float) -> Callable[[], None]:
+    import requests
+
+    url = (get_env("SUPABASE_URL") or "").rstrip("/") + "/auth/v1/health"
+    key = get_env("SUPABASE_ANON_KEY") or ""
+    session = requests.Session()
+
+    def check() -> None:
+        r = session.get(url, headers={"apikey": key}, timeout=timeout_sec)
+        if r.status_code >= 500:
+            raise RuntimeError(f"HTTP {r.status_code}")
+
+    return check
+
+
+def _lazy(factory: Callable[[], Any], method: str) -> Callable[[], None]:
+    """クライアントを初回の確認時に1度だけ作る（起動時に重い SDK を読み込まない）。"""
+    holder: Dict[str, Any] = {}
+
+    def check() -> None:
+        if "client" not in holder:
+            holder["client"] = factory()
+        getattr(holder["client"], method)()
+
+    return check
+
+
+def _freepik_client() -> Any:
+    from backend.generate_image.client import FreepikImageClient
+
+    return FreepikImageClient.from_env()
+
+
+def _storage_client() -> Any:
+    from backend.generate_image.storage import storage_from_env
+
+    return storage_from_env()
+
+
+def _empathy_db_check() -> None:
+    # 共感 API の empathy.db（sqlite）。ローカルの DB なので設定の有無に関係なく確認する
+    from sqlalchemy import text
+
+    from backend.reaction.empathy import engine
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def default_probes(timeout_sec: float = 3.0) -> List[Probe]:
+    """共感 API の DB（sqlite）は常に、それ以外は設定されている依存先だけを確認対象にする。
+
+    HEALTH_CRITICAL（既定: supabase,sqlite）に含まれる依存先が落ちると /readyz は 503 を返す。
+    """
+    critical = {n.strip() for n in (get_env("HEALTH_CRITICAL", "supabase,sqlite") or "").split(",") if n.strip()}
+    probes: List[Probe] = [Probe("sqlite", _empathy_db_check, "sqlite" in critical)]
+    if get_env("SUPABASE_URL"):
+        probes.append(Probe("supabase", _supabase_check(timeout_sec), "supabase" in critical))
+    if get_env("FREEPIK_API_KEY") or get_env("FREEPIK_TOKEN"):
+        probes.append(Probe("freepik", _lazy(_freepik_client, "ping"), "freepik" in critical))
+    if get_env("R2_BUCKET") or get_env("GOOGLE_SERVICE_ACCOUNT_FILE") or get_env("GOOGLE_SERVICE_ACCOUNT_JSON"):
+        probes.append(Probe("storage", _lazy(_storage_client, "ping"), "storage" in critical))
+    if get_env("SHARED_CACHE_PATH"):
+        from backend.core.cache import shared_cache
+
+        probes.append(Probe("shared_cache", _lazy(shared_cache, "ping"), "shared_cache" in critical))
+    return probes
+
+
+prober = HealthProber(
+    interval_sec=float(get_env("HEALTH_PROBE_INTERVAL_SEC", "15") or "15"),
+    timeout_sec=float(get_env("HEALTH_PROBE_TIMEOUT_SEC", "3") or "3"),
+    failure_threshold=int(get_env("HEALTH_FAILURE_THRESHOLD", "2") or "2"),
+)
+
+
+def shed_when_unhealthy(*dependencies: str) -> Callable[[], Any]:
+    """依存先が異常と分かっている間は、上流のタイムアウトを待たずに 503 を返す依存関数。"""
+
+    # 保持している結果を読むだけなので、スレッドプールに回さないよう async にする
+    async def dependency() -> None:
+        for name in dependencies:
+            if not prober.healthy(name):
+                SHED_REQUESTS.labels(name).inc()
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"{name} に接続できません。しばらくしてから再度お試しください",
+                    headers={"Retry-After": str(int(prober.interval_sec))},
+                )
+
+    return dependency
+
+
+router = APIRouter(tags=["health"], include_in_schema=False)
+
+_HEALTHZ_BODY = b'{"status":"ok"}'
+
+
+@router.get("/healthz")
+async def healthz() -> Response:
+    """生存確認。依存先には触れず、常に同じ応答を返す。"""
+    return Response(content=_HEALTHZ_BODY, media_type="application/json")
+
+
+@router.get("/readyz")
+async def readyz() -> JSONResponse:
+    """受け付け可否。バックグラウンドの確認結果を返すだけで、依存先へは問い合わせない。"""
+    body = prober.readiness()
+    return JSONResponse(body, status_code=503 if body["status"] in ("starting", "unavailable") else 200)
+
+
+__all__ = [
+    "HealthProber",
+    "Probe",
+    "ProbeResult",
+    "default_probes",
+    "prober",
+    "router",
+    "shed_when_unhealthy",
+]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from backend.core.metrics import REGISTRY
+
+LIKED_INDEX_LOOKUPS = REGISTRY.counter(
+    "liked_index_lookups_total", "共感状態の問い合わせ（hit=メモリのみ / load=DB から読み込み / bypass=索引対象外）", ("result",)
+)
+
+
+class LikedIndex:
+    """ユーザーごとの「共感した post_id の集合」をプロセス内に保持する索引。
+
+    初めて問い合わせたユーザーの分を loader でまとめて読み込み、以降はメモリだけで答える。
+    全ユーザー合計の post_id 数が max_ids を超えると、最も使われていないユーザーから捨てる。
+    max_ids_per_user を超えるユーザーは索引に載せず、呼び出し側で DB を引く。
+
+    索引はプロセス内のものなので、同じ DB に別プロセスから書き込む構成では使わないこと。
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Iterable[str]],
+        *,
+        max_ids: int = 200_000,
+        max_ids_per_user: int = 10_000,
+        stripes: int = 64,
+    ) -> None:
+        self.loader = loader
+        self.max_ids = max_ids
+        self.max_ids_per_user = min(max_ids_per_user, max_ids)
+        self._sets: "OrderedDict[str, Set[str]]" = OrderedDict()
+        self._size = 0
+        # 読み込み中のユーザー。読み込みの間にトグルがあれば消して、古い結果を載せない
+        self._loading: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._user_locks: List[threading.Lock] = [threading.Lock() for _ in range(max(1, stripes))]
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_ids > 0
+
+    def user_lock(self, uid: str) -> threading.Lock:
+        """同じユーザーのトグルを直列にするためのロック（DB の更新と索引の更新の順序を揃える）。"""
+        return self._user_locks[hash(uid) % len(self._user_locks)]
+
+    def contains(self, uid: str, post_id: str) -> Optional[bool]:
+        """uid が post_id に共感中か。索引に載せられないユーザーなら None。"""
+        if not self.enabled:
+            LIKED_INDEX_LOOKUPS.labels("bypass").inc()
+            return None
+        token = object()
+        with self._lock:
+            liked = self._sets.get(uid)
+            if liked is not None:
+                self._sets.move_to_end(uid)
+                LIKED_INDEX_LOOKUPS.labels("hit").inc()
+                return post_id in liked
+            self._loading[uid] = token
+
+        loaded = set(self.loader(uid))
+        with self._lock:
+            if self._loading.get(uid) is token:
+                del self._loading[uid]
+                if len(loaded) <= self.max_ids_per_user:
+                    self._store(uid, loaded)
+        if len(loaded) > self.max_ids_per_user:
+            LIKED_INDEX_LOOKUPS.labels("bypass").inc()
+            return None
+        LIKED_INDEX_LOOKUPS.labels("load").inc()
+        return post_id in loaded
+
+    def apply(self, uid: str, post_id: str, liked: bool) -> None:
+        """commit 済みのトグル結果を反映する。未読み込みのユーザーは何もしない（次の問い合わせで読む）。"""
+        with self._lock:
+            current = self._sets.get(uid)
+            if current is None:
+                self._loading.pop(uid, None)
+                return
+            if liked and post_id not in current:
+                if len(current) >= self.max_ids_per_user:
+                    self._discard(uid)
+                    return
+                current.add(post_id)
+                self._size += 1
+            elif not liked and post_id in current:
+                current.remove(post_id)
+                self._size -= 1
+            self._sets.move_to_end(uid)
+            self._evict()
+
+    def discard(self, uid: str) -> None:
+        with self._lock:
+            self._loading.pop(uid, None)
+            self._discard(uid)
+
+    def clear(self) -> None:
+        """すべて捨てる（読み込み中の結果も載せない）。DB の行がまとめて変わった後に呼ぶ。"""
+        with self._lock:
+            self._loading.clear()
+            self._sets.clear()
+            self._size = 0
+
+    def _store(self, uid: str, liked: Set[str]) -> None:
+        self._discard(uid)
+        self._sets[uid] = liked
+        self._size += len(liked)
+        self._evict()
+
+    def _discard(self, uid: str) -> None:
+        removed = self._sets.pop(uid, None)
+        if removed is not None:
+            self._size -= len(removed)
+
+    def _evict(self) -> None:
+        while self._size > self.max_ids and self._sets:
+            _, removed = self._sets.popitem(last=False)
+            self._size -= len(removed)
+
+    def __len__(self) -> int:
+        """保持している post_id の合計数。"""
+        return self._size
+
+    def users(self) -> int:
+        return len(self._sets)
+
+
+__all__ = ["LikedIndex"]
@@ -0,0 +1,377 @@
+from __future__ import annotations
+
+import asyncio
+import hmac
+import sys
+import threading
+import time
+from collections import Counter as _Counter
+from types import CodeType, FrameType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from backend.core.env import get_env
+from backend.core.metrics import REGISTRY
+
+
+MAX_PROFILE_SEC = 60
+MAX_STACK_DEPTH = 64
+MAX_BLOCKING_STACKS = 500
+
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    "event_loop_lag_seconds",
+    "イベントループの遅延（秒）",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    # site-packages 以下はパッケージ名から、アプリ内は backend/ から表示する
+    for marker in ("site-packages/", "backend/"):
+        idx = filename.rfind(marker)
+        if idx >= 0:
+            filename = filename[idx + (len(marker) if marker == "site-packages/" else 0):]
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame: Optional[FrameType]) -> str:
+    """フレームを flamegraph.pl / speedscope 互換の collapsed 形式（root;...;leaf）にする。"""
+    parts: List[str] = []
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        parts.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+def _innermost_app_frame(stack: str) -> str:
+    # ループを止めた呼び出し元として、最も内側のアプリ内（backend/）フレームを示す
+    for part in reversed(stack.split(";")):
+        if "(backend/" in part:
+            return part
+    return stack.rsplit(";", 1)[-1]
+
+
+class SamplingProfiler:
+    """sys._current_frames() を一定間隔で読むサンプリングプロファイラ。
+
+    計測対象のコードには手を入れないため、有効化中もオーバーヘッドは間隔に比例して小さい。
+    select が設定されている場合は、select(ident -> フレーム) が返したスレッドだけを記録する。
+    """
+
+    def __init__(self, interval_sec: float = 0.005) -> None:
+        self.interval_sec = interval_sec
+        self.samples: _Counter = _Counter()
+        self.select: Optional[Callable[[Dict[int, FrameType]], Iterable[int]]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        while not self._stop.wait(self.interval_sec):
+            frames = sys._current_frames()
+            frames.pop(own, None)
+            if self.select is not None:
+                frames = {ident: frames[ident] for ident in self.select(frames) if ident in frames}
+            for ident, frame in frames.items():
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack = collapse_stack(frame)
+                if stack:
+                    self.samples[f"{names.get(ident, ident)};{stack}"] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def _runs_code(frame: Optional[FrameType], codes: Set[CodeType]) -> bool:
+    while frame is not None:
+        if frame.f_code in codes:
+            return True
+        frame = frame.f_back
+    return False
+
+
+class RequestProfileSession:
+    """ルートテンプレート（scope["route"].path）が一致する次の K 件のリクエストだけをサンプリングする。
+
+    ルーティングが済むまで対象か分からないため、処理中のリクエストを全て覚えておき、
+    scope["route"] が決まった時点で判定する。サンプルを取るのは、対象リクエストの
+    エンドポイント関数を実行中のスレッド（async ならイベントループ、def ならスレッドプール）だけ。
+    """
+
+    def __init__(self, route: str, count: int, interval_sec: float) -> None:
+        self.route = route
+        self.remaining = count
+        self.done = asyncio.Event()
+        self._lock = threading.Lock()
+        # id(scope) -> scope（処理中のリクエスト）
+        self._in_flight: Dict[int, Dict[str, Any]] = {}
+        # 判定済みのリクエスト（True=対象）
+        self._decided: Dict[int, bool] = {}
+        self.profiler = SamplingProfiler(interval_sec)
+        self.profiler.select = self.select_threads
+
+    def track(self, scope: Dict[str, Any]) -> None:
+        with self._lock:
+            self._in_flight[id(scope)] = scope
+
+    def untrack(self, scope: Dict[str, Any]) -> None:
+        with self._lock:
+            self._decide(scope)
+            self._in_flight.pop(id(scope), None)
+            self._decided.pop(id(scope), None)
+            finished = self.remaining <= 0 and not any(self._decided.values())
+        if finished:
+            self.done.set()
+
+    def select_threads(self, frames: Dict[int, FrameType]) -> List[int]:
+        with self._lock:
+            codes: Set[CodeType] = set()
+            for scope in self._in_flight.values():
+                if self._decide(scope):
+                    code = getattr(getattr(scope.get("route"), "endpoint", None), "__code__", None)
+                    if code is not None:
+                        codes.add(code)
+        if not codes:
+            return []
+        return [ident for ident, frame in frames.items() if _runs_code(frame, codes)]
+
+    def _decide(self, scope: Dict[str, Any]) -> bool:
+        key = id(scope)
+        decided = self._decided.get(key)
+        if decided is not None:
+            return decided
+        route = scope.get("route")
+        if route is None:
+            # まだルーティング前
+            return False
+        matched = getattr(route, "path", None) == self.route and self.remaining > 0
+        if matched:
+            self.remaining -= 1
+        self._decided[key] = matched
+        return matched
+
+
+class LoopMonitor:
+    """イベントループの遅延を計測し、ループを止めている呼び出しのスタックを集計する。
+
+    ループ上のタスクが tick_sec ごとに心拍を更新し、監視スレッドは心拍が
+    block_threshold_sec 以上途絶えたときのループスレッドのスタックを記録する
+    （async def 内の同期 I/O、例: Supabase クライアントや requests の呼び出しを見つける）。
+    """
+
+    def __init__(self, tick_sec: float = 0.05, block_threshold_sec: float = 0.1) -> None:
+        self.tick_sec = tick_sec
+        self.block_threshold_sec = block_threshold_sec
+        self.max_lag_sec = 0.0
+        # スタック -> [回数, 合計停止秒]
+        self.blocking: Dict[str, List[float]] = {}
+        self._heartbeat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _tick(self) -> None:
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(self.tick_sec)
+            now = time.monotonic()
+            lag = max(0.0, now - before - self.tick_sec)
+            self._heartbeat = now
+            self.max_lag_sec = max(self.max_lag_sec, lag)
+            EVENT_LOOP_LAG.observe(lag)
+
+    def _watch(self) -> None:
+        current_beat: Optional[float] = None
+        current: Optional[List[float]] = None
+        last = 0.0
+        while not self._stop.wait(self.tick_sec):
+            beat = self._heartbeat
+            stalled = time.monotonic() - beat
+            if stalled < self.block_threshold_sec + self.tick_sec:
+                current_beat, current = None, None
+                continue
+            if beat == current_beat and current is not None:
+                # 同じ停止が続いている間は停止時間だけ加算する
+                with self._lock:
+                    current[1] += stalled - last
+                last = stalled
+                continue
+            frame = sys._current_frames().get(self._loop_thread or 0)
+            if frame is None:
+                continue
+            stack = collapse_stack(frame)
+            with self._lock:
+                current = self.blocking.get(stack)
+                if current is None:
+                    if len(self.blocking) >= MAX_BLOCKING_STACKS:
+                        continue
+                    current = self.blocking[stack] = [0, 0.0]
+                current[0] += 1
+                current[1] += stalled
+            current_beat, last = beat, stalled
+
+    def top_blocking(self, limit: int = 10) -> List[Dict[str, Any]]:
+        with self._lock:
+            items: List[Tuple[str, List[float]]] = list(self.blocking.items())
+        items.sort(key=lambda kv: kv[1][1], reverse=True)
+        return [
+            {
+                "app_frame": _innermost_app_frame(stack),
+                "leaf": stack.rsplit(";", 1)[-1],
+                "count": int(count),
+                "observed_stall_sec": round(total, 3),
+                "stack": stack,
+            }
+            for stack, (count, total) in items[:limit]
+        ]
+
+
+loop_monitor = LoopMonitor(
+    block_threshold_sec=float(get_env("PROFILER_BLOCK_THRESHOLD_SEC", "0.1") or "0.1"),
+)
+
+_profile_lock = asyncio.Lock()
+_request_session: Optional[RequestProfileSession] = None
+
+
+def require_admin(token: Optional[str]) -> None:
+    expected = get_env("ADMIN_TOKEN")
+    if not expected:
+        # 管理トークン未設定の環境ではエンドポイントごと無効
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token or not hmac.compare_digest(token, expected):
+        raise HTTPException(status_code=403, detail="管理者トークンが不正です")
+
+
+class ProfileRequestsMiddleware:
+    """RequestProfileSession が有効な間だけ、処理中のリクエストをセッションに知らせる。"""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        session = _request_session
+        if session is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        session.track(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session.untrack(scope)
+
+
+router = APIRouter(prefix="/admin/profile", tags=["admin"], include_in_schema=False)
+
+
+@router.post("", response_class=PlainTextResponse)
+async def profile_for(
+    seconds: float = Query(default=10.0, gt=0, le=MAX_PROFILE_SEC),
+    interval_ms: float = Query(default=5.0, ge=1, le=1000),
+    x_admin_token: Optional[str] = Header(default=None),
+) -> PlainTextResponse:
+    """N 秒間プロセス全体をサンプリングし、collapsed stacks を返す。"""
+    require_admin(x_admin_token)
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="別のプロファイリングが実行中です")
+    async with _profile_lock:
+        profiler = SamplingProfiler(interval_ms / 1000.0)
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await asyncio.to_thread(profiler.stop)
+    return PlainTextResponse(profiler.collapsed())
+
+
+@router.post("/requests", response_class=PlainTextResponse)
+async def profile_requests(
+    route: str = Query(..., description="対象のルートテンプレート（例: /auth/login, /profile/{user_id}）"),
+    count: int = Query(default=10, ge=1, le=1000),
+    timeout: float = Query(default=60.0, gt=0, le=600),
+    interval_ms: float = Query(default=2.0, ge=1, le=1000),
+    x_admin_token: Optional[str] = Header(default=None),
+) -> PlainTextResponse:
+    """route に一致する次の count 件のリクエストのエンドポイント実行中だけサンプリングし、collapsed stacks を返す。"""
+    global _request_session
+    require_admin(x_admin_token)
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="別のプロファイリングが実行中です")
+    async with _profile_lock:
+        session = RequestProfileSession(route, count, interval_ms / 1000.0)
+        session.profiler.start()
+        _request_session = session
+        try:
+            await asyncio.wait_for(session.done.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            _request_session = None
+            await asyncio.to_thread(session.profiler.stop)
+    profiled = count - max(session.remaining, 0)
+    return PlainTextResponse(
+        session.profiler.collapsed(),
+        headers={"X-Profiled-Requests": str(profiled)},
+    )
+
+
+@router.get("/loop")
+async def loop_stats(
+    limit: int = Query(default=10, ge=1, le=100),
+    x_admin_token: Optional[str] = Header(default=None),
+) -> Dict[str, Any]:
+    """イベントループ遅延の最大値と、ループを止めていた呼び出しの上位を返す。"""
+    require_admin(x_admin_token)
+    return {
+        "max_lag_sec": round(loop_monitor.max_lag_sec, 4),
+        "block_threshold_sec": loop_monitor.block_threshold_sec,
+        "top_blocking": loop_monitor.top_blocking(limit),
+    }
+
+
+__all__ = [
+    "LoopMonitor",
+    "ProfileRequestsMiddleware",
+    "SamplingProfiler",
+    "collapse_stack",
+    "loop_monitor",
+    "router",
+]
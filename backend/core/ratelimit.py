@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+try:
+    from fastapi import HTTPException, Request  # rate_limit() の依存関数でのみ使用
+except ImportError:  # generate_image CLI など FastAPI を入れない環境でも TokenBucket は使える
+    HTTPException = Request = None  # type: ignore
+
+from backend.core.env import get_env
+from backend.core.metrics import REGISTRY
+
+
+RATE_LIMITED = REGISTRY.counter("rate_limited_total", "レート制限で拒否したリクエスト数", ("route", "scope"))
+
+_PERIODS = {"second": 1.0, "sec": 1.0, "s": 1.0, "minute": 60.0, "min": 60.0, "m": 60.0, "hour": 3600.0, "h": 3600.0}
+
+
+def parse_rate(rate: str) -> float:
+    """"10/minute" のような表記を 1 秒あたりの回数にする。"""
+    try:
+        count, period = rate.strip().split("/", 1)
+        return float(count) / _PERIODS[period.strip().lower()]
+    except (ValueError, KeyError):
+        raise ValueError(f"レートの形式が不正です: {rate!r}（例: 10/minute）") from None
+
+
+class RateLimitExceeded(Exception):
+    """上限を超えた。retry_after 秒後には1回分の枠が空く。"""
+
+    def __init__(self, retry_after: float, scope: str = "") -> None:
+        super().__init__(f"rate limit exceeded ({scope}), retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+        self.scope = scope
+
+
+class _Shard:
+    __slots__ = ("lock", "buckets")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # key -> (残りトークン, 最終更新時刻)。LRU 順に並べ、上限を超えたら古いものから捨てる
+        self.buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+
+@dataclass
+class TokenBucket:
+    """キーごとのトークンバケット。
+
+    状態はキーあたり (トークン数, 時刻) の2値のみで、キー数は max_keys で頭打ちになる
+    （追い出されたキーは満タンから再開するため、制限が緩む方向にしか倒れない）。
+    ロックはキーのハッシュで shards 個に分け、別キー同士の競合を避ける。
+    """
+
+    rate_per_sec: float
+    burst: float
+    max_keys: int = 100_000
+    shards: int = 16
+    _shards: List[_Shard] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._shards = [_Shard() for _ in range(self.shards)]
+        self._per_shard = max(1, self.max_keys // self.shards)
+
+    def hit(self, key: str, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """1回分を消費する。許可なら 0、拒否ならトークンが貯まるまでの秒数を返す。"""
+        now = time.monotonic() if now is None else now
+        shard = self._shards[zlib.crc32(key.encode("utf-8")) % self.shards]
+        with shard.lock:
+            tokens, last = shard.buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate_per_sec)
+            if tokens >= cost:
+                shard.buckets[key] = (tokens - cost, now)
+                shard.buckets.move_to_end(key)
+                if len(shard.buckets) > self._per_shard:
+                    shard.buckets.popitem(last=False)
+                return 0.0
+            shard.buckets[key] = (tokens, now)
+            shard.buckets.move_to_end(key)
+            return (cost - tokens) / self.rate_per_sec
+
+    def __len__(self) -> int:
+        return sum(len(s.buckets) for s in self._shards)
+
+
+def rate_limit_enabled() -> bool:
+    return (get_env("RATE_LIMIT_ENABLED", "1") or "1").lower() not in ("0", "false", "no", "off")
+
+
+def client_ip(request: Any) -> str:
+    # リバースプロキシ配下では RATE_LIMIT_TRUST_FORWARDED=1 で X-Forwarded-For の先頭を使う
+    if (get_env("RATE_LIMIT_TRUST_FORWARDED", "0") or "0") in ("1", "true"):
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",", 1)[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def user_key(request: Any) -> Optional[str]:
+    """Bearer トークン、無ければ JSON ボディの email をユーザーの識別子にする。"""
+    authorization = request.headers.get("authorization") or ""
+    if authorization.lower().startswith("bearer ") and authorization[7:].strip():
+        return "t:" + hashlib.sha256(authorization[7:].strip().encode("utf-8")).hexdigest()[:32]
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            # Starlette がボディをキャッシュするため、ハンドラ側でも再度読める
+            body = json.loads(await request.body() or b"null")
+        except ValueError:
+            return None
+        email = body.get("email") if isinstance(body, dict) else None
+        if isinstance(email, str) and email.strip():
+            return "e:" + email.strip().lower()
+    return None
+
+
+def _route(request: Any) -> str:
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or request.url.path
+
+
+@dataclass
+class RateLimit:
+    """1つの制限ルール。scope は "ip" / "user" / "user_ip" / "route"（ルート全体で共有）。
+
+    ip と user はルートごとに別の枠になる。user_ip は (ユーザー, IP) の組ごとの枠で、
+    他人のメールアドレスで連打されても本人の IP からのリクエストは締め出されない。プロセス内の状態なので、
+    複数ワーカーで動かす場合の実効上限はワーカー数倍になる。
+    """
+
+    scope: str
+    rate: str
+    burst: Optional[float] = None
+    max_keys: int = 100_000
+    bucket: TokenBucket = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.scope not in ("ip", "user", "user_ip", "route"):
+            raise ValueError(f"scope は ip / user / user_ip / route のいずれかです: {self.scope!r}")
+        rate_per_sec = parse_rate(self.rate)
+        burst = self.burst if self.burst is not None else max(1.0, rate_per_sec * 60)
+        self.bucket = TokenBucket(rate_per_sec, burst, max_keys=self.max_keys)
+
+    async def key_for(self, request: Any, route: str) -> Optional[str]:
+        if self.scope == "route":
+            return route
+        if self.scope == "ip":
+            return f"{route}|{client_ip(request)}"
+        user = await user_key(request)
+        if not user:
+            return None
+        if self.scope == "user_ip":
+            return f"{route}|{user}|{client_ip(request)}"
+        return f"{route}|{user}"
+
+
+def rate_limit(*rules: RateLimit) -> Callable[..., Awaitable[None]]:
+    """ルーターやエンドポイントの dependencies に渡す依存関数を作る。
+
+        app.include_router(login_router, dependencies=[Depends(rate_limit(RateLimit("ip", "30/minute")))])
+
+    ハンドラ（= 上流の呼び出し）より前に評価され、超過時は 429 と Retry-After を返す。
+    """
+
+    async def _check(request: Request) -> None:
+        if not rate_limit_enabled():
+            return
+        route = _route(request)
+        for rule in rules:
+            key = await rule.key_for(request, route)
+            if key is None:
+                continue
+            retry_after = rule.bucket.hit(key)
+            if retry_after > 0:
+                RATE_LIMITED.labels(route, rule.scope).inc()
+                raise HTTPException(
+                    status_code=429,
+                    detail="リクエストが多すぎます。しばらくしてから再試行してください",
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+                )
+
+    return _check
+
+
+__all__ = [
+    "RateLimit",
+    "RateLimitExceeded",
+    "TokenBucket",
+    "client_ip",
+    "parse_rate",
+    "rate_limit",
+    "rate_limit_enabled",
+]
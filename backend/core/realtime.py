@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from backend.core.env import get_env
+
+
+def post_topic(post_id: str) -> str:
+    return f"post:{post_id}"
+
+
+class Subscriber:
+    """1接続分の購読状態と未送信の差分。
+
+    件数系（post_good など）は投稿ごとに最新値へ上書きして合流させるため、
+    送信が遅い購読者でも溜まる差分は購読中の投稿数までに収まる。
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.topics: Set[str] = set()
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, Any]] = {}
+        self._wake = asyncio.Event()
+        self.closed = False
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        if self.closed:
+            return
+        with self._lock:
+            merged = self._counts.setdefault(event["post_id"], {"post_id": event["post_id"]})
+            merged.update(event["values"])
+        self._notify()
+
+    def _notify(self) -> None:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wake.set()
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def drain(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if not self._counts:
+                return None
+            batch: Dict[str, Any] = {"type": "delta", "counts": list(self._counts.values())}
+            self._counts = {}
+            self._wake.clear()
+            return batch
+
+    async def next_batch(self, interval_sec: float, timeout_sec: float) -> Optional[Dict[str, Any]]:
+        """差分が来るまで待ち、interval_sec だけ追加の差分を合流させてから返す。
+
+        timeout_sec 以内に何も来なければ None（キープアライブ用）。
+        """
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=timeout_sec)
+        except asyncio.TimeoutError:
+            return None
+        if interval_sec > 0:
+            await asyncio.sleep(interval_sec)
+        return self.drain()
+
+
+class PubSubHub:
+    """プロセス内の Pub/Sub。publish はスレッドセーフで、同期ハンドラからも呼べる。"""
+
+    def __init__(self, *, max_topics_per_subscriber: int = 500) -> None:
+        self.max_topics_per_subscriber = max_topics_per_subscriber
+        self._topics: Dict[str, Set[Subscriber]] = {}
+        self._lock = threading.Lock()
+
+    def connect(self) -> Subscriber:
+        return Subscriber(asyncio.get_running_loop())
+
+    def subscribe(self, sub: Subscriber, topics: Iterable[str]) -> List[str]:
+        added: List[str] = []
+        with self._lock:
+            for topic in topics:
+                if not isinstance(topic, str) or not topic or topic in sub.topics:
+                    continue
+                if len(sub.topics) >= self.max_topics_per_subscriber:
+                    break
+                sub.topics.add(topic)
+                self._topics.setdefault(topic, set()).add(sub)
+                added.append(topic)
+        return added
+
+    def unsubscribe(self, sub: Subscriber, topics: Optional[Iterable[str]] = None) -> None:
+        with self._lock:
+            for topic in list(sub.topics if topics is None else topics):
+                sub.topics.discard(topic)
+                subs = self._topics.get(topic)
+                if subs is None:
+                    continue
+                subs.discard(sub)
+                if not subs:
+                    del self._topics[topic]
+
+    def disconnect(self, sub: Subscriber) -> None:
+        sub.closed = True
+        self.unsubscribe(sub)
+
+    def publish(self, topic: str, event: Dict[str, Any]) -> int:
+        with self._lock:
+            subs = list(self._topics.get(topic, ()))
+        for sub in subs:
+            sub.offer(event)
+        return len(subs)
+
+    def publish_counts(self, post_id: str, **values: Any) -> int:
+        """投稿の件数系の変化（例: post_good=12）を配信する。"""
+        return self.publish(post_topic(post_id), {"post_id": post_id, "values": values})
+
+    def has_subscribers(self, topic: str) -> bool:
+        return bool(self._topics.get(topic))
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len({s for subs in self._topics.values() for s in subs})
+
+
+hub = PubSubHub(
+    max_topics_per_subscriber=int(get_env("REALTIME_MAX_TOPICS", "500") or "500"),
+)
+
+# 差分をまとめて送る間隔（ミリ秒）と、無通信時のキープアライブ間隔（秒）
+FLUSH_INTERVAL_MS = int(get_env("REALTIME_FLUSH_INTERVAL_MS", "250") or "250")
+KEEPALIVE_SEC = float(get_env("REALTIME_KEEPALIVE_SEC", "25") or "25")
+# 1回の送信がこれ以上詰まる購読者は切断する
+SEND_TIMEOUT_SEC = float(get_env("REALTIME_SEND_TIMEOUT_SEC", "5") or "5")
+
+
+router = APIRouter(prefix="/realtime", tags=["realtime"])
+
+
+def _split_topics(topics: Optional[str]) -> List[str]:
+    return [t.strip() for t in (topics or "").split(",") if t.strip()]
+
+
+@router.websocket("/ws")
+async def realtime_ws(websocket: WebSocket, topics: Optional[str] = Query(default=None)) -> None:
+    """WebSocket での購読。
+
+    受信: {"action": "subscribe" | "unsubscribe", "topics": ["post:<id>", ...]}
+    送信: {"type": "delta", "counts": [{"post_id": ..., "post_good": ...}, ...]}
+    """
+    await websocket.accept()
+    sub = hub.connect()
+    hub.subscribe(sub, _split_topics(topics))
+
+    async def _receive() -> None:
+        while True:
+            try:
+                msg = await websocket.receive_json()
+            except (ValueError, KeyError):
+                continue
+            if not isinstance(msg, dict):
+                continue
+            requested = msg.get("topics") or []
+            if msg.get("action") == "subscribe":
+                added = hub.subscribe(sub, requested)
+                await asyncio.wait_for(
+                    websocket.send_json({"type": "subscribed", "topics": added}),
+                    timeout=SEND_TIMEOUT_SEC,
+                )
+            elif msg.get("action") == "unsubscribe":
+                hub.unsubscribe(sub, requested)
+
+    async def _send() -> None:
+        interval = FLUSH_INTERVAL_MS / 1000.0
+        while True:
+            batch = await sub.next_batch(interval, KEEPALIVE_SEC)
+            payload = batch if batch is not None else {"type": "ping"}
+            await asyncio.wait_for(websocket.send_json(payload), timeout=SEND_TIMEOUT_SEC)
+
+    receiver = asyncio.create_task(_receive())
+    sender = asyncio.create_task(_send())
+    try:
+        await asyncio.wait({receiver, sender}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        hub.disconnect(sub)
+        for task in (receiver, sender):
+            task.cancel()
+        for task in (receiver, sender):
+            try:
+                await task
+            except (asyncio.CancelledError, WebSocketDisconnect, asyncio.TimeoutError, RuntimeError):
+                pass
+        if sender.done() and not sender.cancelled() and isinstance(sender.exception(), asyncio.TimeoutError):
+            # 送信が詰まった購読者は 1013（Try Again Later）で切断
+            try:
+                await asyncio.wait_for(websocket.close(code=1013), timeout=1.0)
+            except (RuntimeError, asyncio.TimeoutError):
+                pass
+
+
+@router.get("/events")
+async def realtime_events(topics: str = Query(..., description="カンマ区切りのトピック（例: post:abc,post:def）")) -> StreamingResponse:
+    """Server-Sent Events での購読（WebSocket が使えない環境向け）。"""
+    sub = hub.connect()
+    hub.subscribe(sub, _split_topics(topics))
+
+    async def _stream():
+        interval = FLUSH_INTERVAL_MS / 1000.0
+        try:
+            yield ": connected\n\n"
+            while True:
+                batch = await sub.next_batch(interval, KEEPALIVE_SEC)
+                if batch is None:
+                    yield f": ping {int(time.time())}\n\n"
+                    continue
+                yield f"event: delta\ndata: {json.dumps(batch, ensure_ascii=False)}\n\n"
+        finally:
+            hub.disconnect(sub)
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+__all__ = [
+    "FLUSH_INTERVAL_MS",
+    "PubSubHub",
+    "Subscriber",
+    "hub",
+    "post_topic",
+    "router",
+]
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # type: ignore  # 任意依存: 無ければ gzip のみ
+except ImportError:
+    brotli = None
+
+
+# 圧縮する価値のある Content-Type（画像などは既に圧縮済みのため対象外）
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "text/",
+    "application/javascript",
+    "image/svg+xml",
+)
+
+_ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+def make_etag(*version: Any) -> str:
+    """データのバージョン情報から強いETagを作る（レスポンス本文は直列化しない）。"""
+    h = hashlib.blake2b(digest_size=16)
+    for part in version:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\0")
+    return f'"{h.hexdigest()}"'
+
+
+def _strip_encoding_suffix(tag: str) -> str:
+    # 圧縮時に付与した "-gzip" / "-br" を外して比較する
+    if tag.endswith('"'):
+        for suffix in _ENCODING_SUFFIXES:
+            if tag.endswith(f'{suffix}"'):
+                return tag[: -len(suffix) - 1] + '"'
+    return tag
+
+
+def _matching_etag(request: Request, etag: str) -> Optional[str]:
+    # If-None-Match のうち etag に一致したもの（圧縮時の "-br"/"-gzip" 付きならそのまま）を返す
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    if header.strip() == "*":
+        return etag
+    for raw in header.split(","):
+        tag = raw.strip()
+        if tag.startswith("W/"):
+            # 弱いETagは強い比較では一致しない
+            continue
+        if _strip_encoding_suffix(tag) == etag:
+            return tag
+    return None
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    return _matching_etag(request, etag) is not None
+
+
+def not_modified(request: Request, response: Response, *version: Any, cache_control: str = "private, no-cache") -> Optional[Response]:
+    """ETag を response に設定し、If-None-Match が一致すれば 304 レスポンスを返す。
+
+    version にはパス以外でデータを一意に決める値（更新時刻・件数・ユーザーIDなど）を渡す。
+    ハンドラは重い処理の前に呼び出し、戻り値があればそれをそのまま返す。
+
+        etag_hit = not_modified(request, response, user_id, profile_version)
+        if etag_hit:
+            return etag_hit
+    """
+    etag = make_etag(request.url.path, *version)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    matched = _matching_etag(request, etag)
+    if matched is not None:
+        # 200 が圧縮されて "-br"/"-gzip" 付きで届いていれば、304 も同じ ETag を返す
+        return Response(status_code=304, headers={"ETag": matched, "Cache-Control": cache_control})
+    return None
+
+
+def _parse_accept_encoding(value: str) -> Dict[str, float]:
+    result: Dict[str, float] = {}
+    for item in value.split(","):
+        parts = [p.strip() for p in item.split(";")]
+        if not parts[0]:
+            continue
+        q = 1.0
+        for p in parts[1:]:
+            if p.startswith("q="):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        result[parts[0].lower()] = q
+    return result
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = _parse_accept_encoding(accept_encoding or "")
+    if brotli is not None and accepted.get("br", 0.0) > 0.0:
+        return "br"
+    if accepted.get("gzip", 0.0) > 0.0:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """minimum_size 以上の JSON/テキスト応答を brotli（利用可能な場合）または gzip で圧縮する。
+
+    ストリーミング応答（SSE など）は遅延させないよう圧縮せずに素通しする。
+    ETag が付いている場合は表現ごとに区別できるよう "-br"/"-gzip" を付与する。
+    圧縮対象になりうる応答（小さいもの・304 を含む）には常に Vary: Accept-Encoding を付ける。
+    offload_size 以上の本文はイベントループを止めないようスレッドプールで圧縮する。
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        gzip_level: int = 5,
+        brotli_quality: int = 4,
+        offload_size: int = 64 * 1024,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.offload_size = offload_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start: Optional[Message] = None
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                start = self._add_vary(message)
+                if encoding is None:
+                    passthrough = True
+                    await send(start)
+                return
+
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if more_body and not chunks:
+                # ストリーミング応答は圧縮対象外
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            chunks.append(body)
+            if more_body:
+                return
+
+            full = b"".join(chunks)
+            if len(full) >= self.offload_size:
+                start_message, payload = await run_in_threadpool(self._encode, start, full, encoding)
+            else:
+                start_message, payload = self._encode(start, full, encoding)
+            await send(start_message)
+            await send({"type": "http.response.body", "body": payload})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _add_vary(self, start: Message) -> Message:
+        # 共有キャッシュが Accept-Encoding の違う表現を取り違えないよう、圧縮の有無によらず付ける
+        headers = MutableHeaders(raw=list(start.get("headers", [])))
+        if start["status"] != 304 and (
+            "content-encoding" in headers or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+        ):
+            return start
+        headers.add_vary_header("Accept-Encoding")
+        message = dict(start)
+        message["headers"] = headers.raw
+        return message
+
+    def _encode(self, start: Message, body: bytes, encoding: str) -> Tuple[Message, bytes]:
+        headers = MutableHeaders(raw=list(start.get("headers", [])))
+        content_type = headers.get("content-type", "")
+        if (
+            len(body) < self.minimum_size
+            or "content-encoding" in headers
+            or not content_type.startswith(COMPRESSIBLE_TYPES)
+        ):
+            return start, body
+
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        if len(compressed) >= len(body):
+            return start, body
+
+        headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(len(compressed))
+        etag = headers.get("etag")
+        if etag and etag.endswith('"') and not etag.startswith("W/"):
+            headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+        message = dict(start)
+        message["headers"] = headers.raw
+        return message, compressed
+
+
+__all__ = [
+    "COMPRESSIBLE_TYPES",
+    "CompressionMiddleware",
+    "choose_encoding",
+    "etag_matches",
+    "make_etag",
+    "not_modified",
+]
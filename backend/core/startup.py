@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import importlib
+import time
+from typing import Dict, Optional, Sequence
+
+from backend.core.env import get_env
+
+
+# リクエスト処理中に遅延インポートされる重い SDK。
+# 起動時に読み込んでおき、最初のリクエストに読み込み時間を払わせない
+# （gunicorn では fork 前の master、uvicorn 単体では lifespan で読み込む）
+DEFAULT_WARMUP_MODULES = ("supabase",)
+
+
+def warmup_modules() -> Sequence[str]:
+    raw = get_env("WARMUP_MODULES")
+    if raw is None:
+        return DEFAULT_WARMUP_MODULES
+    return tuple(m.strip() for m in raw.split(",") if m.strip())
+
+
+def warmup_imports(modules: Optional[Sequence[str]] = None) -> Dict[str, float]:
+    """モジュールを読み込み、それぞれの所要秒数を返す。未インストールのものは飛ばす。"""
+    timings: Dict[str, float] = {}
+    for name in modules if modules is not None else warmup_modules():
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            # 依存の不整合などは従来通り各エンドポイントでエラーとして返す
+            continue
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+__all__ = [
+    "DEFAULT_WARMUP_MODULES",
+    "warmup_imports",
+]
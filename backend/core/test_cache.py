@@ -0,0 +1,59 @@
+import multiprocessing
+import time
+
+from backend.core.cache import MemoryCache, SQLiteCache, TieredCache, cache_backend
+
+
+def _write_from_child(path):
+    SQLiteCache(path=path).set("from-child", {"uid": "u1"}, ttl_sec=60)
+
+
+def test_sqlite_cache_is_shared_across_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SQLiteCache(path=path)
+    cache.set("a", [1, 2], ttl_sec=60)
+    cache.set("expired", "x", ttl_sec=-1)
+
+    proc = multiprocessing.get_context("fork").Process(target=_write_from_child, args=(path,))
+    proc.start()
+    proc.join(10)
+
+    assert cache.get("a") == [1, 2]
+    assert cache.get("expired") is None
+    assert cache.get("from-child") == {"uid": "u1"}
+    cache.delete("a")
+    assert cache.get("a") is None
+
+
+def test_sqlite_cache_prune_keeps_max_entries(tmp_path):
+    cache = SQLiteCache(path=str(tmp_path / "cache.sqlite3"), max_entries=3, prune_every=1000)
+    for i in range(5):
+        cache.set(f"k{i}", i, ttl_sec=60 + i)
+    cache.prune()
+    assert len(cache) == 3
+    assert cache.get("k0") is None and cache.get("k4") == 4
+
+
+def test_tiered_cache_reads_through_and_invalidates(tmp_path):
+    shared = SQLiteCache(path=str(tmp_path / "cache.sqlite3"))
+    worker_a = TieredCache(local=MemoryCache(), shared=shared, local_ttl_sec=0.05)
+    worker_b = TieredCache(local=MemoryCache(), shared=shared, local_ttl_sec=0.05)
+
+    worker_a.set("session:x", "u1", ttl_sec=60)
+    assert worker_b.get("session:x") == "u1"
+
+    worker_a.delete("session:x")
+    # worker_b のプロセス内コピーは local_ttl_sec 後に消える
+    time.sleep(0.06)
+    assert worker_b.get("session:x") is None
+
+
+def test_cache_backend_uses_shared_tier_only_when_configured(tmp_path, monkeypatch):
+    monkeypatch.delenv("SHARED_CACHE_PATH", raising=False)
+    assert isinstance(cache_backend(), MemoryCache)
+    monkeypatch.setenv("SHARED_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    assert isinstance(cache_backend(), TieredCache)
+    # 無効化をすぐ反映したい用途はプロセス内の段を持たない
+    assert isinstance(cache_backend(local_ttl_sec=0), SQLiteCache)
+    monkeypatch.setenv("SHARED_CACHE_LOCAL_TTL_SEC", "0")
+    assert isinstance(cache_backend(), SQLiteCache)
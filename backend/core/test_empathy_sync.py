@@ -0,0 +1,227 @@
+import time
+
+from sqlalchemy import Column, MetaData, String, Table, create_engine, select
+from sqlalchemy.orm import Session
+
+from backend.core.empathy_sync import EmpathyReplicator, outbox_table, record_change
+
+
+class FakeRemote:
+    def __init__(self, rows=()):
+        self.rows = set(rows)
+        self.calls = []
+        self.fail = False
+
+    def upsert(self, rows):
+        if self.fail:
+            raise ConnectionError("down")
+        self.calls.append(("upsert", len(rows)))
+        self.rows |= {(r["uid"], r["post_id"]) for r in rows}
+
+    def delete(self, uid, post_ids):
+        if self.fail:
+            raise ConnectionError("down")
+        self.calls.append(("delete", len(post_ids)))
+        self.rows -= {(uid, p) for p in post_ids}
+
+    def fetch_page(self, offset, limit):
+        rows = sorted(self.rows)[offset:offset + limit]
+        return [{"uid": u, "post_id": p} for u, p in rows]
+
+
+def _setup(tmp_path, remote):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empathy.db'}", future=True)
+    empathy = Table("empathy", MetaData(), Column("uid", String, primary_key=True), Column("post_id", String, primary_key=True))
+    empathy.metadata.create_all(bind=engine)
+    return engine, empathy, EmpathyReplicator(engine, remote, empathy, batch_size=100, lock_dir=tmp_path)
+
+
+def _toggle(engine, empathy, uid, post_id, liked):
+    with Session(engine) as db:
+        if liked:
+            db.execute(empathy.insert().values(uid=uid, post_id=post_id))
+        else:
+            db.execute(empathy.delete().where(empathy.c.uid == uid, empathy.c.post_id == post_id))
+        record_change(db, uid, post_id, liked)
+        db.commit()
+
+
+def test_hydrate_pushes_local_only_rows_once_and_pulls_remote_rows(tmp_path):
+    remote = FakeRemote({("u1", f"p{i}") for i in range(5)})
+    engine, empathy, replicator = _setup(tmp_path, remote)
+    with engine.begin() as conn:
+        conn.execute(empathy.insert().values(uid="u2", post_id="local"))
+
+    # 既存のローカル行は先に送るので、消されずに Supabase へ載る
+    assert replicator.hydrate(page_size=2) == 5
+    assert ("u2", "local") in remote.rows
+    assert replicator.hydrate(page_size=2) == 0
+    with engine.connect() as conn:
+        assert len(conn.execute(select(empathy)).all()) == 6
+    assert replicator.pending() == 0
+
+
+def test_hydrate_on_restart_flushes_outbox_and_mirrors_remote_deletes(tmp_path):
+    remote = FakeRemote({("u1", "a"), ("u1", "b")})
+    engine, empathy, replicator = _setup(tmp_path, remote)
+    replicator.hydrate()
+
+    # 停止中にこのコンテナで解除し、別のコンテナでは b を解除・c を共感した
+    _toggle(engine, empathy, "u1", "a", False)
+    remote.rows -= {("u1", "b")}
+    remote.rows |= {("u2", "c")}
+
+    assert replicator.hydrate() == 2
+    assert remote.rows == {("u2", "c")}
+    with engine.connect() as conn:
+        assert set(conn.execute(select(empathy.c.uid, empathy.c.post_id)).all()) == {("u2", "c")}
+
+
+def test_hydrate_keeps_rows_with_pending_changes(tmp_path):
+    remote = FakeRemote({("u1", "a")})
+    engine, empathy, replicator = _setup(tmp_path, remote)
+    replicator.hydrate()
+
+    # flush の後、読み込み中に別のプロセスが a を解除し b に共感した（まだ送っていない）
+    fetch_page = remote.fetch_page
+
+    def fetch_then_toggle(offset, limit):
+        rows = fetch_page(offset, limit)
+        _toggle(engine, empathy, "u1", "a", False)
+        _toggle(engine, empathy, "u1", "b", True)
+        return rows
+
+    remote.fetch_page = fetch_then_toggle
+    assert replicator.hydrate() == 0
+    with engine.connect() as conn:
+        assert set(conn.execute(select(empathy.c.uid, empathy.c.post_id)).all()) == {("u1", "b")}
+    assert replicator.pending() == 2
+
+
+def test_sync_coalesces_toggles_and_advances_high_water_mark(tmp_path):
+    remote = FakeRemote({("u1", "gone")})
+    engine, empathy, replicator = _setup(tmp_path, remote)
+    replicator.hydrate()
+
+    _toggle(engine, empathy, "u1", "a", True)
+    _toggle(engine, empathy, "u1", "a", False)
+    _toggle(engine, empathy, "u1", "a", True)
+    _toggle(engine, empathy, "u1", "gone", False)
+    assert replicator.pending() == 4
+
+    assert replicator.sync_once() == 4
+    assert remote.rows == {("u1", "a")}
+    assert remote.calls == [("upsert", 1), ("delete", 1)]
+    assert replicator.pending() == 0
+    assert replicator.sync_once() == 0
+
+    # outbox を空にした後も seq は巻き戻らない
+    _toggle(engine, empathy, "u1", "b", True)
+    assert replicator.sync_once() == 1
+    assert ("u1", "b") in remote.rows
+
+
+def test_failed_batch_stays_in_outbox_and_is_resent(tmp_path):
+    remote = FakeRemote()
+    engine, empathy, replicator = _setup(tmp_path, remote)
+    replicator.hydrate()
+    _toggle(engine, empathy, "u1", "a", True)
+
+    remote.fail = True
+    try:
+        replicator.sync_once()
+    except ConnectionError:
+        pass
+    assert replicator.pending() == 1
+
+    remote.fail = False
+    replicator.stop()
+    assert remote.rows == {("u1", "a")}
+    with engine.connect() as conn:
+        assert conn.execute(select(outbox_table)).all() == []
+
+
+def test_other_process_cannot_sync_while_hydrate_reads_remote(tmp_path):
+    remote = FakeRemote({("u1", "a")})
+    engine, empathy, replicator = _setup(tmp_path, remote)
+    other = EmpathyReplicator(engine, remote, empathy, batch_size=100, lock_dir=tmp_path)
+    replicator.hydrate()
+
+    fetch_page = remote.fetch_page
+    synced = []
+
+    def fetch_then_other_worker_syncs(offset, limit):
+        rows = fetch_page(offset, limit)
+        # 読み込み後に別のワーカーで共感され、そのワーカーの送信ループが回る
+        _toggle(engine, empathy, "u1", "new", True)
+        if other._leader_lock.acquire(blocking=False):
+            synced.append(other.sync_once())
+            other._leader_lock.release()
+        return rows
+
+    remote.fetch_page = fetch_then_other_worker_syncs
+    replicator.hydrate()
+    assert synced == []
+    with engine.connect() as conn:
+        assert ("u1", "new") in set(conn.execute(select(empathy.c.uid, empathy.c.post_id)).all())
+    assert replicator.pending() == 1
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_background_hydrate_retries_until_remote_is_reachable(tmp_path):
+    remote = FakeRemote({("u1", "a")})
+    engine, empathy, replicator = _setup(tmp_path, remote)
+    replicator.interval_sec = replicator.max_backoff_sec = 0.01
+    fetch_page = remote.fetch_page
+    attempts = []
+
+    def flaky_fetch_page(offset, limit):
+        attempts.append(offset)
+        if len(attempts) < 3:
+            raise ConnectionError("down")
+        return fetch_page(offset, limit)
+
+    remote.fetch_page = flaky_fetch_page
+    hydrated = []
+    replicator.on_hydrated = lambda: hydrated.append(True)
+    # Supabase に繋がらなくても start は例外を出さない
+    replicator.start()
+    try:
+        _wait_for(lambda: hydrated)
+    finally:
+        replicator.stop()
+    assert len(attempts) == 3
+    assert replicator.last_error == "ConnectionError: down"
+    with engine.connect() as conn:
+        assert set(conn.execute(select(empathy.c.uid, empathy.c.post_id)).all()) == {("u1", "a")}
+
+
+def test_background_hydrate_is_skipped_when_the_db_was_hydrated_recently(tmp_path):
+    remote = FakeRemote({("u1", "a")})
+    engine, empathy, replicator = _setup(tmp_path, remote)
+    replicator.hydrate()
+
+    # ワーカーの入れ替えで作り直された送信役は、全件を読み直さない
+    restarted = EmpathyReplicator(engine, remote, empathy, batch_size=100, lock_dir=tmp_path)
+    restarted.interval_sec = 0.01
+    fetched = []
+    fetch_page = remote.fetch_page
+    remote.fetch_page = lambda offset, limit: fetched.append(offset) or fetch_page(offset, limit)
+    _toggle(engine, empathy, "u1", "b", True)
+    restarted.start()
+    try:
+        _wait_for(lambda: restarted.pending() == 0)
+    finally:
+        restarted.stop()
+    assert fetched == []
+    assert remote.rows == {("u1", "a"), ("u1", "b")}
+
+    restarted.hydrate_interval_sec = 0
+    assert restarted._hydrate(force=False) == 0
+    assert fetched == [0]
@@ -0,0 +1,97 @@
+import threading
+
+import anyio
+import httpx
+from fastapi import Depends, FastAPI
+
+from backend.core import health
+from backend.core.health import HealthProber, Probe, shed_when_unhealthy
+
+
+def _failing():
+    raise ConnectionError("refused")
+
+
+def test_prober_records_results_and_needs_consecutive_failures():
+    calls = []
+    prober = HealthProber(interval_sec=10, timeout_sec=0.5, failure_threshold=2)
+    prober.probes = [
+        Probe("supabase", lambda: calls.append(1), critical=True),
+        Probe("freepik", _failing),
+    ]
+    prober.run_once()
+    assert prober.results["supabase"].ok and len(calls) == 1
+    assert prober.results["freepik"].error == "ConnectionError: refused"
+    # 1回の失敗ではまだ切り離さない
+    assert prober.healthy("freepik")
+    assert prober.readiness()["status"] == "ok"
+
+    prober.run_once()
+    assert not prober.healthy("freepik")
+    assert prober.readiness()["status"] == "degraded"
+    assert prober.healthy("unknown")
+
+
+def test_hung_probe_times_out_without_piling_up():
+    release = threading.Event()
+    started = []
+
+    def hang():
+        started.append(1)
+        release.wait(5)
+
+    prober = HealthProber(interval_sec=10, timeout_sec=0.05, failure_threshold=1)
+    prober.probes = [Probe("sqlite", hang, critical=True)]
+    prober.run_once()
+    prober.run_once()
+    assert prober.results["sqlite"].error == "timeout"
+    assert prober.readiness()["status"] == "unavailable"
+    assert len(started) == 1
+    release.set()
+
+
+def test_readyz_reads_cached_results_and_sheds_load(monkeypatch):
+    calls = []
+    prober = HealthProber(interval_sec=10, timeout_sec=0.5, failure_threshold=1)
+    monkeypatch.setattr(health, "prober", prober)
+
+    app = FastAPI()
+    app.include_router(health.router)
+
+    @app.get("/login", dependencies=[Depends(shed_when_unhealthy("supabase"))])
+    async def login():
+        return {"ok": True}
+
+    async def _run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            assert (await client.get("/healthz")).json() == {"status": "ok"}
+
+            prober.probes = [Probe("supabase", lambda: calls.append(1), critical=True)]
+            assert (await client.get("/readyz")).status_code == 503  # まだ一度も確認していない
+            prober.run_once()
+            for _ in range(5):
+                assert (await client.get("/readyz")).status_code == 200
+            assert len(calls) == 1
+            assert (await client.get("/login")).status_code == 200
+
+            prober.probes = [Probe("supabase", _failing, critical=True)]
+            prober.run_once()
+            resp = await client.get("/readyz")
+            assert resp.status_code == 503
+            assert resp.json()["dependencies"]["supabase"]["ok"] is False
+            resp = await client.get("/login")
+            assert resp.status_code == 503
+            assert resp.headers["retry-after"] == "10"
+
+    anyio.run(_run)
+
+
+def test_default_probes_always_check_the_empathy_db(monkeypatch):
+    for name in ("SUPABASE_URL", "FREEPIK_API_KEY", "FREEPIK_TOKEN", "R2_BUCKET", "GOOGLE_SERVICE_ACCOUNT_FILE",
+                 "GOOGLE_SERVICE_ACCOUNT_JSON", "HEALTH_CRITICAL"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("SHARED_CACHE_PATH", "")
+    probes = health.default_probes()
+    assert [(p.name, p.critical) for p in probes] == [("sqlite", True)]
+    probes[0].check()
@@ -0,0 +1,77 @@
+from backend.core.liked_index import LikedIndex
+
+
+class FakeTable:
+    def __init__(self, rows):
+        self.rows = set(rows)
+        self.loads = []
+
+    def load(self, uid):
+        self.loads.append(uid)
+        return [p for u, p in self.rows if u == uid]
+
+
+def test_loads_once_then_answers_from_memory():
+    table = FakeTable({("u1", "a"), ("u1", "b"), ("u2", "c")})
+    index = LikedIndex(table.load)
+
+    assert index.contains("u1", "a") is True
+    assert index.contains("u1", "zzz") is False
+    assert index.contains("u1", "b") is True
+    assert table.loads == ["u1"]
+
+    index.apply("u1", "zzz", True)
+    index.apply("u1", "a", False)
+    assert index.contains("u1", "zzz") is True
+    assert index.contains("u1", "a") is False
+    assert len(index) == 2 and table.loads == ["u1"]
+
+
+def test_evicts_least_recently_used_users_under_the_cap():
+    table = FakeTable({("u1", "a"), ("u1", "b"), ("u2", "c"), ("u2", "d"), ("u3", "e"), ("u3", "f")})
+    index = LikedIndex(table.load, max_ids=4, max_ids_per_user=4)
+
+    index.contains("u1", "a")
+    index.contains("u2", "c")
+    index.contains("u1", "a")  # u1 を最近使った側にする
+    index.contains("u3", "e")
+    assert len(index) == 4 and index.users() == 2
+
+    table.loads.clear()
+    index.contains("u1", "a")
+    index.contains("u2", "c")
+    assert table.loads == ["u2"]
+
+
+def test_large_users_and_disabled_index_fall_back_to_the_caller():
+    table = FakeTable({("big", str(i)) for i in range(5)})
+    assert LikedIndex(table.load, max_ids=100, max_ids_per_user=3).contains("big", "1") is None
+    assert LikedIndex(table.load, max_ids=0).contains("big", "1") is None
+
+
+def test_toggle_during_load_discards_the_stale_result():
+    table = FakeTable({("u1", "a")})
+    index = LikedIndex(lambda uid: [])
+
+    def load_then_toggle(uid):
+        rows = table.load(uid)
+        # 読み込み中に別リクエストがトグルを commit した
+        table.rows.discard(("u1", "a"))
+        index.apply("u1", "a", False)
+        return rows
+
+    index.loader = load_then_toggle
+    assert index.contains("u1", "a") is True
+    assert index.users() == 0
+
+    index.loader = table.load
+    assert index.contains("u1", "a") is False
+
+
+def test_clear_drops_loaded_users():
+    index = LikedIndex(lambda uid: ["a"])
+    assert index.contains("u1", "a") is True
+    index.clear()
+    assert len(index) == 0 and index.users() == 0
+    assert index.contains("u1", "a") is True
+    assert index.users() == 1
@@ -0,0 +1,85 @@
+import anyio
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException
+
+from backend.core.metrics import MetricsMiddleware, Registry, observe_dependency, render_metrics
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        if item_id == "missing":
+            raise HTTPException(status_code=404, detail="not found")
+        with observe_dependency("test_dep", "lookup"):
+            return {"id": item_id}
+
+    return app
+
+
+def test_route_template_labels_and_dependency_outcomes():
+    async def _run():
+        transport = httpx.ASGITransport(app=_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for i in range(3):
+                assert (await client.get(f"/items/{i}")).status_code == 200
+            assert (await client.get("/items/missing")).status_code == 404
+            assert (await client.get("/nowhere")).status_code == 404
+
+    anyio.run(_run)
+
+    with pytest.raises(RuntimeError):
+        with observe_dependency("test_dep", "lookup"):
+            raise RuntimeError("boom")
+
+    text = render_metrics()
+    # パスパラメータごとではなくルート定義単位で集計される
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"} 3.0' in text
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="404"} 1.0' in text
+    assert 'route="<unmatched>",status="404"' in text
+    assert 'http_requests_in_flight{method="GET"} 0.0' in text
+    assert 'dependency_calls_total{dependency="test_dep",operation="lookup",outcome="ok"} 3.0' in text
+    assert 'dependency_calls_total{dependency="test_dep",operation="lookup",outcome="error"} 1.0' in text
+
+
+def test_route_template_for_included_routers():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    router = APIRouter(prefix="/included")
+
+    @router.post("/login")
+    async def login():
+        return {"ok": True}
+
+    @router.get("/users/{uid}")
+    async def user(uid: str):
+        return {"uid": uid}
+
+    app.include_router(router)
+
+    async def _run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            assert (await client.post("/included/login")).status_code == 200
+            assert (await client.get("/included/users/u1")).status_code == 200
+
+    anyio.run(_run)
+
+    text = render_metrics()
+    assert 'http_requests_total{method="POST",route="/included/login",status="200"} 1.0' in text
+    assert 'http_requests_total{method="GET",route="/included/users/{uid}",status="200"} 1.0' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    h = registry.histogram("t_seconds", "test", ("k",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.5, 5.0):
+        h.labels("a").observe(v)
+    text = registry.render()
+    assert 't_seconds_bucket{k="a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{k="a",le="1.0"} 3' in text
+    assert 't_seconds_bucket{k="a",le="+Inf"} 4' in text
+    assert 't_seconds_count{k="a"} 4' in text
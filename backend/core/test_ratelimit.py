@@ -0,0 +1,66 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from backend.core.ratelimit import RateLimit, TokenBucket, parse_rate, rate_limit
+
+
+def test_parse_rate():
+    assert parse_rate("10/second") == 10.0
+    assert parse_rate("30/minute") == 0.5
+    assert parse_rate("3600/hour") == 1.0
+
+
+def test_token_bucket_refills_and_reports_retry_after():
+    bucket = TokenBucket(rate_per_sec=1.0, burst=2)
+    assert bucket.hit("a", now=0.0) == 0.0
+    assert bucket.hit("a", now=0.0) == 0.0
+    assert bucket.hit("a", now=0.0) == 1.0
+    assert bucket.hit("a", now=0.5) == 0.5
+    assert bucket.hit("a", now=1.0) == 0.0
+    # 別キーは独立した枠
+    assert bucket.hit("b", now=1.0) == 0.0
+
+
+def test_token_bucket_memory_is_bounded():
+    bucket = TokenBucket(rate_per_sec=1.0, burst=1, max_keys=64, shards=4)
+    for i in range(10_000):
+        bucket.hit(f"ip-{i}", now=0.0)
+    assert len(bucket) <= 64
+
+
+def test_rate_limit_rejects_before_handler_with_retry_after():
+    calls = []
+    app = FastAPI()
+
+    @app.post("/login", dependencies=[Depends(rate_limit(RateLimit("user", "1/minute", burst=2)))])
+    def login(body: dict):
+        calls.append(body["email"])
+        return {"ok": True}
+
+    client = TestClient(app)
+    for _ in range(2):
+        assert client.post("/login", json={"email": "A@example.com"}).status_code == 200
+    resp = client.post("/login", json={"email": "a@example.com"})
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert calls == ["A@example.com", "A@example.com"]
+    # 別ユーザーは影響を受けない
+    assert client.post("/login", json={"email": "b@example.com"}).status_code == 200
+
+
+def test_user_ip_scope_does_not_lock_out_the_victim_from_another_ip(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_TRUST_FORWARDED", "1")
+    app = FastAPI()
+
+    @app.post("/login", dependencies=[Depends(rate_limit(RateLimit("user_ip", "1/minute", burst=2)))])
+    def login(body: dict):
+        return {"ok": True}
+
+    client = TestClient(app)
+    attacker = {"X-Forwarded-For": "203.0.113.9"}
+    for _ in range(2):
+        assert client.post("/login", json={"email": "victim@example.com"}, headers=attacker).status_code == 200
+    assert client.post("/login", json={"email": "victim@example.com"}, headers=attacker).status_code == 429
+    # 本人は自分の IP からならログインできる
+    victim = {"X-Forwarded-For": "198.51.100.7"}
+    assert client.post("/login", json={"email": "victim@example.com"}, headers=victim).status_code == 200
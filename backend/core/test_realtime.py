@@ -0,0 +1,41 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.core.realtime import hub, router
+
+
+def test_ws_receives_coalesced_deltas():
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        with client.websocket_connect("/realtime/ws?topics=post:p1") as ws:
+            ws.send_json({"action": "subscribe", "topics": ["post:p2"]})
+            assert ws.receive_json() == {"type": "subscribed", "topics": ["post:p2"]}
+
+            # 同じ投稿の件数更新は最新値に合流する
+            hub.publish_counts("p1", post_good=1)
+            hub.publish_counts("p1", post_good=2)
+            hub.publish_counts("p2", post_good=5)
+            hub.publish_counts("p3", post_good=9)  # 未購読
+
+            msg = ws.receive_json()
+            assert msg["type"] == "delta"
+            assert sorted(msg["counts"], key=lambda c: c["post_id"]) == [
+                {"post_id": "p1", "post_good": 2},
+                {"post_id": "p2", "post_good": 5},
+            ]
+    assert not hub.has_subscribers("post:p1")
+
+
+def test_empathy_toggle_reaches_subscribers_of_the_main_app(empathy_db):
+    from backend.app import app
+
+    app.dependency_overrides[empathy_db.current_uid] = lambda: "u1"
+    try:
+        client = TestClient(app)
+        with client.websocket_connect("/realtime/ws?topics=post:rt-e2e") as ws:
+            assert client.post("/empathy", json={"post_id": "rt-e2e"}).json() == {"status": True}
+            msg = ws.receive_json()
+        assert msg == {"type": "delta", "counts": [{"post_id": "rt-e2e", "post_good": 1}]}
+    finally:
+        app.dependency_overrides.pop(empathy_db.current_uid, None)
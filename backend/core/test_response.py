@@ -0,0 +1,108 @@
+import anyio
+import httpx
+from fastapi import FastAPI, Request, Response
+from pydantic import BaseModel
+
+from backend.core.response import CompressionMiddleware, make_etag, not_modified
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    state = {"version": 1}
+
+    @app.get("/items", response_model=list[Item])
+    async def items(request: Request, response: Response):
+        etag_hit = not_modified(request, response, state["version"])
+        if etag_hit:
+            return etag_hit
+        return [Item(id=i, name=f"投稿{i}") for i in range(50)]
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.post("/bump")
+    async def bump():
+        state["version"] += 1
+        return {"version": state["version"]}
+
+    return app
+
+
+def test_gzip_and_etag_revalidation():
+    async def _run():
+        transport = httpx.ASGITransport(app=_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            resp = await client.get("/items", headers={"Accept-Encoding": "gzip"})
+            assert resp.status_code == 200
+            assert resp.headers["content-encoding"] == "gzip"
+            assert resp.headers["vary"] == "Accept-Encoding"
+            assert len(resp.json()) == 50
+            etag = resp.headers["etag"]
+            assert etag.endswith('-gzip"')
+
+            # 圧縮版の ETag でも非圧縮版の ETag でも 304。ETag は 200 で受け取ったものを繰り返す
+            resp = await client.get("/items", headers={"If-None-Match": etag, "Accept-Encoding": "gzip"})
+            assert resp.status_code == 304
+            assert resp.content == b""
+            assert resp.headers["etag"] == etag
+            assert "accept-encoding" in resp.headers["vary"].lower()
+            resp = await client.get("/items", headers={"If-None-Match": make_etag("/items", 1)})
+            assert resp.status_code == 304
+            assert resp.headers["etag"] == make_etag("/items", 1)
+
+            # データ更新後は 200
+            await client.post("/bump")
+            resp = await client.get("/items", headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+            assert resp.status_code == 200
+            assert "content-encoding" not in resp.headers
+            assert resp.headers["vary"] == "Accept-Encoding"
+
+            # 閾値未満は圧縮しないが、Vary は付ける
+            resp = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+            assert "content-encoding" not in resp.headers
+            assert resp.headers["vary"] == "Accept-Encoding"
+
+    anyio.run(_run)
+
+
+
+def test_large_bodies_are_compressed_off_the_event_loop(monkeypatch):
+    import threading
+
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100, offload_size=10_000)
+    threads = []
+    encode = CompressionMiddleware._encode
+
+    def recording_encode(self, start, body, encoding):
+        threads.append((len(body) >= 10_000, threading.get_ident()))
+        return encode(self, start, body, encoding)
+
+    @app.get("/big")
+    async def big():
+        return {"body": "x" * 20_000}
+
+    @app.get("/medium")
+    async def medium():
+        return {"body": "x" * 1_000}
+
+    monkeypatch.setattr(CompressionMiddleware, "_encode", recording_encode)
+
+    async def _run():
+        loop_thread = threading.get_ident()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            resp = await client.get("/big", headers={"Accept-Encoding": "gzip"})
+            assert resp.headers["content-encoding"] == "gzip"
+            assert resp.json()["body"] == "x" * 20_000
+            await client.get("/medium", headers={"Accept-Encoding": "gzip"})
+        assert [(large, ident == loop_thread) for large, ident in threads] == [(True, False), (False, True)]
+
+    anyio.run(_run)
@@ -0,0 +1,19 @@
+import os
+import statistics
+
+from backend.core.bench_startup import measure_import
+
+
+# 遅いCI環境でも誤検知しないよう余裕を持たせた上限（STARTUP_IMPORT_BUDGET_MS で上書き可）
+IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1500"))
+
+
+def test_backend_app_import_budget():
+    profiles = [measure_import("backend.app") for _ in range(3)]
+    assert profiles[-1].loaded_heavy == []
+    median = statistics.median(p.total_ms for p in profiles)
+    assert 0 < median < IMPORT_BUDGET_MS, f"backend.app の import に {median:.0f}ms（上限 {IMPORT_BUDGET_MS:.0f}ms）"
+
+
+def test_generate_image_package_is_lazy():
+    assert measure_import("backend.generate_image").loaded_heavy == []
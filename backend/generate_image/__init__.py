@@ -1,11 +1,54 @@
-from .client import FreepikImageClient
-from .drive_storage import DriveStorage
-from .service import generate_and_upload_images, generate_and_upload_image
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+# googleapiclient / boto3 / requests などの重い SDK を、パッケージの import だけで
+# 読み込まないよう、公開名は初回アクセス時に各モジュールから取り出す（PEP 562）
+_LAZY_ATTRS = {
+    "FreepikImageClient": ".client",
+    "DriveStorage": ".drive_storage",
+    "R2Storage": ".r2_storage",
+    "ImageStorage": ".storage",
+    "storage_from_env": ".storage",
+    "rewrite_image_url": ".storage",
+    "generate_and_upload_images": ".service",
+    "generate_and_upload_image": ".service",
+    "PromptCache": ".cache",
+    "get_prompt_cache": ".cache",
+}
+
+if TYPE_CHECKING:
+    from .cache import PromptCache, get_prompt_cache
+    from .client import FreepikImageClient
+    from .drive_storage import DriveStorage
+    from .r2_storage import R2Storage
+    from .service import generate_and_upload_image, generate_and_upload_images
+    from .storage import ImageStorage, rewrite_image_url, storage_from_env
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
+
 
 __all__ = [
     "FreepikImageClient",
     "DriveStorage",
+    "R2Storage",
+    "ImageStorage",
+    "storage_from_env",
+    "rewrite_image_url",
     "generate_and_upload_images",
     "generate_and_upload_image",
+    "PromptCache",
+    "get_prompt_cache",
 ]
-
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO
+
+from backend.core.ratelimit import TokenBucket, parse_rate
+
+
+@dataclass
+class BatchItem:
+    id: str
+    prompt: str
+    aspect_ratio: Optional[str] = None
+    size: Optional[str] = None
+    n: int = 1
+    # 読み込めなかった行。生成せずに失敗として manifest に記録する
+    error: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: Any, line_no: int) -> "BatchItem":
+        if not isinstance(row, dict):
+            raise ValueError(f"{line_no} 行目: オブジェクトではありません")
+        prompt = str(row.get("prompt") or "").strip()
+        if not prompt:
+            raise ValueError(f"{line_no} 行目: prompt がありません")
+        aspect_ratio = row.get("aspect_ratio") or None
+        size = row.get("size") or None
+        n = int(row.get("n") or 1)
+        item_id = str(row.get("id") or "").strip()
+        if not item_id:
+            # id が無ければ入力内容から決める（再実行時も同じ id になる）
+            raw = json.dumps([prompt, aspect_ratio, size, n], ensure_ascii=False)
+            item_id = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+        return cls(id=item_id, prompt=prompt, aspect_ratio=aspect_ratio, size=size, n=n)
+
+
+def load_items(path: Path) -> List[BatchItem]:
+    """JSONL（1行1オブジェクト）または CSV（ヘッダ行あり）から生成対象を読み込む。
+
+    列: prompt（必須）, id, aspect_ratio, size, n
+    読み込めない行（JSON でない・オブジェクトでない・prompt が無いなど）は実行全体を止めず、
+    id="line-<行番号>" の error 付き項目として返す。
+    """
+    items: List[BatchItem] = []
+    with path.open(encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            for i, row in enumerate(csv.DictReader(f), start=2):
+                items.append(_parse_row(lambda: row, i))
+        else:
+            for i, line in enumerate(f, start=1):
+                if line.strip():
+                    items.append(_parse_row(lambda: json.loads(line), i))
+    seen = set()
+    for item in items:
+        if item.id in seen:
+            raise ValueError(f"id が重複しています: {item.id}")
+        seen.add(item.id)
+    return items
+
+
+def _parse_row(read: Callable[[], Any], line_no: int) -> BatchItem:
+    try:
+        return BatchItem.from_row(read(), line_no)
+    except (ValueError, TypeError) as e:
+        # json.JSONDecodeError も ValueError
+        message = str(e) if str(e).startswith(f"{line_no} 行目") else f"{line_no} 行目: {e}"
+        return BatchItem(id=f"line-{line_no}", prompt="", error=message[:500])
+
+
+class Manifest:
+    """処理結果の追記型ログ（JSONL）。同じ id は最後の記録が有効。
+
+    1件終わるごとに追記・flush するため、中断しても完了済みの項目は再実行でスキップできる。
+    書きかけの最終行（強制終了時）は読み込み時に無視する。
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if path.exists():
+            text = path.read_text(encoding="utf-8")
+            for line in text.splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self.records[record["id"]] = record
+            if text and not text.endswith("\n"):
+                # 書きかけの行の後ろに追記しないよう改行で区切る
+                with path.open("a", encoding="utf-8") as f:
+                    f.write("\n")
+
+    def is_done(self, item_id: str) -> bool:
+        return self.records.get(item_id, {}).get("status") == "done"
+
+    def attempts(self, item_id: str) -> int:
+        return int(self.records.get(item_id, {}).get("attempts", 0))
+
+    def record(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.records[record["id"]] = record
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+
+
+@dataclass
+class BatchStats:
+    total: int
+    skipped: int = 0
+    done: int = 0
+    failed: int = 0
+    images: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, ok: bool, images: int = 0) -> None:
+        with self._lock:
+            if ok:
+                self.done += 1
+                self.images += images
+            else:
+                self.failed += 1
+
+    def line(self) -> str:
+        elapsed = max(1e-9, time.monotonic() - self.started_at)
+        finished = self.done + self.failed
+        remaining = self.total - self.skipped - finished
+        rate = finished / elapsed * 60
+        eta = f"{remaining / (finished / elapsed):.0f}s" if finished else "-"
+        return (
+            f"[{finished}/{self.total - self.skipped}] done={self.done} failed={self.failed} "
+            f"skipped={self.skipped} images={self.images} {rate:.1f} items/min eta={eta}"
+        )
+
+
+def _report(stats: BatchStats, stop: threading.Event, out: TextIO, interval_sec: float) -> None:
+    tty = out.isatty()
+    while not stop.wait(interval_sec):
+        out.write(("\r" + stats.line()) if tty else stats.line() + "\n")
+        out.flush()
+
+
+def run_batch(
+    items: Iterable[BatchItem],
+    *,
+    client_factory: Callable[[], Any],
+    output_dir: Path,
+    manifest: Manifest,
+    workers: int = 4,
+    retries: int = 1,
+    backoff_sec: float = 1.0,
+    max_backoff_sec: float = 30.0,
+    rate: Optional[str] = None,
+    prefix: str = "freepik",
+    progress: Optional[TextIO] = sys.stderr,
+    progress_interval_sec: float = 1.0,
+) -> BatchStats:
+    """items を workers 並列で生成・保存し、結果を manifest に記録する。
+
+    client_factory はワーカースレッドごとに1回呼ばれる（requests.Session をスレッド間で共有しない）。
+    rate（例: "30/minute"）を指定すると Freepik への投入をその速度に抑える。
+    retries は1回の実行の中での再試行回数で、失敗のまま残った項目は再実行時に再び試す。
+    再試行の前は backoff_sec から倍々（上限 max_backoff_sec）の範囲でランダムに待つ（full jitter）。
+    error 付きの項目（読み込めなかった行）は生成せずに失敗として記録する。
+    """
+    items = list(items)
+    stats = BatchStats(total=len(items))
+    pending = [item for item in items if not manifest.is_done(item.id)]
+    stats.skipped = len(items) - len(pending)
+
+    local = threading.local()
+    bucket: Optional[TokenBucket] = None
+    if rate:
+        per_sec = parse_rate(rate)
+        bucket = TokenBucket(per_sec, burst=1)
+
+    def _pace() -> None:
+        if bucket is None:
+            return
+        while True:
+            wait = bucket.hit("freepik")
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def _process(item: BatchItem) -> None:
+        if item.error is not None:
+            manifest.record({"id": item.id, "status": "failed", "error": item.error, "attempts": 0})
+            stats.add(False)
+            return
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = client_factory()
+        attempts = manifest.attempts(item.id)
+        error = ""
+        started = time.monotonic()
+        for retry in range(retries + 1):
+            if retry:
+                # 一斉に再送して上流の障害を長引かせないよう、待ち時間をばらつかせる
+                time.sleep(random.uniform(0, min(max_backoff_sec, backoff_sec * 2 ** (retry - 1))))
+            attempts += 1
+            _pace()
+            try:
+                paths = client.generate_image(
+                    prompt=item.prompt,
+                    aspect_ratio=item.aspect_ratio,
+                    size=item.size,
+                    num_images=item.n,
+                    output_dir=output_dir,
+                    filename_prefix=f"{prefix}-{item.id}",
+                )
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"[:500]
+                continue
+            manifest.record({
+                "id": item.id,
+                "status": "done",
+                "paths": [str(p) for p in paths],
+                "attempts": attempts,
+                "elapsed_sec": round(time.monotonic() - started, 3),
+            })
+            stats.add(True, len(paths))
+            return
+        manifest.record({"id": item.id, "status": "failed", "error": error, "attempts": attempts})
+        stats.add(False)
+
+    stop = threading.Event()
+    reporter: Optional[threading.Thread] = None
+    if progress is not None:
+        reporter = threading.Thread(target=_report, args=(stats, stop, progress, progress_interval_sec), daemon=True)
+        reporter.start()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch") as pool:
+            list(pool.map(_process, pending))
+    finally:
+        stop.set()
+        if reporter is not None:
+            reporter.join()
+            progress.write(("\r" if progress.isatty() else "") + stats.line() + "\n")
+            progress.flush()
+    return stats
+
+
+__all__ = ["BatchItem", "BatchStats", "Manifest", "load_items", "run_batch"]
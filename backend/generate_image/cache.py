@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from backend.core.cache import CacheBackend, MemoryCache, cache_backend
+from backend.core.env import get_env
+
+
+def normalize_content(text: Optional[str]) -> str:
+    """表記揺れ（全角/半角・連続空白・前後空白）を吸収したキー用の文字列にする。"""
+    if not text:
+        return ""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def content_key(namespace: str, *parts: Optional[str], **params: Any) -> str:
+    """正規化した本文とパラメータのハッシュからキャッシュキーを作る。"""
+    payload = {
+        "parts": [normalize_content(p) for p in parts],
+        "params": {k: v for k, v in sorted(params.items()) if v is not None},
+    }
+    digest = hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+@dataclass
+class SingleFlight:
+    """同じキーの計算が同時に走った場合、1回だけ実行して結果を共有する。"""
+
+    _flights: Dict[str, _Flight] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fn()
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+
+@dataclass
+class PromptCache:
+    """生成系APIの呼び出しを、正規化した入力のハッシュでメモ化する。
+
+    キャッシュミス時の同一キーの同時リクエストは SingleFlight で1回にまとめる。
+    失敗した呼び出しの結果はキャッシュしない。
+    """
+
+    backend: CacheBackend = field(default_factory=MemoryCache)
+    ttl_sec: float = 24 * 60 * 60
+    _flight: SingleFlight = field(default_factory=SingleFlight, init=False, repr=False)
+
+    @classmethod
+    def from_env(cls) -> "PromptCache":
+        max_entries = int(get_env("PROMPT_CACHE_MAX_ENTRIES", "1024") or "1024")
+        ttl_sec = float(get_env("PROMPT_CACHE_TTL_SEC", str(24 * 60 * 60)) or 0)
+        # SHARED_CACHE_PATH があればワーカー間で共有する（backend.core.cache）
+        return cls(backend=cache_backend(max_entries=max_entries), ttl_sec=ttl_sec)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        hit = self.backend.get(key)
+        if hit is not None:
+            return hit
+
+        def _run() -> Any:
+            # 先行リクエストが書き込んだ直後に入ってきた場合は再計算しない
+            again = self.backend.get(key)
+            if again is not None:
+                return again
+            value = compute()
+            if value is not None and self.ttl_sec > 0:
+                self.backend.set(key, value, self.ttl_sec)
+            return value
+
+        return self._flight.do(key, _run)
+
+    def invalidate(self, key: str) -> None:
+        self.backend.delete(key)
+
+
+_default_cache: Optional[PromptCache] = None
+_default_lock = threading.Lock()
+
+
+def get_prompt_cache() -> PromptCache:
+    """プロセス共通の PromptCache（環境変数で設定）を返す。"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = PromptCache.from_env()
+        return _default_cache
+
+
+__all__ = [
+    "CacheBackend",
+    "MemoryCache",
+    "PromptCache",
+    "SingleFlight",
+    "content_key",
+    "get_prompt_cache",
+    "normalize_content",
+]
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import sys
 from pathlib import Path
 
 from .client import FreepikImageClient
@@ -8,15 +9,27 @@ from .client import FreepikImageClient
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Freepik API を用いた画像生成CLI")
-    parser.add_argument("prompt", type=str, help="画像生成のプロンプト")
+    parser.add_argument("prompt", type=str, nargs="?", default=None, help="画像生成のプロンプト（--batch 指定時は不要）")
     parser.add_argument("--aspect-ratio", dest="aspect_ratio", type=str, default=None, help="例: widescreen_16_9, 1:1 など")
     parser.add_argument("--size", dest="size", type=str, default=None, help="例: 1024x1024 など")
     parser.add_argument("--n", dest="num_images", type=int, default=1, help="生成枚数")
     parser.add_argument("--out", dest="output_dir", type=str, default=None, help="保存先ディレクトリ")
     parser.add_argument("--prefix", dest="prefix", type=str, default="freepik", help="保存ファイル名の接頭辞")
+    # バッチモード
+    parser.add_argument("--batch", type=str, default=None, help="プロンプトの一覧（.jsonl または .csv）")
+    parser.add_argument("--workers", type=int, default=4, help="バッチの並列数")
+    parser.add_argument("--manifest", type=str, default=None, help="進捗の記録先（既定: 保存先/manifest.jsonl）")
+    parser.add_argument("--retries", type=int, default=1, help="1項目あたりの再試行回数")
+    parser.add_argument("--backoff", type=float, default=1.0, help="再試行前の待ち時間の基準（秒、倍々に増やしてばらつかせる）")
+    parser.add_argument("--rate", type=str, default=None, help="Freepik への投入速度の上限（例: 30/minute）")
 
     args = parser.parse_args()
 
+    if args.batch:
+        sys.exit(_run_batch(args))
+    if not args.prompt:
+        parser.error("prompt または --batch を指定してください")
+
     client = FreepikImageClient.from_env()
     out_dir = Path(args.output_dir) if args.output_dir else None
 
@@ -33,6 +46,29 @@ def main() -> None:
         print(str(p))
 
 
+def _run_batch(args: argparse.Namespace) -> int:
+    from .batch import Manifest, load_items, run_batch
+
+    items = load_items(Path(args.batch))
+    # 保存先の既定値は FREEPIK_OUTPUT_DIR（from_env と同じ）
+    out_dir = Path(args.output_dir) if args.output_dir else FreepikImageClient.from_env().default_output_dir
+    manifest = Manifest(Path(args.manifest) if args.manifest else out_dir / "manifest.jsonl")
+
+    stats = run_batch(
+        items,
+        client_factory=FreepikImageClient.from_env,
+        output_dir=out_dir,
+        manifest=manifest,
+        workers=args.workers,
+        retries=args.retries,
+        backoff_sec=args.backoff,
+        rate=args.rate,
+        prefix=args.prefix,
+    )
+    print(f"manifest: {manifest.path}")
+    return 1 if stats.failed else 0
+
+
 if __name__ == "__main__":
     main()
 
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import base64
 import json
-import os
 import time
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -10,12 +9,8 @@ from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 
-
-def _get_env(name: str, default: Optional[str] = None) -> Optional[str]:
-    value = os.getenv(name)
-    if value is None:
-        return default
-    return value.strip() or default
+from backend.core.env import get_env
+from backend.core.metrics import http_outcome, observe_dependency
 
 
 def _timestamp() -> str:
@@ -42,16 +37,16 @@ class FreepikImageClient:
         except Exception:
             pass
 
-        api_key = _get_env("FREEPIK_API_KEY") or _get_env("FREEPIK_TOKEN")
+        api_key = get_env("FREEPIK_API_KEY") or get_env("FREEPIK_TOKEN")
         if not api_key:
             raise ValueError("FREEPIK_API_KEY もしくは FREEPIK_TOKEN が環境変数に設定されていません。")
 
         # Most Freepik examples seen in the wild use a v1 AI path. Keep this configurable.
-        generate_url = _get_env("FREEPIK_GENERATE_URL") or "https://api.freepik.com/v1/ai/mystic"
+        generate_url = get_env("FREEPIK_GENERATE_URL") or "https://api.freepik.com/v1/ai/mystic"
 
-        auth_type = (_get_env("FREEPIK_AUTH_TYPE", "x-api-key") or "x-api-key").lower()
+        auth_type = (get_env("FREEPIK_AUTH_TYPE", "x-api-key") or "x-api-key").lower()
 
-        out_dir = Path(_get_env("FREEPIK_OUTPUT_DIR", str(Path("backend/generate_image/outputs").resolve())))
+        out_dir = Path(get_env("FREEPIK_OUTPUT_DIR", str(Path("backend/generate_image/outputs").resolve())))
         return cls(
             api_key=api_key,
             generate_url=generate_url,
@@ -73,6 +68,12 @@ class FreepikImageClient:
             headers.update(extra_headers)
         return headers
 
+    def ping(self, timeout_sec: float = 3.0) -> None:
+        """生成 API に到達でき、キーが受け付けられるかを確かめる（タスクは作らない）。"""
+        r = self.session.get(self.generate_url, headers=self._build_headers(), timeout=timeout_sec)
+        if r.status_code >= 500 or r.status_code in (401, 403):
+            raise RuntimeError(f"Freepik API が応答しません: HTTP {r.status_code}")
+
     def generate_image(
         self,
         prompt: str,
@@ -101,12 +102,14 @@ class FreepikImageClient:
 
         headers = self._build_headers()
 
-        response = self.session.post(
-            self.generate_url,
-            headers=headers,
-            data=json.dumps(payload),
-            timeout=self.request_timeout_sec,
-        )
+        with observe_dependency("freepik", "generate") as call:
+            response = self.session.post(
+                self.generate_url,
+                headers=headers,
+                data=json.dumps(payload),
+                timeout=self.request_timeout_sec,
+            )
+            call.outcome = http_outcome(response.status_code)
         if response.status_code >= 400:
             raise RuntimeError(
                 f"Freepik API エラー: status={response.status_code}, body={response.text[:500]}"
@@ -126,7 +129,7 @@ class FreepikImageClient:
         if not urls and not b64_images:
             # 非同期ジョブ型レスポンスに簡易対応
             job_id = data.get("job_id") or data.get("id")
-            status_url = data.get("status_url") or _get_env("FREEPIK_JOB_STATUS_URL_TEMPLATE")
+            status_url = data.get("status_url") or get_env("FREEPIK_JOB_STATUS_URL_TEMPLATE")
             if job_id and status_url:
                 status_endpoint = status_url.replace("{job_id}", str(job_id))
                 urls, b64_images = self._poll_until_ready(status_endpoint)
@@ -176,12 +179,14 @@ class FreepikImageClient:
 
         headers = self._build_headers()
 
-        response = self.session.post(
-            self.generate_url,
-            headers=headers,
-            data=json.dumps(payload),
-            timeout=self.request_timeout_sec,
-        )
+        with observe_dependency("freepik", "generate") as call:
+            response = self.session.post(
+                self.generate_url,
+                headers=headers,
+                data=json.dumps(payload),
+                timeout=self.request_timeout_sec,
+            )
+            call.outcome = http_outcome(response.status_code)
         if response.status_code >= 400:
             raise RuntimeError(
                 f"Freepik API エラー: status={response.status_code}, body={response.text[:500]}"
@@ -195,7 +200,7 @@ class FreepikImageClient:
         urls, b64_images = self._extract_image_sources(data)
         if not urls and not b64_images:
             job_id = data.get("job_id") or data.get("id")
-            status_url = data.get("status_url") or _get_env("FREEPIK_JOB_STATUS_URL_TEMPLATE")
+            status_url = data.get("status_url") or get_env("FREEPIK_JOB_STATUS_URL_TEMPLATE")
             if job_id and status_url:
                 status_endpoint = status_url.replace("{job_id}", str(job_id))
                 urls, b64_images = self._poll_until_ready(status_endpoint)
@@ -206,7 +211,8 @@ class FreepikImageClient:
 
         results: List[bytes] = []
         for u in urls:
-            with self.session.get(u, timeout=self.request_timeout_sec) as r:
+            with observe_dependency("freepik", "download") as call, self.session.get(u, timeout=self.request_timeout_sec) as r:
+                call.outcome = http_outcome(r.status_code)
                 if r.status_code >= 400:
                     raise RuntimeError(f"画像のダウンロードに失敗しました: status={r.status_code}")
                 results.append(r.content)
@@ -220,7 +226,8 @@ class FreepikImageClient:
         return results
 
     def _download(self, url: str, out_path: Path) -> None:
-        with self.session.get(url, stream=True, timeout=self.request_timeout_sec) as r:
+        with observe_dependency("freepik", "download") as call, self.session.get(url, stream=True, timeout=self.request_timeout_sec) as r:
+            call.outcome = http_outcome(r.status_code)
             if r.status_code >= 400:
                 raise RuntimeError(f"画像のダウンロードに失敗しました: status={r.status_code}")
             with out_path.open("wb") as f:
@@ -286,7 +293,9 @@ class FreepikImageClient:
     def _poll_until_ready(self, status_url: str, *, max_wait_sec: int = 180, interval_sec: float = 2.0) -> Tuple[List[str], List[str]]:
         start = time.time()
         while True:
-            r = self.session.get(status_url, headers=self._build_headers(), timeout=self.request_timeout_sec)
+            with observe_dependency("freepik", "poll") as call:
+                r = self.session.get(status_url, headers=self._build_headers(), timeout=self.request_timeout_sec)
+                call.outcome = http_outcome(r.status_code)
             if r.status_code >= 400:
                 raise RuntimeError(f"Freepik ジョブ監視エラー: status={r.status_code}, body={r.text[:300]}")
             try:
@@ -2,22 +2,19 @@ from __future__ import annotations
 
 import io
 import json
-import os
 import time
 import uuid
 from dataclasses import dataclass, field
-from typing import Optional, Tuple
+from typing import IO, Any, Dict, Iterator, Optional, Tuple
 
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
+from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
 
+from backend.core.env import get_env
+from backend.core.metrics import observe_dependency
 
-def _get_env(name: str, default: Optional[str] = None) -> Optional[str]:
-    value = os.getenv(name)
-    if value is None:
-        return default
-    return value.strip() or default
+from .storage import drive_direct_url
 
 
 def _timestamp() -> str:
@@ -43,9 +40,9 @@ class DriveStorage:
         except Exception:
             pass
 
-        sa_file = _get_env("GOOGLE_SERVICE_ACCOUNT_FILE")
-        sa_json = _get_env("GOOGLE_SERVICE_ACCOUNT_JSON")
-        folder_id = _get_env("GOOGLE_DRIVE_FOLDER_ID")
+        sa_file = get_env("GOOGLE_SERVICE_ACCOUNT_FILE")
+        sa_json = get_env("GOOGLE_SERVICE_ACCOUNT_JSON")
+        folder_id = get_env("GOOGLE_DRIVE_FOLDER_ID")
 
         if sa_file:
             creds = Credentials.from_service_account_file(sa_file, scopes=SCOPES)
@@ -59,6 +56,10 @@ class DriveStorage:
     def _service(self):
         return build("drive", "v3", credentials=self.credentials, cache_discovery=False)
 
+    def ping(self) -> None:
+        """Drive API に到達でき、サービスアカウントが有効かを確かめる。"""
+        self._service().about().get(fields="user").execute()
+
     def generate_filename(self, *, prefix: str = "freepik", ext: str = ".png") -> str:
         return f"{prefix}-{_timestamp()}-{uuid.uuid4().hex}{ext}"
 
@@ -78,12 +79,13 @@ class DriveStorage:
             file_metadata["parents"] = [used_folder]
 
         media = MediaIoBaseUpload(io.BytesIO(data), mimetype=mimetype, resumable=False)
-        created = service.files().create(
-            body=file_metadata,
-            media_body=media,
-            fields="id, webViewLink, webContentLink, name",
-            supportsAllDrives=True,
-        ).execute()
+        with observe_dependency("drive", "files.create"):
+            created = service.files().create(
+                body=file_metadata,
+                media_body=media,
+                fields="id, webViewLink, webContentLink, name",
+                supportsAllDrives=True,
+            ).execute()
 
         file_id = created["id"]
 
@@ -100,9 +102,45 @@ class DriveStorage:
                 pass
 
         # React等から直接画像として参照できるURL（コンテンツ直リンク）
-        direct_url = f"https://drive.google.com/uc?id={file_id}"
+        direct_url = drive_direct_url(file_id)
         return file_id, direct_url
 
+    def save(self, data: bytes, *, name: str, content_type: str = "image/png") -> Tuple[str, str]:
+        """ImageStorage としての保存（公開設定込み）。"""
+        return self.upload_bytes(data, filename=name, mimetype=content_type, make_public=True)
+
+    def list_files(self, *, folder_id: Optional[str] = None, page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """フォルダ内のファイル（id, name, mimeType, size, md5Checksum）を順に返す。"""
+        service = self._service()
+        used_folder = folder_id or self.default_folder_id
+        query = "trashed = false and mimeType != 'application/vnd.google-apps.folder'"
+        if used_folder:
+            query = f"'{used_folder}' in parents and {query}"
+        page_token: Optional[str] = None
+        while True:
+            with observe_dependency("drive", "files.list"):
+                resp = service.files().list(
+                    q=query,
+                    pageSize=page_size,
+                    pageToken=page_token,
+                    fields="nextPageToken, files(id, name, mimeType, size, md5Checksum)",
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True,
+                ).execute()
+            yield from resp.get("files", [])
+            page_token = resp.get("nextPageToken")
+            if not page_token:
+                return
+
+    def download_to(self, file_id: str, out: IO[bytes], *, chunk_size: int = 4 * 1024 * 1024) -> None:
+        """ファイル本体を chunk_size ずつ out に書き出す（全体をメモリに載せない）。"""
+        request = self._service().files().get_media(fileId=file_id, supportsAllDrives=True)
+        downloader = MediaIoBaseDownload(out, request, chunksize=chunk_size)
+        with observe_dependency("drive", "files.get_media"):
+            done = False
+            while not done:
+                _, done = downloader.next_chunk()
+
 
 def _ext_for_mimetype(mimetype: str) -> str:
     m = (mimetype or "").lower()
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import json
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, List, Optional, TextIO
+
+from .batch import Manifest
+from .storage import drive_direct_url
+
+# これを超えるファイルは転送中にディスクへ逃がす
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+class _HashingWriter:
+    """書き込まれた内容の MD5 とサイズを計算しながら、一時ファイルへ流す。"""
+
+    def __init__(self, out: IO[bytes]) -> None:
+        self.out = out
+        self.md5 = hashlib.md5()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.md5.update(data)
+        self.size += len(data)
+        return self.out.write(data)
+
+
+@dataclass
+class MigrationStats:
+    total: int
+    skipped: int = 0
+    done: int = 0
+    failed: int = 0
+    bytes: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, ok: bool, size: int = 0) -> None:
+        with self._lock:
+            if ok:
+                self.done += 1
+                self.bytes += size
+            else:
+                self.failed += 1
+
+    def line(self) -> str:
+        elapsed = max(1e-9, time.monotonic() - self.started_at)
+        return (
+            f"[{self.done + self.failed}/{self.total - self.skipped}] done={self.done} failed={self.failed} "
+            f"skipped={self.skipped} {self.bytes / elapsed / 1024 / 1024:.2f} MB/s"
+        )
+
+
+def r2_key_for(file: Dict[str, Any], prefix: str = "images/drive") -> str:
+    # Drive のファイル ID から決めることで、再実行しても同じキーに上書きされる
+    name = str(file.get("name") or "")
+    ext = Path(name).suffix.lower() or ".png"
+    return f"{prefix}/{file['id']}{ext}"
+
+
+def migrate_one(file: Dict[str, Any], *, source: Any, dest: Any, prefix: str = "images/drive") -> Dict[str, Any]:
+    """Drive の1ファイルを R2 へ複製し、チェックサムを確かめて checkpoint 用の記録を返す。
+
+    ダウンロードしながら MD5 を計算して Drive の md5Checksum と照合し、
+    PUT 時に Content-MD5 を付けて R2 側でも検証させ、最後に HEAD でサイズと ETag を確かめる。
+    """
+    file_id = file["id"]
+    key = r2_key_for(file, prefix)
+    content_type = file.get("mimeType") or "image/png"
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as buf:
+        writer = _HashingWriter(buf)
+        source.download_to(file_id, writer)
+        md5_hex = writer.md5.hexdigest()
+        expected_md5 = file.get("md5Checksum")
+        if expected_md5 and expected_md5 != md5_hex:
+            raise ValueError(f"ダウンロード内容のチェックサムが一致しません: drive={expected_md5} got={md5_hex}")
+        if file.get("size") is not None and int(file["size"]) != writer.size:
+            raise ValueError(f"ダウンロードしたサイズが一致しません: drive={file['size']} got={writer.size}")
+        buf.seek(0)
+        content_md5 = base64.b64encode(writer.md5.digest()).decode("ascii")
+        _, url = dest.upload_fileobj(buf, key=key, content_type=content_type, content_md5=content_md5)
+
+    head = dest.head(key)
+    if head is None or head["size"] != writer.size or (head["etag"] and head["etag"] != md5_hex):
+        raise ValueError(f"アップロード後の検証に失敗しました: {head}")
+    return {
+        "id": file_id,
+        "status": "done",
+        "key": key,
+        "old_url": drive_direct_url(file_id),
+        "url": url,
+        "md5": md5_hex,
+        "size": writer.size,
+    }
+
+
+def migrate(
+    files: Iterable[Dict[str, Any]],
+    *,
+    source: Any,
+    dest: Any,
+    checkpoint: Manifest,
+    workers: int = 8,
+    retries: int = 2,
+    prefix: str = "images/drive",
+    progress: Optional[TextIO] = sys.stderr,
+    progress_interval_sec: float = 2.0,
+) -> MigrationStats:
+    """files を workers 並列で複製する。checkpoint で完了済みのファイルは飛ばす。"""
+    files = list(files)
+    pending = [f for f in files if not checkpoint.is_done(f["id"])]
+    stats = MigrationStats(total=len(files), skipped=len(files) - len(pending))
+
+    def _process(file: Dict[str, Any]) -> None:
+        error = ""
+        attempts = checkpoint.attempts(file["id"])
+        for _ in range(retries + 1):
+            attempts += 1
+            try:
+                record = migrate_one(file, source=source, dest=dest, prefix=prefix)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"[:500]
+                continue
+            record["attempts"] = attempts
+            checkpoint.record(record)
+            stats.add(True, record["size"])
+            return
+        checkpoint.record({"id": file["id"], "status": "failed", "error": error, "attempts": attempts})
+        stats.add(False)
+
+    stop = threading.Event()
+
+    def _report() -> None:
+        while not stop.wait(progress_interval_sec):
+            progress.write(stats.line() + "\n")  # type: ignore[union-attr]
+            progress.flush()  # type: ignore[union-attr]
+
+    reporter = threading.Thread(target=_report, daemon=True) if progress is not None else None
+    if reporter is not None:
+        reporter.start()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="migrate") as pool:
+            list(pool.map(_process, pending))
+    finally:
+        stop.set()
+        if reporter is not None:
+            reporter.join()
+            progress.write(stats.line() + "\n")  # type: ignore[union-attr]
+    return stats
+
+
+def url_map(checkpoint: Manifest) -> Dict[str, str]:
+    """移行済みのファイルについて {Drive の URL: R2 の URL} を返す。"""
+    return {
+        r["old_url"]: r["url"]
+        for r in checkpoint.records.values()
+        if r.get("status") == "done" and r.get("old_url") and r.get("url")
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Google Drive の画像を R2 へ並列に移行する")
+    parser.add_argument("--folder-id", default=None, help="移行元のフォルダ（既定: GOOGLE_DRIVE_FOLDER_ID）")
+    parser.add_argument("--workers", type=int, default=8, help="並列数")
+    parser.add_argument("--retries", type=int, default=2, help="1ファイルあたりの再試行回数")
+    parser.add_argument("--prefix", default="images/drive", help="R2 のキーの接頭辞")
+    parser.add_argument("--checkpoint", default="drive-to-r2.checkpoint.jsonl", help="進捗の記録先（再実行時は完了分を飛ばす）")
+    parser.add_argument("--url-map", default="drive-to-r2.url-map.json", help="旧URL→新URL の対応表の出力先")
+    parser.add_argument("--dry-run", action="store_true", help="対象の一覧と件数だけ表示する")
+    args = parser.parse_args(argv)
+
+    from .drive_storage import DriveStorage
+    from .r2_storage import R2Storage
+
+    source = DriveStorage.from_env()
+    files = list(source.list_files(folder_id=args.folder_id))
+    checkpoint = Manifest(Path(args.checkpoint))
+    remaining = [f for f in files if not checkpoint.is_done(f["id"])]
+    total_bytes = sum(int(f.get("size") or 0) for f in remaining)
+    print(f"files: {len(files)} (remaining {len(remaining)}, {total_bytes / 1024 / 1024:.1f} MB)")
+    if args.dry_run:
+        return 0
+
+    stats = migrate(
+        files,
+        source=source,
+        dest=R2Storage.from_env(),
+        checkpoint=checkpoint,
+        workers=args.workers,
+        retries=args.retries,
+        prefix=args.prefix,
+    )
+    mapping = url_map(checkpoint)
+    Path(args.url_map).write_text(json.dumps(mapping, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"url map: {args.url_map} ({len(mapping)} entries)")
+    return 1 if stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
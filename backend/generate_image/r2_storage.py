@@ -1,20 +1,15 @@
 from __future__ import annotations
 
-import os
 import time
 import uuid
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import IO, Any, Dict, Optional, Tuple
 
 import boto3
 
-
-def _get_env(name: str, default: Optional[str] = None) -> Optional[str]:
-    value = os.getenv(name)
-    if value is None:
-        return default
-    return value.strip() or default
+from backend.core.env import get_env
+from backend.core.metrics import observe_dependency
 
 
 def _timestamp() -> str:
@@ -28,10 +23,11 @@ class R2Storage:
     account_id: str
     bucket_name: str
     public_base_url: str
-    endpoint_url: str = field(init=False)
+    # 未指定なら R2 のエンドポイント。S3 互換の代役（backend.bench）に向ける場合に指定する
+    endpoint_url: Optional[str] = None
 
     def __post_init__(self) -> None:
-        self.endpoint_url = f"https://{self.account_id}.r2.cloudflarestorage.com"
+        self.endpoint_url = self.endpoint_url or f"https://{self.account_id}.r2.cloudflarestorage.com"
         self._client = boto3.client(
             "s3",
             aws_access_key_id=self.access_key_id,
@@ -49,11 +45,11 @@ class R2Storage:
         except Exception:
             pass
 
-        access_key = _get_env("R2_ACCESS_KEY_ID")
-        secret_key = _get_env("R2_SECRET_ACCESS_KEY")
-        account_id = _get_env("R2_ACCOUNT_ID")
-        bucket = _get_env("R2_BUCKET")
-        public_base_url = _get_env("R2_PUBLIC_BASE_URL")
+        access_key = get_env("R2_ACCESS_KEY_ID")
+        secret_key = get_env("R2_SECRET_ACCESS_KEY")
+        account_id = get_env("R2_ACCOUNT_ID")
+        bucket = get_env("R2_BUCKET")
+        public_base_url = get_env("R2_PUBLIC_BASE_URL")
 
         if not all([access_key, secret_key, account_id, bucket, public_base_url]):
             raise ValueError(
@@ -66,6 +62,7 @@ class R2Storage:
             account_id=str(account_id),
             bucket_name=str(bucket),
             public_base_url=str(public_base_url),
+            endpoint_url=get_env("R2_ENDPOINT_URL"),
         )
 
     def generate_key(self, *, prefix: str = "images/freepik", ext: str = ".png") -> str:
@@ -73,16 +70,62 @@ class R2Storage:
 
     def upload_bytes(self, data: bytes, *, key: Optional[str] = None, content_type: str = "image/png") -> Tuple[str, str]:
         obj_key = key or self.generate_key()
-        self._client.put_object(
-            Bucket=self.bucket_name,
-            Key=obj_key,
-            Body=data,
-            ContentType=content_type,
-            CacheControl="public, max-age=31536000, immutable",
-        )
+        with observe_dependency("r2", "put_object"):
+            self._client.put_object(
+                Bucket=self.bucket_name,
+                Key=obj_key,
+                Body=data,
+                ContentType=content_type,
+                CacheControl="public, max-age=31536000, immutable",
+            )
         public_url = self._build_public_url(obj_key)
         return obj_key, public_url
 
+    def save(self, data: bytes, *, name: str, content_type: str = "image/png") -> Tuple[str, str]:
+        """ImageStorage としての保存。キーは images/<name>。"""
+        return self.upload_bytes(data, key=f"images/{name}", content_type=content_type)
+
+    def upload_fileobj(
+        self,
+        body: IO[bytes],
+        *,
+        key: str,
+        content_type: str = "image/png",
+        content_md5: Optional[str] = None,
+    ) -> Tuple[str, str]:
+        """ファイルオブジェクトから送る。content_md5（base64）を渡すと R2 側で内容を検証する。"""
+        extra: Dict[str, Any] = {"ContentMD5": content_md5} if content_md5 else {}
+        with observe_dependency("r2", "put_object"):
+            self._client.put_object(
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=body,
+                ContentType=content_type,
+                CacheControl="public, max-age=31536000, immutable",
+                **extra,
+            )
+        return key, self._build_public_url(key)
+
+    def head(self, key: str) -> Optional[Dict[str, Any]]:
+        """オブジェクトのサイズと ETag（単一 PUT なら MD5 の16進）。無ければ None。"""
+        from botocore.exceptions import ClientError
+
+        try:
+            with observe_dependency("r2", "head_object"):
+                resp = self._client.head_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return {"size": int(resp["ContentLength"]), "etag": str(resp.get("ETag", "")).strip('"')}
+
+    def ping(self) -> None:
+        """バケットに到達でき、認証情報が有効かを確かめる。"""
+        self._client.head_bucket(Bucket=self.bucket_name)
+
+    def public_url(self, key: str) -> str:
+        return self._build_public_url(key)
+
     def _build_public_url(self, key: str) -> str:
         base = self.public_base_url.rstrip("/")
         path = key.lstrip("/")
@@ -1,9 +1,31 @@
 from __future__ import annotations
 
+import os
 from typing import List, Optional
 
+from backend.core.ratelimit import RateLimitExceeded, TokenBucket, parse_rate, rate_limit_enabled
+
+from .cache import PromptCache, content_key
 from .client import FreepikImageClient
-from .drive_storage import DriveStorage
+from .storage import storage_from_env
+
+# Freepik への生成リクエストの上限（プロセス全体 / ユーザーごと）。キャッシュヒットは数えない
+_GENERATE_RATE = parse_rate(os.getenv("FREEPIK_RATE_LIMIT") or "30/minute")
+_USER_GENERATE_RATE = parse_rate(os.getenv("FREEPIK_USER_RATE_LIMIT") or "5/minute")
+_generate_limit = TokenBucket(_GENERATE_RATE, burst=max(1.0, _GENERATE_RATE * 60), max_keys=1)
+_user_generate_limit = TokenBucket(_USER_GENERATE_RATE, burst=max(1.0, _USER_GENERATE_RATE * 60))
+
+
+def _check_generate_limit(user_id: Optional[str]) -> None:
+    if not rate_limit_enabled():
+        return
+    if user_id:
+        retry_after = _user_generate_limit.hit(user_id)
+        if retry_after > 0:
+            raise RateLimitExceeded(retry_after, scope="user")
+    retry_after = _generate_limit.hit("freepik")
+    if retry_after > 0:
+        raise RateLimitExceeded(retry_after, scope="route")
 
 
 def generate_and_upload_images(
@@ -14,21 +36,64 @@ def generate_and_upload_images(
     n: int = 1,
     prefix: str = "freepik",
     content_type: str = "image/png",
+    cache: Optional[PromptCache] = None,
+    user_id: Optional[str] = None,
 ) -> List[str]:
-    """Freepikで画像を生成し、Google Driveに保存して公開URL群を返す。
+    """Freepikで画像を生成し、保存先（IMAGE_STORAGE: drive / r2）に保存して公開URL群を返す。
+
+    cache を渡したときだけ、正規化したプロンプトと生成パラメータが同じリクエストには
+    生成・アップロードを行わず前回のURL群を返す（同時の同一リクエストも1回にまとめる）。
+    省略すると毎回新しく生成する（同じプロンプトで別の画像を求める呼び出しがあるため）。
+
+    Freepik を呼ぶ前にレート制限（FREEPIK_RATE_LIMIT / user_id ごとの FREEPIK_USER_RATE_LIMIT）を
+    確認し、超過時は RateLimitExceeded（retry_after 秒）を送出する。
 
     環境変数:
       - FREEPIK_API_KEY / FREEPIK_TOKEN
       - FREEPIK_GENERATE_URL（任意）
       - FREEPIK_AUTH_TYPE（任意）
-      - GOOGLE_SERVICE_ACCOUNT_FILE または GOOGLE_SERVICE_ACCOUNT_JSON
-      - GOOGLE_DRIVE_FOLDER_ID（任意、保存先フォルダID）
+      - IMAGE_STORAGE（任意、drive / r2。既定は drive）
+      - drive: GOOGLE_SERVICE_ACCOUNT_FILE または GOOGLE_SERVICE_ACCOUNT_JSON, GOOGLE_DRIVE_FOLDER_ID（任意）
+      - r2: R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY, R2_ACCOUNT_ID, R2_BUCKET, R2_PUBLIC_BASE_URL
     """
     if not prompt or not prompt.strip():
         raise ValueError("prompt は必須です。")
 
+    def _generate() -> List[str]:
+        _check_generate_limit(user_id)
+        return _generate_and_upload(
+            prompt,
+            aspect_ratio=aspect_ratio,
+            size=size,
+            n=n,
+            prefix=prefix,
+            content_type=content_type,
+        )
+
+    if cache is None:
+        return _generate()
+    key = content_key(
+        "image",
+        prompt,
+        aspect_ratio=aspect_ratio,
+        size=size,
+        n=n,
+        content_type=content_type,
+    )
+    return list(cache.get_or_compute(key, _generate))
+
+
+def _generate_and_upload(
+    prompt: str,
+    *,
+    aspect_ratio: Optional[str],
+    size: Optional[str],
+    n: int,
+    prefix: str,
+    content_type: str,
+) -> List[str]:
     client = FreepikImageClient.from_env()
-    drive = DriveStorage.from_env()
+    storage = storage_from_env()
 
     images = client.generate_image_bytes(
         prompt=prompt,
@@ -40,12 +105,7 @@ def generate_and_upload_images(
     urls: List[str] = []
     for data in images:
         filename = f"{prefix}-{_safe_ts_suffix()}{_ext_for_content_type(content_type)}"
-        _, url = drive.upload_bytes(
-            data,
-            filename=filename,
-            mimetype=content_type,
-            make_public=True,
-        )
+        _, url = storage.save(data, name=filename, content_type=content_type)
         urls.append(url)
     return urls
 
@@ -57,6 +117,8 @@ def generate_and_upload_image(
     size: Optional[str] = None,
     prefix: str = "freepik",
     content_type: str = "image/png",
+    cache: Optional[PromptCache] = None,
+    user_id: Optional[str] = None,
 ) -> str:
     """1枚だけ生成してURLを返すショートカット。"""
     urls = generate_and_upload_images(
@@ -66,6 +128,8 @@ def generate_and_upload_image(
         n=1,
         prefix=prefix,
         content_type=content_type,
+        cache=cache,
+        user_id=user_id,
     )
     return urls[0]
 
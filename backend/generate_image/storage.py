@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Protocol, Tuple
+
+from backend.core.env import get_env
+
+
+class ImageStorage(Protocol):
+    """生成画像の保存先（DriveStorage / R2Storage）。"""
+
+    def save(self, data: bytes, *, name: str, content_type: str = "image/png") -> Tuple[str, str]:
+        """data を name で保存し、(オブジェクトID または キー, 公開URL) を返す。"""
+        ...
+
+
+def storage_from_env() -> ImageStorage:
+    """IMAGE_STORAGE（drive / r2、既定は drive）で選んだ保存先を返す。"""
+    kind = (get_env("IMAGE_STORAGE", "drive") or "drive").lower()
+    if kind == "r2":
+        from .r2_storage import R2Storage
+
+        return R2Storage.from_env()
+    if kind == "drive":
+        from .drive_storage import DriveStorage
+
+        return DriveStorage.from_env()
+    raise ValueError(f"IMAGE_STORAGE は drive / r2 のいずれかを指定してください: {kind!r}")
+
+
+def drive_direct_url(file_id: str) -> str:
+    return f"https://drive.google.com/uc?id={file_id}"
+
+
+class UrlRewriteMap:
+    """移行前の URL（Drive）から移行後の URL（R2）への対応表。
+
+    migrate で書き出した JSON（{"旧URL": "新URL"}）を読み込み、既存の投稿に保存された
+    画像 URL を配信時に差し替える。対応が無い URL はそのまま返す。
+    """
+
+    def __init__(self, mapping: Optional[Dict[str, str]] = None) -> None:
+        self.mapping: Dict[str, str] = dict(mapping or {})
+
+    @classmethod
+    def load(cls, path: Path) -> "UrlRewriteMap":
+        if not path.exists():
+            return cls()
+        return cls(json.loads(path.read_text(encoding="utf-8")))
+
+    def rewrite(self, url: Optional[str]) -> Optional[str]:
+        if not url:
+            return url
+        return self.mapping.get(url, url)
+
+
+_url_map: Optional[UrlRewriteMap] = None
+_url_map_lock = threading.Lock()
+
+
+def rewrite_image_url(url: Optional[str]) -> Optional[str]:
+    """IMAGE_URL_MAP_PATH の対応表で画像 URL を移行先に差し替える（未設定なら何もしない）。"""
+    global _url_map
+    path = get_env("IMAGE_URL_MAP_PATH")
+    if not path:
+        return url
+    with _url_map_lock:
+        if _url_map is None:
+            _url_map = UrlRewriteMap.load(Path(path))
+    return _url_map.rewrite(url)
+
+
+__all__ = [
+    "ImageStorage",
+    "UrlRewriteMap",
+    "drive_direct_url",
+    "rewrite_image_url",
+    "storage_from_env",
+]
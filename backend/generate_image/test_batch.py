@@ -0,0 +1,102 @@
+import io
+import threading
+
+from backend.generate_image.batch import BatchItem, Manifest, load_items, run_batch
+
+
+class FakeClient:
+    """generate_image と同じ引数を受け取り、ファイルを書き出すだけのクライアント。"""
+
+    def __init__(self, fail_prompts=()):
+        self.fail_prompts = set(fail_prompts)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def generate_image(self, *, prompt, aspect_ratio, size, num_images, output_dir, filename_prefix):
+        with self._lock:
+            self.calls.append(prompt)
+        if prompt in self.fail_prompts:
+            raise RuntimeError("Freepik API エラー: status=500")
+        path = output_dir / f"{filename_prefix}.png"
+        path.write_bytes(b"\x89PNG")
+        return [path]
+
+
+def test_load_items_from_jsonl_and_csv(tmp_path):
+    jsonl = tmp_path / "prompts.jsonl"
+    jsonl.write_text('{"id": "a", "prompt": "夕焼け", "size": "1024x1024"}\n\n{"prompt": "星空", "n": 2}\n', encoding="utf-8")
+    items = load_items(jsonl)
+    assert [i.id for i in items][0] == "a"
+    assert items[1].n == 2 and len(items[1].id) == 16
+    assert load_items(jsonl)[1].id == items[1].id
+
+    csv_path = tmp_path / "prompts.csv"
+    csv_path.write_text("id,prompt,aspect_ratio\nx,海辺,1:1\n", encoding="utf-8")
+    assert load_items(csv_path) == [BatchItem(id="x", prompt="海辺", aspect_ratio="1:1")]
+
+
+def test_run_batch_resumes_and_retries_only_failures(tmp_path):
+    items = [BatchItem(id=f"p{i}", prompt=f"prompt {i}") for i in range(10)]
+    manifest_path = tmp_path / "manifest.jsonl"
+    client = FakeClient(fail_prompts={"prompt 3"})
+
+    stats = run_batch(
+        items, client_factory=lambda: client, output_dir=tmp_path, manifest=Manifest(manifest_path),
+        workers=4, retries=1, backoff_sec=0, progress=io.StringIO(),
+    )
+    assert (stats.done, stats.failed) == (9, 1)
+    # 失敗した項目は実行内で retries 回だけ再試行する
+    assert client.calls.count("prompt 3") == 2
+    assert (tmp_path / "freepik-p0.png").exists()
+
+    # 再実行: 完了済みはスキップし、失敗分だけ再度試す
+    client.fail_prompts.clear()
+    client.calls.clear()
+    manifest = Manifest(manifest_path)
+    stats = run_batch(
+        items, client_factory=lambda: client, output_dir=tmp_path, manifest=manifest,
+        workers=4, retries=0, progress=io.StringIO(),
+    )
+    assert (stats.skipped, stats.done, stats.failed) == (9, 1, 0)
+    assert client.calls == ["prompt 3"]
+    assert manifest.records["p3"]["attempts"] == 3
+
+
+def test_invalid_rows_are_recorded_as_failed_items(tmp_path):
+    jsonl = tmp_path / "prompts.jsonl"
+    jsonl.write_text('["not", "an", "object"]\n{"id": "ok", "prompt": "夕焼け"}\n{broken\n{"id": "x"}\n', encoding="utf-8")
+    items = load_items(jsonl)
+    assert [i.id for i in items] == ["line-1", "ok", "line-3", "line-4"]
+    assert "オブジェクトではありません" in items[0].error and "prompt" in items[3].error
+
+    client = FakeClient()
+    manifest = Manifest(tmp_path / "manifest.jsonl")
+    stats = run_batch(items, client_factory=lambda: client, output_dir=tmp_path, manifest=manifest, progress=None)
+    assert (stats.done, stats.failed) == (1, 3)
+    assert client.calls == ["夕焼け"]
+    assert manifest.records["line-3"]["status"] == "failed"
+
+
+def test_retries_back_off_with_jitter(tmp_path, monkeypatch):
+    from backend.generate_image import batch
+
+    sleeps = []
+    monkeypatch.setattr(batch.time, "sleep", sleeps.append)
+    monkeypatch.setattr(batch.random, "uniform", lambda low, high: high)
+    client = FakeClient(fail_prompts={"down"})
+    stats = run_batch(
+        [BatchItem(id="a", prompt="down")], client_factory=lambda: client, output_dir=tmp_path,
+        manifest=Manifest(tmp_path / "manifest.jsonl"), retries=4, backoff_sec=1.0, max_backoff_sec=5.0, progress=None,
+    )
+    assert stats.failed == 1 and len(client.calls) == 5
+    # 倍々に増え、上限で頭打ちになる（実際の待ち時間は 0〜この値のランダム）
+    assert sleeps == [1.0, 2.0, 4.0, 5.0]
+
+
+def test_manifest_ignores_truncated_last_line(tmp_path):
+    path = tmp_path / "manifest.jsonl"
+    path.write_text('{"id": "a", "status": "done"}\n{"id": "b", "sta', encoding="utf-8")
+    manifest = Manifest(path)
+    assert manifest.is_done("a") and not manifest.is_done("b")
+    manifest.record({"id": "b", "status": "done"})
+    assert Manifest(path).is_done("b")
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+from backend.generate_image.cache import MemoryCache, PromptCache, content_key
+
+
+def test_content_key_normalizes_text():
+    a = content_key("image", "  富士山の　夜明け ", size="1024x1024")
+    b = content_key("image", "富士山の 夜明け", size="1024x1024", aspect_ratio=None)
+    assert a == b
+    assert a != content_key("image", "富士山の 夜明け", size="512x512")
+    assert a != content_key("achievement", "富士山の 夜明け", size="1024x1024")
+
+
+def test_memory_cache_lru_and_ttl():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1, ttl_sec=60)
+    cache.set("b", 2, ttl_sec=60)
+    assert cache.get("a") == 1
+    cache.set("c", 3, ttl_sec=60)  # 最も使われていない b が追い出される
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    cache.set("d", 4, ttl_sec=0.01)
+    time.sleep(0.02)
+    assert cache.get("d") is None
+
+
+def test_prompt_cache_single_flight():
+    cache = PromptCache(ttl_sec=60)
+    calls = []
+    gate = threading.Event()
+
+    def compute():
+        calls.append(1)
+        gate.wait(1)
+        return ["https://example.com/a.png"]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [["https://example.com/a.png"]] * 8
+    assert cache.get_or_compute("k", compute) == ["https://example.com/a.png"]
+    assert len(calls) == 1
+
+
+def test_prompt_cache_does_not_cache_errors():
+    cache = PromptCache(ttl_sec=60)
+
+    def boom():
+        raise RuntimeError("upstream")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("k", boom)
+    assert cache.get_or_compute("k", lambda: "ok") == "ok"
+
+
+def test_generate_caches_only_when_a_cache_is_passed(monkeypatch):
+    from backend.generate_image import cache as cache_module
+    from backend.generate_image import service
+
+    calls = []
+
+    def fake_generate(prompt, **kwargs):
+        calls.append(prompt)
+        return [f"https://example.com/{len(calls)}.png"]
+
+    monkeypatch.setenv("RATE_LIMIT_ENABLED", "0")
+    monkeypatch.setattr(cache_module, "_default_cache", PromptCache())
+    monkeypatch.setattr(service, "_generate_and_upload", fake_generate)
+
+    # 省略時は毎回生成する
+    assert service.generate_and_upload_image("富士山の夜明け") != service.generate_and_upload_image("富士山の夜明け")
+    assert len(calls) == 2
+
+    cache = cache_module.get_prompt_cache()
+    first = service.generate_and_upload_image("富士山の　夜明け", cache=cache)
+    assert service.generate_and_upload_image(" 富士山の 夜明け ", cache=cache) == first
+    assert service.generate_and_upload_image("富士山の夜明け", size="512x512", cache=cache) != first
+    assert len(calls) == 4
@@ -0,0 +1,69 @@
+import hashlib
+import io
+import threading
+
+from backend.generate_image.batch import Manifest
+from backend.generate_image.migrate import migrate, url_map
+from backend.generate_image.storage import UrlRewriteMap
+
+
+class FakeDrive:
+    def __init__(self, files):
+        self.files = files
+        self.downloads = []
+        self.corrupt = set()
+        self._lock = threading.Lock()
+
+    def listing(self):
+        return [
+            {"id": fid, "name": f"{fid}.png", "mimeType": "image/png", "size": str(len(data)), "md5Checksum": hashlib.md5(data).hexdigest()}
+            for fid, data in self.files.items()
+        ]
+
+    def download_to(self, file_id, out):
+        with self._lock:
+            self.downloads.append(file_id)
+        data = self.files[file_id]
+        if file_id in self.corrupt:
+            data = data[:-1] + b"!"
+        for i in range(0, len(data), 7):
+            out.write(data[i:i + 7])
+
+
+class FakeR2:
+    def __init__(self):
+        self.objects = {}
+
+    def upload_fileobj(self, body, *, key, content_type, content_md5=None):
+        self.objects[key] = body.read()
+        return key, f"https://cdn.example.com/{key}"
+
+    def head(self, key):
+        data = self.objects.get(key)
+        return None if data is None else {"size": len(data), "etag": hashlib.md5(data).hexdigest()}
+
+
+def test_migrate_verifies_checksums_and_resumes(tmp_path):
+    drive = FakeDrive({f"f{i}": f"image-{i}".encode() * 50 for i in range(6)})
+    drive.corrupt.add("f2")
+    r2 = FakeR2()
+    checkpoint_path = tmp_path / "checkpoint.jsonl"
+
+    stats = migrate(drive.listing(), source=drive, dest=r2, checkpoint=Manifest(checkpoint_path), workers=3, retries=1, progress=io.StringIO())
+    assert (stats.done, stats.failed) == (5, 1)
+    assert "images/drive/f2.png" not in r2.objects
+    assert r2.objects["images/drive/f0.png"] == drive.files["f0"]
+
+    # 再実行: 完了分は転送せず、失敗した f2 だけをやり直す
+    drive.corrupt.clear()
+    drive.downloads.clear()
+    checkpoint = Manifest(checkpoint_path)
+    stats = migrate(drive.listing(), source=drive, dest=r2, checkpoint=checkpoint, workers=3, progress=io.StringIO())
+    assert (stats.skipped, stats.done, stats.failed) == (5, 1, 0)
+    assert drive.downloads == ["f2"]
+
+    mapping = url_map(checkpoint)
+    assert len(mapping) == 6
+    rewrite = UrlRewriteMap(mapping)
+    assert rewrite.rewrite("https://drive.google.com/uc?id=f3") == "https://cdn.example.com/images/drive/f3.png"
+    assert rewrite.rewrite("https://example.com/other.png") == "https://example.com/other.png"
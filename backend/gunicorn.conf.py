@@ -0,0 +1,88 @@
+# gunicorn の設定（プリフォークで backend.app を複数ワーカーで動かす）
+#
+#   gunicorn -c backend/gunicorn.conf.py backend.app:app
+#
+# アプリは master で一度だけ読み込み（preload_app）、fork した各ワーカーが lifespan を実行する。
+# プロセス内の状態（/metrics のカウンタ、レート制限、realtime の購読、プロファイラ、ヘルスチェック）は
+# ワーカーごとになるため、共有できるまでは既定を1ワーカーにしている。
+import math
+import os
+import sys
+import tempfile
+
+# gunicorn は設定ファイルを import パスの外から読み込むので、リポジトリのルートを足しておく
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+from backend.core.env import get_env  # noqa: E402
+
+
+def _cgroup_cpu_limit():
+    """コンテナに割り当てられた CPU 数（cgroup のクォータ）。制限がなければ None。"""
+    try:
+        # cgroup v2: "<quota> <period>"（制限なしは "max"）
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1（制限なしは -1）
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return quota / period if quota > 0 and period > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def _auto_workers():
+    # cpu_count() はホストのコア数を返すので、コンテナではクォータを優先する
+    limit = _cgroup_cpu_limit()
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    if limit is not None:
+        cpus = min(cpus, limit)
+    return max(1, math.ceil(cpus))
+
+
+bind = get_env("BIND", "0.0.0.0:8000")
+# 既定は1。WEB_CONCURRENCY=auto でコンテナの CPU クォータに合わせる
+_concurrency = get_env("WEB_CONCURRENCY", "1") or "1"
+workers = _auto_workers() if _concurrency.lower() == "auto" else max(1, int(_concurrency))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+# 一定数のリクエストごとにワーカーを入れ替え、メモリの増加を抑える（jitter で一斉再起動を避ける）
+max_requests = int(get_env("GUNICORN_MAX_REQUESTS", "10000") or "0")
+max_requests_jitter = int(get_env("GUNICORN_MAX_REQUESTS_JITTER", "1000") or "0")
+graceful_timeout = int(get_env("GUNICORN_GRACEFUL_TIMEOUT", "30") or "30")
+timeout = int(get_env("GUNICORN_TIMEOUT", "120") or "120")
+keepalive = int(get_env("GUNICORN_KEEPALIVE", "5") or "5")
+
+accesslog = get_env("GUNICORN_ACCESS_LOG")
+loglevel = get_env("GUNICORN_LOG_LEVEL", "info")
+
+# 複数ワーカーではキャッシュ（トークン検証・プロファイル・プロンプト）を SQLite で共有する。
+# アプリの import より前に設定する必要があるため、ここで環境変数として渡す
+if workers > 1 and not get_env("SHARED_CACHE_PATH"):
+    os.environ["SHARED_CACHE_PATH"] = os.path.join(tempfile.gettempdir(), "backend-shared-cache.sqlite3")
+
+
+def on_starting(server):
+    # 重い SDK（supabase など）は fork 前に master で一度だけ読み込み、全ワーカーで共有する
+    from backend.core.startup import warmup_imports
+
+    timings = warmup_imports()
+    server.log.info("warmup imports: %s", ", ".join(f"{name} {sec * 1000:.0f}ms" for name, sec in timings.items()) or "none")
+
+
+def post_fork(server, worker):
+    # preload_app で master が import 時に開いた SQLite 接続（共感 DB のプール）を fork 先で使い回さない。
+    # close=False: 親プロセスの接続は閉じずに手放すだけにする（共有キャッシュの sqlite3 はプロセスごとに開き直す）
+    from backend.reaction.empathy import engine
+
+    engine.dispose(close=False)
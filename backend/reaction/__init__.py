@@ -0,0 +1 @@
+# Package marker for backend.reaction（共感 API）
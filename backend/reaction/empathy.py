@@ -0,0 +1,138 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from pydantic import BaseModel
+from typing import Any, List, Optional
+import os
+from sqlalchemy import create_engine, Column, String, UniqueConstraint, func, select
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from backend.auth.account_auth import resolve_user_id
+from backend.core.empathy_sync import EmpathyReplicator, record_change, sync_enabled
+from backend.core.env import get_env
+from backend.core.liked_index import LikedIndex
+from backend.core.realtime import hub, post_topic
+from backend.core.response import not_modified
+
+# ===== DB =====
+engine = create_engine(os.getenv("EMPATHY_DB_URL") or "sqlite:///./empathy.db", future=True)
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+Base = declarative_base()
+
+class Empathy(Base):
+    __tablename__ = "empathy"
+    # 複合主キー（UID + post_id）
+    uid = Column(String, primary_key=True)
+    post_id = Column(String, primary_key=True)
+    __table_args__ = (UniqueConstraint("uid", "post_id", name="uq_uid_post"),)
+
+Base.metadata.create_all(bind=engine)
+
+# ===== 共感状態の索引（ユーザーごとの共感済み post_id をメモリに保持）=====
+def _load_liked_post_ids(uid: str) -> List[str]:
+    with SessionLocal() as db:
+        return list(db.execute(select(Empathy.post_id).where(Empathy.uid == uid)).scalars())
+
+def _single_worker() -> bool:
+    # gunicorn.conf.py と同じ WEB_CONCURRENCY を見る（auto は複数になりうるので単一扱いしない）
+    concurrency = get_env("WEB_CONCURRENCY", "1") or "1"
+    return concurrency.isdigit() and int(concurrency) <= 1
+
+
+# 索引はプロセス内のもので、他のワーカーの書き込みや取り込み（hydrate）は反映されない。
+# そのため既定では1ワーカーのときだけ有効にする。EMPATHY_INDEX_MAX_IDS=0 で無効
+liked_index = LikedIndex(
+    _load_liked_post_ids,
+    max_ids=int(get_env("EMPATHY_INDEX_MAX_IDS", "200000" if _single_worker() else "0") or "0"),
+    max_ids_per_user=int(get_env("EMPATHY_INDEX_MAX_IDS_PER_USER", "10000") or "0"),
+)
+
+# ===== Supabase への書き戻し（EMPATHY_SYNC_ENABLED=1 のときだけ）=====
+# トグルはローカルの commit で返し、変更は outbox 経由でバックグラウンドから送る
+replicator: Optional[EmpathyReplicator] = EmpathyReplicator.from_env(engine, Empathy.__table__) if sync_enabled() else None
+
+if replicator is not None:
+    # 取り込み（hydrate）で行が変わったら、読み込み済みの索引は古くなるので捨てる
+    replicator.on_hydrated = liked_index.clear
+
+def start_replication() -> None:
+    """書き戻しのスレッドを始める。Supabase からの取り込みもそのスレッドが行い、失敗しても再試行する。"""
+    if replicator is not None:
+        replicator.start()
+
+def stop_replication() -> None:
+    if replicator is not None:
+        replicator.stop()
+
+# ===== Auth =====
+def current_uid(authorization: Optional[str] = Header(default=None)) -> str:
+    """Bearer <Supabase のアクセストークン> を検証して uid を返す。
+
+    以前の単体アプリは Bearer <uid> をそのまま受け付けていたが、backend.app に載せると
+    誰でも他人として共感できてしまうため本物のトークンを求める（ダミー認証は reaction/one のみ）。
+    """
+    if not authorization or not authorization.lower().startswith("bearer "):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    uid = resolve_user_id(authorization.split(" ", 1)[1].strip())
+    if not uid:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return uid
+
+# ===== Schemas =====
+class EmpathyIn(BaseModel):
+    post_id: str
+
+class EmpathyOut(BaseModel):
+    status: bool  # True=good中, False=解除
+
+# ===== Endpoints =====
+# realtime の購読（/realtime/ws, /realtime/events）と同じプロセスで配信するため、backend.app に組み込む
+router = APIRouter(tags=["empathy"])
+
+@router.post("/empathy", response_model=EmpathyOut)
+def toggle_empathy(body: EmpathyIn, uid: str = Depends(current_uid)):
+    if not body.post_id.strip():
+        raise HTTPException(status_code=400, detail="Invalid post_id")
+
+    db = SessionLocal()
+    try:
+        # 同じユーザーの連打でも、DB と索引が同じ順序で更新されるよう直列にする
+        with liked_index.user_lock(uid):
+            # 複合PKは get(Model, (pk1, pk2)) で取得する
+            rec = db.get(Empathy, (uid, body.post_id))
+            if rec:
+                db.delete(rec)
+                status = False
+            else:
+                db.add(Empathy(uid=uid, post_id=body.post_id))
+                status = True
+            if replicator is not None:
+                # 同じトランザクションで outbox に積むので、ローカルと送信待ちがずれない
+                record_change(db, uid, body.post_id, status)
+            db.commit()
+            liked_index.apply(uid, body.post_id, status)
+        _publish_empathy_count(db, body.post_id)
+        return EmpathyOut(status=status)
+    finally:
+        db.close()
+
+def _publish_empathy_count(db, post_id: str) -> None:
+    """購読中のクライアントへ最新の共感数を配信（購読者がいなければ集計しない）"""
+    if not hub.has_subscribers(post_topic(post_id)):
+        return
+    count = db.execute(select(func.count()).select_from(Empathy).where(Empathy.post_id == post_id)).scalar_one()
+    hub.publish_counts(post_id, post_good=count)
+
+@router.get("/empathy/{post_id}/status", response_model=EmpathyOut)
+def get_status(post_id: str, request: Request, response: Response, uid: str = Depends(current_uid)) -> Any:
+    # 索引に載っているユーザーは DB を引かずに答える
+    liked = liked_index.contains(uid, post_id)
+    if liked is None:
+        db = SessionLocal()
+        try:
+            liked = db.get(Empathy, (uid, post_id)) is not None
+        finally:
+            db.close()
+    # 状態は (uid, post_id) ごとに真偽値だけなので、それ自体をバージョンにする
+    etag_hit = not_modified(request, response, uid, liked)
+    if etag_hit:
+        return etag_hit
+    return EmpathyOut(status=liked)
@@ -0,0 +1,27 @@
+from fastapi.testclient import TestClient
+
+from backend.app import app
+
+
+def test_status_revalidates_with_etag_until_toggled(empathy_db):
+    app.dependency_overrides[empathy_db.current_uid] = lambda: "etag-user"
+    try:
+        client = TestClient(app)
+        resp = client.get("/empathy/etag-post/status")
+        assert resp.status_code == 200 and resp.json() == {"status": False}
+        etag = resp.headers["etag"]
+        assert client.get("/empathy/etag-post/status", headers={"If-None-Match": etag}).status_code == 304
+
+        client.post("/empathy", json={"post_id": "etag-post"})
+        resp = client.get("/empathy/etag-post/status", headers={"If-None-Match": etag})
+        assert resp.status_code == 200 and resp.json() == {"status": True}
+    finally:
+        app.dependency_overrides.pop(empathy_db.current_uid, None)
+
+
+def test_liked_index_defaults_to_off_with_multiple_workers(monkeypatch):
+    from backend.reaction import empathy
+
+    for value, single in (("", True), ("1", True), ("4", False), ("auto", False)):
+        monkeypatch.setenv("WEB_CONCURRENCY", value)
+        assert empathy._single_worker() is single
@@ -0,0 +1,10 @@
+from .index import PostDocument, PostSearchIndex, SearchHit, ngrams, normalize_text
+
+__all__ = [
+    "PostDocument",
+    "PostSearchIndex",
+    "SearchHit",
+    "ngrams",
+    "normalize_text",
+]
+
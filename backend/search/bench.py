@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from typing import List
+
+from .index import PostDocument, PostSearchIndex
+
+
+_TAGS = ["グルメ", "観光", "相談", "落とし物", "イベント", "技術", "子育て", "スポーツ"]
+_CHARS = "あいうえおかきくけこさしすせそたちつてとなにぬねのまみむめもやゆよらりるれろわん大小山川田町駅店道公園祭猫犬花火桜湯橋寺宮"
+
+
+def _vocabulary(rng: random.Random, size: int) -> List[str]:
+    words = {"".join(rng.choice(_CHARS) for _ in range(rng.randint(2, 4))) for _ in range(size * 2)}
+    return sorted(words)[:size]
+
+
+def _zipf_weights(size: int) -> List[float]:
+    # 実際の投稿文に近づけるため、語の出現頻度を Zipf 分布（s=1）に寄せる
+    acc = 0.0
+    cum: List[float] = []
+    for rank in range(1, size + 1):
+        acc += 1.0 / rank
+        cum.append(acc)
+    return cum
+
+
+def _sentence(rng: random.Random, words: List[str], cum: List[float], n_words: int) -> str:
+    picked = rng.choices(words, cum_weights=cum, k=n_words)
+    return "".join(w + rng.choice(["の", "で", "を", "に", "、"]) for w in picked)
+
+
+def build_documents(n: int, words: List[str], *, seed: int = 0) -> List[PostDocument]:
+    rng = random.Random(seed)
+    cum = _zipf_weights(len(words))
+    return [
+        PostDocument(
+            post_id=f"post_{i:06d}",
+            title=_sentence(rng, words, cum, 3),
+            description=_sentence(rng, words, cum, 15),
+            tags=tuple(rng.sample(_TAGS, rng.randint(1, 3))),
+            post_good=rng.randint(0, 200),
+        )
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="投稿検索インデックスのベンチマーク")
+    parser.add_argument("--n", dest="num_posts", type=int, default=100_000, help="投稿数")
+    parser.add_argument("--queries", dest="num_queries", type=int, default=500, help="クエリ回数")
+    parser.add_argument("--vocab", dest="vocab", type=int, default=5000, help="語彙数")
+    parser.add_argument("--seed", dest="seed", type=int, default=0, help="乱数シード")
+    args = parser.parse_args()
+
+    words = _vocabulary(random.Random(args.seed), args.vocab)
+    docs = build_documents(args.num_posts, words, seed=args.seed)
+    index = PostSearchIndex()
+
+    t0 = time.perf_counter()
+    index.upsert_many(docs)
+    build_sec = time.perf_counter() - t0
+    print(f"build: {len(index)} posts in {build_sec:.2f}s ({len(index) / build_sec:,.0f} posts/s)")
+
+    rng = random.Random(args.seed + 1)
+    scenarios = {
+        # 語彙から一様に選ぶ（頻出語から希少語まで満遍なく）
+        "word": lambda: (rng.choice(words), None),
+        # 上位100語（ほぼ全投稿に現れる最悪ケース）
+        "common_word": lambda: (rng.choice(words[:100]), None),
+        "two_words": lambda: (f"{rng.choice(words[:100])} {rng.choice(words)}", None),
+        "word+tag": lambda: (rng.choice(words), [rng.choice(_TAGS)]),
+        "tag_only": lambda: ("", [rng.choice(_TAGS)]),
+    }
+    for name, make in scenarios.items():
+        latencies: List[float] = []
+        for _ in range(args.num_queries):
+            query, tags = make()
+            t = time.perf_counter()
+            index.search(query, tags=tags, limit=20)
+            latencies.append((time.perf_counter() - t) * 1000)
+        latencies.sort()
+        p50 = statistics.median(latencies)
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{name:>10}: p50={p50:.2f}ms p99={p99:.2f}ms")
+
+    # 比較用: 全件の部分一致走査
+    t = time.perf_counter()
+    word = words[len(words) // 2]
+    for _ in range(20):
+        [d for d in docs if word in d.title or word in d.description or any(word in tg for tg in d.tags)]
+    print(f"linear_scan: {(time.perf_counter() - t) * 1000 / 20:.2f}ms/query")
+
+
+if __name__ == "__main__":
+    main()
+
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import heapq
+import threading
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+
+# フィールドごとの重み（タイトル一致を最も重く扱う）
+FIELD_WEIGHTS: Dict[str, float] = {
+    "title": 3.0,
+    "tags": 2.0,
+    "description": 1.0,
+}
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """全角/半角・大文字/小文字の揺れを吸収する（NFKC + casefold）。"""
+    if not text:
+        return ""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def _segments(text: str) -> List[str]:
+    """空白・記号で区切った連続文字列を返す。日本語は区切らずに1塊として扱う。"""
+    segs: List[str] = []
+    buf: List[str] = []
+    for ch in text:
+        if ch.isalnum() or unicodedata.category(ch) in ("Lo", "Lm", "Mn"):
+            buf.append(ch)
+        elif buf:
+            segs.append("".join(buf))
+            buf = []
+    if buf:
+        segs.append("".join(buf))
+    return segs
+
+
+def ngrams(text: str, n: int = 2) -> Set[str]:
+    """正規化済みテキストから n-gram 集合を作る。n 未満の塊はそのまま1語とする。"""
+    grams: Set[str] = set()
+    for seg in _segments(text):
+        if len(seg) < n:
+            grams.add(seg)
+            continue
+        for i in range(len(seg) - n + 1):
+            grams.add(seg[i:i + n])
+    return grams
+
+
+@dataclass
+class PostDocument:
+    post_id: str
+    title: str = ""
+    description: str = ""
+    tags: Tuple[str, ...] = ()
+    post_good: int = 0
+
+    @classmethod
+    def from_post(cls, post: Mapping[str, Any]) -> "PostDocument":
+        """posts API のレコード（`discription`, `tag_list` 表記）から生成する。"""
+        tags: List[str] = []
+        for t in post.get("tag_list") or []:
+            name = t.get("name") if isinstance(t, Mapping) else t
+            if isinstance(name, str) and name:
+                tags.append(name)
+        return cls(
+            post_id=str(post["id"]),
+            title=str(post.get("title") or ""),
+            description=str(post.get("discription") or post.get("description") or ""),
+            tags=tuple(tags),
+            post_good=int(post.get("post_good") or 0),
+        )
+
+
+@dataclass
+class SearchHit:
+    post_id: str
+    score: float
+    post_good: int
+
+
+@dataclass
+class _Indexed:
+    fields: Dict[str, str]
+    grams: Dict[str, Set[str]]
+    tags: Set[str]
+
+
+@dataclass
+class PostSearchIndex:
+    """投稿検索用の n-gram 転置インデックス。
+
+    形態素解析器に依存せず、日本語でも部分一致検索ができるよう n-gram（既定は bigram）
+    で索引化する。転置リストはフィールドごとに持ち、どのフィールドに一致したかを
+    集合演算で求めて順位付けする。投稿の作成・編集・削除ごとに差分更新でき、スレッドセーフ。
+    """
+
+    n: int = 2
+    _postings: Dict[str, Dict[str, Set[str]]] = field(default_factory=dict, init=False, repr=False)
+    _tag_index: Dict[str, Set[str]] = field(default_factory=dict, init=False, repr=False)
+    _docs: Dict[str, _Indexed] = field(default_factory=dict, init=False, repr=False)
+    _good: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.n < 1:
+            raise ValueError("n は1以上を指定してください。")
+        for name in FIELD_WEIGHTS:
+            self._postings[name] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, post_id: object) -> bool:
+        return post_id in self._docs
+
+    def upsert(self, doc: PostDocument) -> None:
+        """投稿を追加、または既存の索引を置き換える。"""
+        fields = {
+            "title": normalize_text(doc.title),
+            "description": normalize_text(doc.description),
+            "tags": " ".join(normalize_text(t) for t in doc.tags),
+        }
+        # 1文字クエリ（例: 「猫」）にも当たるよう unigram も併せて索引化する
+        grams = {name: ngrams(text, self.n) | ngrams(text, 1) for name, text in fields.items()}
+        tags = {normalize_text(t) for t in doc.tags if t}
+
+        with self._lock:
+            self._remove_locked(doc.post_id)
+            for name, gs in grams.items():
+                postings = self._postings[name]
+                for g in gs:
+                    postings.setdefault(g, set()).add(doc.post_id)
+            for t in tags:
+                self._tag_index.setdefault(t, set()).add(doc.post_id)
+            self._docs[doc.post_id] = _Indexed(fields=fields, grams=grams, tags=tags)
+            self._good[doc.post_id] = doc.post_good
+
+    def upsert_many(self, docs: Iterable[PostDocument]) -> None:
+        for doc in docs:
+            self.upsert(doc)
+
+    def remove(self, post_id: str) -> bool:
+        with self._lock:
+            return self._remove_locked(post_id)
+
+    def set_good(self, post_id: str, post_good: int) -> None:
+        """共感数だけが変わった場合の軽量更新（再索引化しない）。"""
+        with self._lock:
+            if post_id in self._good:
+                self._good[post_id] = post_good
+
+    def search(
+        self,
+        query: str = "",
+        *,
+        tags: Optional[Iterable[str]] = None,
+        limit: int = 20,
+    ) -> List[SearchHit]:
+        """クエリとタグで絞り込み、関連度 → post_good の順で上位 limit 件を返す。
+
+        クエリは空白区切りの各語を AND 条件とし、各語がどのフィールドに含まれるかで
+        FIELD_WEIGHTS に従って加点する。クエリが空の場合はタグ絞り込み + post_good 順になる。
+        """
+        segments = list(dict.fromkeys(_segments(normalize_text(query))))
+        tag_filter = {normalize_text(t) for t in (tags or []) if t}
+        limit = max(0, limit)
+
+        with self._lock:
+            base = self._tag_candidates(tag_filter)
+            if not segments:
+                pool = set(self._docs) if base is None else base
+                return self._top_by_good(pool, 0.0, limit)
+
+            # 語ごと・フィールドごとの一致集合
+            matches: List[Dict[str, Set[str]]] = []
+            candidates = base
+            for seg in segments:
+                per_field = {name: self._field_matches(name, seg, candidates) for name in FIELD_WEIGHTS}
+                seg_any: Set[str] = set().union(*per_field.values())
+                candidates = seg_any if candidates is None else candidates & seg_any
+                if not candidates:
+                    return []
+                matches.append(per_field)
+
+            if len(matches) == 1:
+                return self._rank_single(matches[0], candidates, limit)
+
+            scored: List[Tuple[float, int, str]] = []
+            good = self._good
+            for post_id in candidates:
+                score = 0.0
+                for per_field in matches:
+                    for name, weight in FIELD_WEIGHTS.items():
+                        if post_id in per_field[name]:
+                            score += weight
+                scored.append((score, good[post_id], post_id))
+
+        top = heapq.nlargest(limit, scored)
+        return [SearchHit(post_id=pid, score=score, post_good=g) for score, g, pid in top]
+
+    def _field_matches(self, name: str, seg: str, base: Optional[Set[str]]) -> Set[str]:
+        """フィールド name に seg を部分文字列として含む投稿集合。"""
+        postings = self._postings[name]
+        grams = ngrams(seg, self.n)
+        sets: List[Set[str]] = []
+        for g in grams:
+            ids = postings.get(g)
+            if not ids:
+                return set()
+            sets.append(ids)
+        sets.sort(key=len)
+        result = sets[0] & base if base is not None else set(sets[0])
+        for ids in sets[1:]:
+            if not result:
+                return result
+            result &= ids
+        if len(seg) <= self.n:
+            # gram そのものなので検証不要
+            return result
+        # gram が揃っていても連続していない場合があるため本文で確認する
+        docs = self._docs
+        return {pid for pid in result if seg in docs[pid].fields[name]}
+
+    def _rank_single(self, per_field: Dict[str, Set[str]], candidates: Set[str], limit: int) -> List[SearchHit]:
+        # 1語クエリのスコアは一致フィールドの組み合わせで決まるため、
+        # 組み合わせ（最大7通り）ごとの集合を高得点順に取り出し、必要件数で打ち切る
+        names = list(FIELD_WEIGHTS)
+        tiers: List[Tuple[float, Tuple[bool, ...]]] = []
+        for mask in range(1, 1 << len(names)):
+            bits = tuple(bool(mask & (1 << i)) for i in range(len(names)))
+            score = sum(FIELD_WEIGHTS[n] for n, b in zip(names, bits) if b)
+            tiers.append((score, bits))
+        tiers.sort(reverse=True)
+
+        hits: List[SearchHit] = []
+        for score, bits in tiers:
+            if len(hits) >= limit:
+                break
+            members = set(candidates)
+            for name, b in zip(names, bits):
+                if b:
+                    members &= per_field[name]
+                else:
+                    members -= per_field[name]
+                if not members:
+                    break
+            if members:
+                hits.extend(self._top_by_good(members, score, limit - len(hits)))
+        return hits
+
+    def _top_by_good(self, pool: Set[str], score: float, limit: int) -> List[SearchHit]:
+        good = self._good
+        top = heapq.nlargest(limit, pool, key=good.__getitem__)
+        return [SearchHit(post_id=pid, score=score, post_good=good[pid]) for pid in top]
+
+    def _remove_locked(self, post_id: str) -> bool:
+        rec = self._docs.pop(post_id, None)
+        if rec is None:
+            return False
+        self._good.pop(post_id, None)
+        for name, gs in rec.grams.items():
+            postings = self._postings[name]
+            for g in gs:
+                ids = postings.get(g)
+                if ids is None:
+                    continue
+                ids.discard(post_id)
+                if not ids:
+                    del postings[g]
+        for t in rec.tags:
+            ids = self._tag_index.get(t)
+            if ids is None:
+                continue
+            ids.discard(post_id)
+            if not ids:
+                del self._tag_index[t]
+        return True
+
+    def _tag_candidates(self, tag_filter: Set[str]) -> Optional[Set[str]]:
+        if not tag_filter:
+            return None
+        sets = sorted((self._tag_index.get(t, set()) for t in tag_filter), key=len)
+        result = set(sets[0])
+        for s in sets[1:]:
+            result &= s
+        return result
+
+
+__all__ = [
+    "FIELD_WEIGHTS",
+    "PostDocument",
+    "PostSearchIndex",
+    "SearchHit",
+    "ngrams",
+    "normalize_text",
+]
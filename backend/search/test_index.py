@@ -0,0 +1,61 @@
+from backend.search import PostDocument, PostSearchIndex
+
+
+def _index() -> PostSearchIndex:
+    index = PostSearchIndex()
+    index.upsert_many([
+        PostDocument(post_id="p1", title="大阪のたこ焼き屋を探しています", description="駅から近いお店", tags=("グルメ",), post_good=3),
+        PostDocument(post_id="p2", title="京都の紅葉スポット", description="たこ焼きも食べたい", tags=("観光",), post_good=10),
+        PostDocument(post_id="p3", title="ＡＰＩの使い方", description="Python で叩きたい", tags=("技術", "グルメ"), post_good=1),
+    ])
+    return index
+
+
+def test_japanese_substring_and_ranking():
+    index = _index()
+    hits = index.search("たこ焼き")
+    # タイトル一致（p1）が本文一致（p2）より上位
+    assert [h.post_id for h in hits] == ["p1", "p2"]
+
+    # bigram は揃っていても連続しない語はヒットしない
+    assert index.search("焼きたこ") == []
+
+    # 1文字クエリ / 全角半角・大文字小文字の揺れ
+    assert [h.post_id for h in index.search("猫")] == []
+    assert [h.post_id for h in index.search("紅")] == ["p2"]
+    assert [h.post_id for h in index.search("api")] == ["p3"]
+
+
+def test_tag_filter_and_good_ordering():
+    index = _index()
+    assert [h.post_id for h in index.search(tags=["グルメ"])] == ["p1", "p3"]
+    assert [h.post_id for h in index.search("python", tags=["グルメ"])] == ["p3"]
+    assert index.search("たこ焼き", tags=["技術"]) == []
+
+
+def test_incremental_update_and_remove():
+    index = _index()
+    index.upsert(PostDocument(post_id="p1", title="神戸の夜景", tags=("観光",)))
+    assert [h.post_id for h in index.search("たこ焼き")] == ["p2"]
+    assert [h.post_id for h in index.search("夜景")] == ["p1"]
+
+    index.set_good("p1", 100)
+    assert [h.post_id for h in index.search(tags=["観光"])] == ["p1", "p2"]
+
+    assert index.remove("p2") is True
+    assert index.remove("p2") is False
+    assert index.search("紅葉") == []
+    assert len(index) == 2
+
+
+def test_from_post_record():
+    doc = PostDocument.from_post({
+        "id": "post_001",
+        "title": "t",
+        "discription": "d",
+        "tag_list": [{"name": "A", "attribute": True}, {"name": "", "attribute": False}],
+        "post_good": 5,
+    })
+    assert doc.description == "d"
+    assert doc.tags == ("A",)
+    assert doc.post_good == 5